@@ -1,10 +1,12 @@
 """
 Agendador de Backups Automáticos
 Roda em background e cria backups em intervalos regulares
+
+Para rodar junto com a aplicação, sem um processo separado, use
+app.config['BACKUP_INTERVALO_HORAS'] (utils.agendador).
 """
-import time
-import schedule
 from backup_automatico import criar_backup
+from utils.agendador import Agendador
 from datetime import datetime
 
 def job_backup():
@@ -26,20 +28,19 @@ def iniciar_agendador(intervalo_horas=6):
     print(f"\n🤖 Agendador de Backups Iniciado")
     print(f"📅 Backups serão criados a cada {intervalo_horas} hora(s)")
     print(f"💾 Backups mantidos: últimos 30")
-    print(f"⏰ Próximo backup: {datetime.now().strftime('%d/%m/%Y')} às {datetime.now().hour + intervalo_horas}:00")
+    
+    # Agendar backups
+    agendador = Agendador()
+    agendador.a_cada(intervalo_horas, 'backup', job_backup)
+    print(f"⏰ Próximo backup: {agendador.proxima_execucao().strftime('%d/%m/%Y às %H:%M')}")
     print("\nPressione Ctrl+C para parar\n")
     
     # Criar backup inicial
     job_backup()
     
-    # Agendar backups
-    schedule.every(intervalo_horas).hours.do(job_backup)
-    
     # Loop principal
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Verificar a cada minuto
+        agendador.executar_continuamente(intervalo=60)  # Verificar a cada minuto
     except KeyboardInterrupt:
         print("\n\n⏹️  Agendador de backups interrompido pelo usuário.")
 
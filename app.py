@@ -24,6 +24,35 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sua-chave-secreta-super-segura-aqui-2025'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ueci_monitoramento.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['PLANILHA_LIMITE_RENDERIZACAO'] = 300  # Acima disso a planilha abre em modo paginado
+app.config['EXPORTACAO_WORKERS'] = None  # threads por aba nas exportações consolidadas (None = nº de CPUs, até 4)
+app.config['PDF_LOTE_PROCESSOS'] = None  # processos que geram os PDFs do ZIP de Planos de Respostas (None = nº de CPUs, até 4)
+app.config['IMPORTACAO_PROCESSOS'] = None  # processos que leem as abas na importação do Excel (None = nº de CPUs, até 4; 1 = em série)
+# PRAGMAs aplicados a cada conexão (sobrescrevem utils.sqlite_perfil.PRAGMAS_PADRAO; None desativa)
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+}
+# Gráficos do PDF: 'matplotlib' (imagens) ou 'reportlab' (vetoriais, menores); ?graficos= sobrescreve
+app.config['GRAFICOS_BACKEND'] = 'matplotlib'
+# Cache das imagens dos gráficos dos relatórios (memória + disco compartilhado entre processos)
+app.config['GRAFICOS_CACHE_ITENS'] = 64
+app.config['GRAFICOS_CACHE_DIR'] = os.path.join(app.instance_path, 'cache', 'graficos')  # None desativa o disco
+app.config['GRAFICOS_CACHE_MAX_MB'] = 50
+app.config['GRAFICOS_PARALELO'] = True  # False: renderização em série, sem pool de processos
+app.config['GRAFICOS_PROCESSOS'] = None  # None = nº de CPUs (até 4)
+# Fila de geração de relatórios/exportações (utils.tarefas)
+app.config['TAREFAS_WORKERS'] = 1
+app.config['TAREFAS_TTL_HORAS'] = 24  # tarefas concluídas reaproveitadas enquanto os dados não mudam
+app.config['TAREFAS_INTERRUPCAO_MINUTOS'] = 30  # tarefa em execução sem progresso há mais tempo volta para a fila ao iniciar o servidor
+# Armazenamento dos PDFs/Excel gerados (utils.artefatos)
+app.config['ARTEFATOS_DIR'] = os.path.join(app.instance_path, 'artefatos')
+app.config['ARTEFATOS_MAX_MB'] = 500  # acima disso, descarta os usados há mais tempo
+# Rotinas agendadas (utils.agendador)
+app.config['AGENDADOR_ATIVO'] = True
+app.config['RELATORIOS_HORARIO'] = '02:00'  # pré-geração noturna do PDF e do Excel de cada aba (None desativa)
+app.config['BACKUP_INTERVALO_HORAS'] = None  # ex.: 6 para substituir o agendador_backup.py
 
 # Inicializar extensões
 db.init_app(app)
@@ -42,11 +71,49 @@ from routes.auth import auth_bp
 from routes.main import main_bp
 from routes.analytics import analytics_bp
 from routes.configuracoes import config_bp
+from routes.tarefas import tarefas_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(main_bp)
 app.register_blueprint(analytics_bp)
 app.register_blueprint(config_bp)
+app.register_blueprint(tarefas_bp)
+
+# Garantir tabelas novas e índices derivados em bancos já existentes
+from utils.sqlite_funcoes import registrar_funcoes_sqlite
+from utils.sqlite_perfil import aplicar_perfil_sqlite, relatar_perfil_sqlite
+from utils.migracoes import aplicar_migracoes
+from utils.prazos import garantir_indice_prazos
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.busca import garantir_indice_busca
+from utils.agregados import garantir_agregados
+from utils.versoes import garantir_versoes
+from utils.tarefas import retomar_tarefas
+from utils.agendador import iniciar_agendador
+
+with app.app_context():
+    aplicar_perfil_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+    registrar_funcoes_sqlite(db.engine)
+    relatar_perfil_sqlite(db.engine)
+    db.create_all()
+    aplicar_migracoes()
+    garantir_indice_prazos()
+    sincronizar_colunas_geradas()
+    garantir_indice_busca()
+    garantir_agregados()
+    garantir_versoes()
+
+
+def iniciar_servicos():
+    """Fila de tarefas e agendador: só no processo do servidor (wsgi.py ou app.py direto)
+
+    Os scripts que fazem `from app import app` não chamam esta função, então não
+    criam threads em segundo plano.
+    """
+    with app.app_context():
+        retomar_tarefas()
+    iniciar_agendador(app)
+
 
 # Criar tabelas e importar dados iniciais
 def init_database():
@@ -86,5 +153,9 @@ if __name__ == '__main__':
     print("   Senha: admin123")
     print("\n" + "="*60 + "\n")
     
+    # Com debug=True o reloader roda este bloco em dois processos; só o que atende as requisições inicia os serviços
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_servicos()
+
     # Executar aplicação
     app.run(debug=True, host='0.0.0.0', port=5000)
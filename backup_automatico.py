@@ -3,10 +3,20 @@ Sistema de Backup Automático
 Realiza backup do banco de dados em intervalos regulares
 """
 import os
-import shutil
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+def copiar_banco(origem, destino):
+    """Copia o banco pela API de backup do SQLite (inclui o que ainda está no WAL)"""
+    fonte = sqlite3.connect(str(origem))
+    alvo = sqlite3.connect(str(destino))
+    try:
+        fonte.backup(alvo)
+    finally:
+        alvo.close()
+        fonte.close()
+
 def criar_backup():
     """Cria backup do banco de dados com timestamp"""
     
@@ -26,8 +36,8 @@ def criar_backup():
     backup_file = backup_dir / f'backup_{timestamp}.db'
     
     try:
-        # Copiar arquivo
-        shutil.copy2(db_file, backup_file)
+        # Copiar banco (o modo WAL impede a cópia direta do arquivo)
+        copiar_banco(db_file, backup_file)
         
         # Obter tamanho do arquivo
         tamanho_mb = backup_file.stat().st_size / (1024 * 1024)
@@ -101,11 +111,11 @@ def restaurar_backup(backup_file):
         if db_file.exists():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_antes = db_file.parent.parent / 'backups' / f'backup_antes_restauracao_{timestamp}.db'
-            shutil.copy2(db_file, backup_antes)
+            copiar_banco(db_file, backup_antes)
             print(f"💾 Backup do estado atual criado: {backup_antes.name}")
         
         # Restaurar backup
-        shutil.copy2(backup_path, db_file)
+        copiar_banco(backup_path, db_file)
         print(f"✅ Backup restaurado com sucesso!")
         print(f"   De: {backup_path.name}")
         print(f"   Para: {db_file}")
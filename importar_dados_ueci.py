@@ -1,5 +1,6 @@
 from app import app, db
 from models.planilha import PlanilhaData, AbaConfig
+from utils.mapeamento_cabecalhos import mapeador_da_aba
 import pandas as pd
 from datetime import datetime
 
@@ -22,27 +23,30 @@ print(f"\nCampos esperados ({len(campos_esperados)}):")
 for i, campo in enumerate(campos_esperados):
     print(f"{i}: {campo}")
 
+# Mapear as colunas do Excel para os campos pelo nome (apelidos em utils.mapeamento_cabecalhos)
+mapeamento = mapeador_da_aba(ueci_config).mapear(df.columns)
+if mapeamento.nao_mapeados():
+    print(f"\nColunas ignoradas (sem campo correspondente): {mapeamento.nao_mapeados()}")
+
 # Inserir dados
 contador = 0
 for idx, row in df.iterrows():
     row_data = {}
     
     # Mapear cada coluna do Excel para os campos esperados
-    for i, col_name in enumerate(df.columns):
-        if i < len(campos_esperados):
-            campo = campos_esperados[i]
-            valor = row[col_name]
-            
-            # Converter NaN e valores vazios para string vazia
-            if pd.isna(valor):
-                valor = ''
-            # Converter datas para string no formato brasileiro
-            elif isinstance(valor, pd.Timestamp):
-                valor = valor.strftime('%Y-%m-%d')
-            else:
-                valor = str(valor)
-            
-            row_data[campo] = valor
+    for col_name, campo in mapeamento.pares():
+        valor = row[col_name]
+        
+        # Converter NaN e valores vazios para string vazia
+        if pd.isna(valor):
+            valor = ''
+        # Converter datas para string no formato brasileiro
+        elif isinstance(valor, pd.Timestamp):
+            valor = valor.strftime('%Y-%m-%d')
+        else:
+            valor = str(valor)
+        
+        row_data[campo] = valor
     
     # Criar novo registro
     novo_registro = PlanilhaData()
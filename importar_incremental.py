@@ -0,0 +1,45 @@
+"""Script da importação incremental do Excel (só o que mudou desde a última importação)
+
+Uso:
+    python importar_incremental.py planilha.xlsx --simular
+    python importar_incremental.py planilha.xlsx --aba "Plano de Ação - UECI" --chave "Nº Nota Recomendatória,Exercício"
+    python importar_incremental.py planilha.xlsx --manter-ausentes --relatorio diferencas.json
+"""
+
+import argparse
+import json
+from app import app
+from utils.importacao_incremental import importar_incremental, resumo_relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importação incremental do Excel')
+    parser.add_argument('arquivo', help='planilha .xlsx')
+    parser.add_argument('--simular', action='store_true', help='só mostra as diferenças, sem gravar')
+    parser.add_argument('--aba', action='append', help='importa só esta aba (pode repetir)')
+    parser.add_argument('--chave', help='campos da chave separados por vírgula (padrão: configuração da aba)')
+    parser.add_argument('--manter-ausentes', action='store_true',
+                        help='não remove os registros que não estão mais na planilha')
+    parser.add_argument('--relatorio', help='grava o relatório completo (JSON) neste arquivo')
+    args = parser.parse_args()
+
+    chave = [campo.strip() for campo in args.chave.split(',') if campo.strip()] if args.chave else None
+
+    with app.app_context():
+        relatorios = importar_incremental(
+            args.arquivo, abas=args.aba, chave=chave, simular=args.simular,
+            remover_ausentes=not args.manter_ausentes
+        )
+
+    for relatorio in relatorios:
+        print(resumo_relatorio(relatorio))
+        print()
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorios, arquivo, ensure_ascii=False, indent=2, default=str)
+        print(f"Relatório gravado em {args.relatorio}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from app import app, db
 from models.planilha import PlanilhaData, AbaConfig
+from utils.mapeamento_cabecalhos import MapeadorCabecalhos
 import pandas as pd
 from datetime import datetime
 
@@ -33,27 +34,8 @@ campos_ueci = [
     'Análise do retorno da área'
 ]
 
-# Mapeamento de colunas do Excel para campos UECI
-mapeamento = {
-    'Exercício': 'Exercício',
-    'Data do Envio': 'Data do Envio',
-    'Data da Ciência': 'Data da Ciência',
-    'Responsável pela Análise': 'Responsável pela Análise',
-    'Origem': 'Origem',
-    'Tipo de Ação': 'Tipo de Ação',
-    'E-docs': 'E-docs',
-    'Ponto de Controle': 'Ponto de Controle',
-    'Recomendação': 'Recomendação',
-    'Riscos Envolvidos': 'Riscos Envolvidos',
-    'STATUS DA RECOMENDAÇÃO\nQual é a situação atual da recomendação?': 'STATUS DA RECOMENDAÇÃO',
-    'Servidor (es) responsável': 'Servidor(es) responsável(is)',
-    'Iniciativa da área': 'Iniciativa da área',
-    'Data da Resposta': 'Data da Resposta',
-    'Prazo previsto de ínicio': 'Prazo previsto de início',
-    'Prazo previsto de término': 'Prazo previsto de conclusão',
-    'Status para a UECI': 'Status para a UECI',
-    'Análise do retorno da área': 'Análise do retorno da área'
-}
+# Mapeamento de colunas do Excel para campos UECI (apelidos em utils.mapeamento_cabecalhos)
+mapeamento = MapeadorCabecalhos(campos_ueci).mapear(df.columns)
 
 # Inserir dados
 contador = 0
@@ -61,7 +43,7 @@ for idx, row in df.iterrows():
     row_data = {}
     
     # Mapear apenas os campos que existem
-    for col_excel, col_ueci in mapeamento.items():
+    for col_excel, col_ueci in mapeamento.pares():
         if col_excel in df.columns:
             valor = row[col_excel]
             
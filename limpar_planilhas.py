@@ -2,6 +2,7 @@
 
 from app import app, db
 from models.planilha import AbaConfig, PlanilhaData
+from models.prazo import Prazo
 
 def limpar_planilhas():
     """Remove planilhas antigas e mantém apenas as 3 principais"""
@@ -29,6 +30,7 @@ def limpar_planilhas():
                 
                 # Remover dados associados a esta aba
                 dados_removidos = PlanilhaData.query.filter_by(aba_name=aba.aba_name).delete()
+                Prazo.query.filter_by(aba_name=aba.aba_name).delete()
                 if dados_removidos > 0:
                     print(f"   Removidos {dados_removidos} registros")
             else:
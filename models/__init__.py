@@ -8,3 +8,7 @@ login_manager = LoginManager()
 from models.user import User
 from models.planilha import PlanilhaData, AbaConfig
 from models.configuracoes import ConfiguracaoSistema, DropdownConfig
+from models.prazo import Prazo
+from models.tarefa import Tarefa
+from models.artefato import Artefato
+from models.registro_removido import RegistroRemovido
@@ -0,0 +1,20 @@
+from datetime import datetime
+from models import db
+
+
+class Artefato(db.Model):
+    """Arquivo gerado (PDF/Excel) guardado em disco e endereçado pelo hash das entradas"""
+    __tablename__ = 'artefato'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(40), unique=True, nullable=False)  # hash das entradas (utils.artefatos.chave_artefato)
+    tipo = db.Column(db.String(50), nullable=False)
+    conteudo = db.Column(db.String(64), nullable=False, index=True)  # sha256 do arquivo; chaves iguais em conteúdo dividem o arquivo
+    arquivo = db.Column(db.String(300), nullable=False)
+    tamanho = db.Column(db.Integer, nullable=False, default=0)
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    acessado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Artefato {self.tipo} {self.chave[:8]} ({self.tamanho} bytes)>'
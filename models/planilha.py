@@ -13,6 +13,7 @@ class PlanilhaData(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     updated_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    hash_importacao = db.Column(db.String(40))  # Hash da linha na última importação do Excel (utils.importacao_incremental)
 
     creator = db.relationship('User', foreign_keys=[created_by])
     updater = db.relationship('User', foreign_keys=[updated_by])
@@ -38,10 +39,15 @@ class AbaConfig(db.Model):
     orange_columns = db.Column(db.Text)  # ADICIONE ESTA LINHA
     display_order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
+    config_version = db.Column(db.Integer, default=0)  # Incrementada a cada mudança de colunas
+
+    def _nova_versao(self):
+        self.config_version = (self.config_version or 0) + 1
 
     def set_columns(self, columns_list):
         """Define as colunas da aba"""
         self.columns_config = json.dumps(columns_list, ensure_ascii=False)
+        self._nova_versao()
 
     def get_columns(self):
         """Retorna as colunas como lista"""
@@ -51,6 +57,7 @@ class AbaConfig(db.Model):
     def set_orange_columns(self, column_names_list):
         """Define quais colunas ficam laranjas (por nome)"""
         self.orange_columns = json.dumps(column_names_list, ensure_ascii=False)
+        self._nova_versao()
 
     def get_orange_columns(self):
         """Retorna lista de nomes das colunas laranjas"""
@@ -0,0 +1,65 @@
+from datetime import datetime
+from models import db
+from sqlalchemy import event
+
+
+class Prazo(db.Model):
+    """Índice de prazos extraídos dos registros das planilhas"""
+    __tablename__ = 'prazo'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aba_name = db.Column(db.String(100), nullable=False, index=True)
+    registro_id = db.Column(db.Integer, nullable=False, index=True)
+    tipo = db.Column(db.String(20), nullable=False)  # 'termino' ou 'retorno'
+    campo_nome = db.Column(db.String(200))
+    data = db.Column(db.String(10), nullable=False, index=True)  # ISO yyyy-mm-dd
+    nota = db.Column(db.String(200))  # Nº Nota Recomendatória (cache)
+    descricao = db.Column(db.String(200))  # Recomendação/Constatação (cache)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_prazo_data_aba', 'data', 'aba_name'),
+    )
+
+    def __repr__(self):
+        return f'<Prazo {self.aba_name} - Reg {self.registro_id} - {self.tipo} {self.data}>'
+
+
+def linhas_de_prazo(aba_name, registro_id, dados, agora=None):
+    """Linhas da tabela `prazo` para os dados de um registro"""
+    from utils.prazos import extrair_prazos
+
+    agora = agora or datetime.utcnow()
+    return [dict(linha, aba_name=aba_name, registro_id=registro_id, updated_at=agora)
+            for linha in extrair_prazos(dados)]
+
+
+def _gravar_prazos(connection, registro):
+    """Regrava as linhas de prazo de um registro usando a conexão do flush"""
+    tabela = Prazo.__table__
+    connection.execute(tabela.delete().where(tabela.c.registro_id == registro.id))
+
+    linhas = linhas_de_prazo(registro.aba_name, registro.id, registro.get_data())
+    if linhas:
+        connection.execute(tabela.insert(), linhas)
+
+
+def _registrar_eventos():
+    """Mantém a tabela de prazos sincronizada em toda escrita de PlanilhaData"""
+    from models.planilha import PlanilhaData
+
+    @event.listens_for(PlanilhaData, 'after_insert')
+    def prazo_after_insert(mapper, connection, target):
+        _gravar_prazos(connection, target)
+
+    @event.listens_for(PlanilhaData, 'after_update')
+    def prazo_after_update(mapper, connection, target):
+        _gravar_prazos(connection, target)
+
+    @event.listens_for(PlanilhaData, 'after_delete')
+    def prazo_after_delete(mapper, connection, target):
+        tabela = Prazo.__table__
+        connection.execute(tabela.delete().where(tabela.c.registro_id == target.id))
+
+
+_registrar_eventos()
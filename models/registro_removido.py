@@ -0,0 +1,24 @@
+from datetime import datetime
+from models import db
+import json
+
+
+class RegistroRemovido(db.Model):
+    """Registro removido por uma importação incremental (lápide com os dados que ele tinha)"""
+    __tablename__ = 'registro_removido'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aba_name = db.Column(db.String(100), nullable=False, index=True)
+    registro_id = db.Column(db.Integer, nullable=False)  # id que o registro tinha em planilha_data
+    chave = db.Column(db.String(500))  # valores da chave de negócio, separados por " | "
+    row_data = db.Column(db.Text)
+    row_order = db.Column(db.Integer)
+    origem = db.Column(db.String(300))  # arquivo importado
+    removido_em = db.Column(db.DateTime, default=datetime.utcnow)
+    removido_por = db.Column(db.Integer, db.ForeignKey('users.id'))
+
+    def get_data(self):
+        return json.loads(self.row_data) if self.row_data else {}
+
+    def __repr__(self):
+        return f'<RegistroRemovido {self.aba_name} - Reg {self.registro_id}>'
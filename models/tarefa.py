@@ -0,0 +1,35 @@
+from datetime import datetime
+from models import db
+import json
+
+
+class Tarefa(db.Model):
+    """Tarefa de geração de relatório/exportação executada fora da requisição"""
+    __tablename__ = 'tarefa'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)  # chave de utils.tarefas.TIPOS
+    aba_name = db.Column(db.String(100), nullable=False)
+    parametros = db.Column(db.Text)  # JSON com os parâmetros do tipo
+    chave = db.Column(db.String(40), nullable=False, index=True)  # (tipo, aba, versão dos dados, parâmetros)
+    status = db.Column(db.String(20), nullable=False, default='pendente', index=True)  # pendente, executando, concluida, erro
+    progresso = db.Column(db.Integer, default=0)  # 0 a 100
+    mensagem = db.Column(db.String(300))
+    arquivo = db.Column(db.String(300))  # caminho do artefato gerado
+    nome_download = db.Column(db.String(300))
+    mimetype = db.Column(db.String(100))
+    criado_por = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime)  # última gravação de progresso (tarefas interrompidas)
+    concluido_em = db.Column(db.DateTime)
+    expira_em = db.Column(db.DateTime, index=True)
+
+    def get_parametros(self):
+        return json.loads(self.parametros) if self.parametros else {}
+
+    def set_parametros(self, parametros):
+        self.parametros = json.dumps(parametros or {}, ensure_ascii=False, sort_keys=True)
+
+    def __repr__(self):
+        return f'<Tarefa {self.id} {self.tipo} {self.aba_name} - {self.status}>'
@@ -0,0 +1,31 @@
+"""Script para reconstruir do zero os agregados do analytics
+
+Uso:
+    python reconstruir_agregados.py              (todas as abas)
+    python reconstruir_agregados.py "Nome da aba"
+"""
+
+import sys
+from app import app
+from utils.agregados import garantir_agregados, reconstruir_agregados, agregados_da_aba, total_de_registros
+from models.planilha import AbaConfig
+
+def reconstruir(aba_name=None):
+    """Recria a tabela/triggers se necessário e recalcula as contagens"""
+
+    with app.app_context():
+        garantir_agregados()
+        reconstruir_agregados(aba_name)
+
+        consulta = AbaConfig.query.order_by(AbaConfig.display_order)
+        if aba_name:
+            consulta = consulta.filter_by(aba_name=aba_name)
+
+        print("Agregados reconstruídos:\n")
+        for aba in consulta:
+            agregados = agregados_da_aba(aba.aba_name)
+            papeis = ', '.join(f'{papel}={len(valores)}' for papel, valores in agregados.items() if papel != '*')
+            print(f"  {aba.aba_name}: {total_de_registros(agregados)} registros ({papeis or 'sem papéis'})")
+
+if __name__ == '__main__':
+    reconstruir(sys.argv[1] if len(sys.argv) > 1 else None)
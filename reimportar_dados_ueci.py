@@ -3,6 +3,8 @@
 import pandas as pd
 from app import app, db
 from models.planilha import PlanilhaData, AbaConfig
+from models.prazo import Prazo
+from utils.mapeamento_cabecalhos import mapeador_da_aba
 from datetime import datetime
 
 def limpar_dados_ueci():
@@ -10,6 +12,7 @@ def limpar_dados_ueci():
     with app.app_context():
         print("Limpando dados antigos da UECI...")
         PlanilhaData.query.filter_by(aba_name='Plano de Ação - UECI').delete()
+        Prazo.query.filter_by(aba_name='Plano de Ação - UECI').delete()
         db.session.commit()
         print("✅ Dados antigos removidos\n")
 
@@ -37,38 +40,14 @@ def reimportar_excel():
         campos_ueci = aba.get_columns()
         print(f"Campos configurados na UECI: {len(campos_ueci)}\n")
         
-        # Mapear colunas do Excel para campos da UECI
-        mapeamento = {
-            'Exercício': ['Exercício', 'EXERCÍCIO', 'Ano'],
-            'Data do Envio': ['Data do Envio', 'DATA DO ENVIO', 'Data Envio'],
-            'Data da Ciência': ['Data da Ciência', 'DATA DA CIÊNCIA', 'Data Ciencia', 'Data da Ciencia'],
-            'Responsável pela Análise': ['Responsável pela Análise', 'RESPONSÁVEL PELA ANÁLISE', 'Responsavel pela Analise'],
-            'Origem': ['Origem', 'ORIGEM'],
-            'Tipo de Ação': ['Tipo de Ação', 'TIPO DE AÇÃO', 'Tipo de Acao'],
-            'E-docs': ['E-docs', 'E-DOCS', 'Edocs', 'E docs'],
-            'Ponto de Controle': ['Ponto de Controle', 'PONTO DE CONTROLE'],
-            'Unidade Gestora': ['UG', 'Unidade Gestora', 'UNIDADE GESTORA'],
-            'Constatação': ['Constatação', 'CONSTATAÇÃO', 'Constatacao'],
-            'Recomendação': ['Recomendação', 'RECOMENDAÇÃO', 'Recomendacao'],
-            'Riscos Envolvidos': ['Riscos Envolvidos', 'RISCOS ENVOLVIDOS'],
-            'STATUS DA RECOMENDAÇÃO - Qual é a situação atual da recomendação?': ['STATUS DA RECOMENDAÇÃO', 'Status da Recomendação', 'Status'],
-            'Setor(es) responsável(is)': ['Setor(es) responsável(is)', 'Setor responsável', 'Setor'],
-            'Servidor (es) responsável': ['Servidor(es) responsável(is)', 'Servidor (es) responsável', 'Servidor responsável', 'Servidor'],
-            'Iniciativa da área': ['Iniciativa da área', 'INICIATIVA DA ÁREA', 'Retorno da área', 'Retorno'],
-            'Data da Resposta': ['Data da Resposta', 'DATA DA RESPOSTA', 'Data Resposta'],
-            'Prazo previsto de início': ['Prazo previsto de início', 'PRAZO PREVISTO DE INÍCIO', 'Prazo inicio'],
-            'Prazo previsto de término': ['Prazo previsto de término', 'PRAZO PREVISTO DE TÉRMINO', 'Prazo termino', 'Prazo previsto de conclusão'],
-            'Status para a UECI': ['Status para a UECI', 'STATUS PARA A UECI'],
-            'Análise do retorno da área': ['Análise do retorno da área', 'ANÁLISE DO RETORNO DA ÁREA', 'Analise']
-        }
+        # Mapear colunas do Excel para campos da UECI (apelidos em utils.mapeamento_cabecalhos)
+        mapeamento = mapeador_da_aba(aba).mapear(df.columns)
+        for coluna_excel, campo in mapeamento.aproximados.items():
+            print(f"Coluna '{coluna_excel}' mapeada para '{campo}' (nome parecido)")
         
         def encontrar_coluna(campo_destino):
             """Encontra a coluna do Excel que corresponde ao campo"""
-            if campo_destino in mapeamento:
-                for variacao in mapeamento[campo_destino]:
-                    if variacao in df.columns:
-                        return variacao
-            return None
+            return mapeamento.coluna(campo_destino)
         
         def formatar_data(valor):
             """Converte data para formato YYYY-MM-DD"""
@@ -2,6 +2,7 @@
 
 from app import app, db
 from models.planilha import PlanilhaData
+from models.prazo import Prazo
 
 def resetar_tcees():
     """Remove todos os registros TCEES e deixa apenas 2"""
@@ -11,6 +12,7 @@ def resetar_tcees():
         
         # Remover TODOS os registros TCEES
         total_removido = PlanilhaData.query.filter_by(aba_name='Plano de Ação - TCEES').delete()
+        Prazo.query.filter_by(aba_name='Plano de Ação - TCEES').delete()
         print(f"Removidos {total_removido} registros antigos\n")
         
         db.session.commit()
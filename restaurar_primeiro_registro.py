@@ -1,5 +1,6 @@
 from app import app, db
-from models.planilha import PlanilhaData
+from models.planilha import PlanilhaData, AbaConfig
+from utils.mapeamento_cabecalhos import mapeador_da_aba
 import pandas as pd
 
 app.app_context().push()
@@ -11,31 +12,13 @@ df = pd.read_excel(excel_file)
 # Pegar primeira linha do Excel
 primeira_linha = df.iloc[0]
 
-# Mapeamento dos campos
-mapeamento = {
-    'Exercício': 'Exercício',
-    'Data do Envio': 'Data do Envio',
-    'Data da Ciência': 'Data da Ciência',
-    'Responsável pela Análise': 'Responsável pela Análise',
-    'Origem': 'Origem',
-    'Tipo de Ação': 'Tipo de Ação',
-    'E-docs': 'E-docs',
-    'Ponto de Controle': 'Ponto de Controle',
-    'Recomendação': 'Recomendação',
-    'Riscos Envolvidos': 'Riscos Envolvidos',
-    'STATUS DA RECOMENDAÇÃO\nQual é a situação atual da recomendação?': 'STATUS DA RECOMENDAÇÃO',
-    'Servidor (es) responsável': 'Servidor(es) responsável(is)',
-    'Iniciativa da área': 'Iniciativa da área',
-    'Data da Resposta': 'Data da Resposta',
-    'Prazo previsto de ínicio': 'Prazo previsto de início',
-    'Prazo previsto de término': 'Prazo previsto de conclusão',
-    'Status para a UECI': 'Status para a UECI',
-    'Análise do retorno da área': 'Análise do retorno da área'
-}
+# Mapeamento das colunas do Excel para os campos configurados da UECI
+ueci = AbaConfig.query.filter_by(aba_name='Plano de Ação - UECI').first()
+mapeamento = mapeador_da_aba(ueci).mapear(df.columns)
 
 # Construir dados restaurados
 dados_restaurados = {}
-for col_excel, col_ueci in mapeamento.items():
+for col_excel, col_ueci in mapeamento.pares():
     if col_excel in df.columns:
         valor = primeira_linha[col_excel]
         
@@ -3,6 +3,9 @@ from flask_login import login_required, current_user
 from models import db
 from models.configuracoes import ConfiguracaoSistema, DropdownConfig
 from models.planilha import AbaConfig
+from utils.colunas_geradas import PAPEIS, PAPEL_NENHUM, sincronizar_colunas_geradas
+from utils.esquema import invalidar_esquema
+from utils.migracoes import migrar_datas_iso
 from functools import wraps
 
 config_bp = Blueprint('configuracoes', __name__, url_prefix='/configuracoes')
@@ -271,6 +274,9 @@ def salvar_colunas(aba_name):
     try:
         aba.set_columns(colunas)
         db.session.commit()
+        invalidar_esquema(aba_name)
+        sincronizar_colunas_geradas()
+        migrar_datas_iso(aba_name)
         return jsonify({'success': True, 'message': 'Colunas atualizadas com sucesso!'})
     except Exception as e:
         db.session.rollback()
@@ -285,6 +291,7 @@ def editar_coluna(aba_name, index):
 
     nome = data.get('nome', '').strip()
     tipo = data.get('tipo', 'text')
+    papel = data.get('papel')
 
     if not nome:
         return jsonify({'success': False, 'message': 'Nome da coluna é obrigatório'}), 400
@@ -294,10 +301,18 @@ def editar_coluna(aba_name, index):
     if index < 0 or index >= len(colunas):
         return jsonify({'success': False, 'message': 'Índice inválido'}), 400
 
-    # Atualizar coluna
-    nome_antigo = colunas[index].get('name') if isinstance(colunas[index], dict) else colunas[index]
+    if papel and papel not in PAPEIS and papel != PAPEL_NENHUM:
+        return jsonify({'success': False, 'message': 'Papel inválido'}), 400
+
+    # Atualizar coluna (mantendo o papel atual se não for informado; '' = detectar pelo nome)
+    coluna_antiga = colunas[index] if isinstance(colunas[index], dict) else {'name': colunas[index]}
+    nome_antigo = coluna_antiga.get('name')
     colunas[index] = {'name': nome, 'type': tipo}
 
+    papel = coluna_antiga.get('papel') if papel is None else papel
+    if papel:
+        colunas[index]['papel'] = papel
+
     # Atualizar lista de colunas laranjas se necessário
     orange_cols = aba.get_orange_columns()
     if nome_antigo in orange_cols:
@@ -307,6 +322,9 @@ def editar_coluna(aba_name, index):
     try:
         aba.set_columns(colunas)
         db.session.commit()
+        invalidar_esquema(aba_name)
+        sincronizar_colunas_geradas()
+        migrar_datas_iso(aba_name)
         return jsonify({'success': True, 'message': 'Coluna atualizada com sucesso!'})
     except Exception as e:
         db.session.rollback()
@@ -326,6 +344,7 @@ def manage_orange_columns(aba_name):
         try:
             aba.set_orange_columns(orange_names)
             db.session.commit()
+            invalidar_esquema(aba_name)
             return jsonify({'success': True, 'message': 'Colunas laranjas atualizadas!'})
         except Exception as e:
             db.session.rollback()
@@ -1,17 +1,28 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app,
+                   Response, stream_with_context)
 from flask_login import login_required, current_user
 from models import db
 from models.planilha import PlanilhaData, AbaConfig
 from models.configuracoes import DropdownConfig
 from models.user import User
 from models.link_temporario import LinkTemporario  # ✅ ADICIONAR ESTA LINHA
-from datetime import datetime, timedelta
-import pandas as pd
-from io import BytesIO
-from openpyxl.styles import Font, PatternFill, Alignment
+from models.prazo import Prazo
+from utils.prazos import TIPO_TERMINO
+from utils.colunas_geradas import PAPEIS, filtrar_por_papeis
+from utils.consulta_linhas import parametros_da_requisicao, montar_consulta, pagina as pagina_linhas
+from utils.busca import buscar, busca_disponivel
+from utils.esquema import esquema_da_aba
+from utils.versoes import versoes_ativas, resposta_com_etag
+from utils.sqlite_funcoes import normalizar
+from utils.relatorios import nome_planilha_excel, nome_consolidado_excel
+from utils.artefatos import enviar_artefato
+from utils.tarefas import gerar_artefato, TODAS_AS_ABAS
+from utils.exportacao import campos_da_exportacao, registros_filtrados, parquet_disponivel, FORMATOS_STREAMING
+from utils.plano_respostas import artefato_plano_respostas, nome_plano_respostas_pdf, blocos_zip_planos, nome_zip_planos, MIMETYPE_ZIP
+from datetime import datetime, timedelta, date
+from urllib.parse import quote
 import secrets
 import hashlib
-import unicodedata
 
 main_bp = Blueprint('main', __name__)
 
@@ -74,31 +85,15 @@ def preenchimento_externo(token):
         return render_template('preenchimento_externo.html', erro='Configuração não encontrada')
 
     # Pegar TODAS as colunas e separar editáveis
-    colunas_todas = aba_config.get_columns()
-    orange_columns = aba_config.get_orange_columns()
-    colunas_editaveis = [col for col in colunas_todas if (col.get('name') if isinstance(col, dict) else col) in orange_columns]
-    colunas_editaveis_nomes = [col.get('name') if isinstance(col, dict) else col for col in colunas_editaveis]
+    esquema = esquema_da_aba(aba_config)
+    colunas_todas = esquema.colunas
+    colunas_editaveis = esquema.colunas_laranja
+    colunas_editaveis_nomes = esquema.nomes_laranja
 
     if request.method == 'POST':
         # Processar preenchimento APENAS das colunas editáveis
         dados_atuais = registro.get_data()
-
-        for col in colunas_editaveis:
-            col_name = col.get('name') if isinstance(col, dict) else col
-            valor = request.form.get(col_name, '').strip()
-
-            # Converter data se necessário
-            col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-            if col_type == 'date' and valor:
-                try:
-                    if '/' in valor:
-                        date_parts = valor.split('/')
-                        if len(date_parts) == 3:
-                            valor = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-                except:
-                    pass
-
-            dados_atuais[col_name] = valor
+        dados_atuais.update(esquema.ler_formulario(request.form, colunas_editaveis_nomes, strip=True))
 
         registro.set_data(dados_atuais)
         registro.updated_at = datetime.utcnow()
@@ -122,16 +117,6 @@ def preenchimento_externo(token):
 @main_bp.route('/preencher/<token>/gerar-pdf')
 def gerar_pdf_preenchimento(token):
     """Gera PDF do preenchimento"""
-    import re
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib import colors
-    from reportlab.lib.enums import TA_JUSTIFY
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import cm
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from io import BytesIO
-    from xml.sax.saxutils import escape
-
     # Buscar link
     link = LinkTemporario.query.filter_by(token=token).first()
     if not link:
@@ -150,163 +135,12 @@ def gerar_pdf_preenchimento(token):
         flash('Configuração não encontrada', 'danger')
         return redirect(url_for('main.index'))
 
-    # Criar PDF em memória
-    buffer = BytesIO()
-
-    # Configurar documento em paisagem
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=landscape(A4),
-        rightMargin=1*cm,
-        leftMargin=1*cm,
-        topMargin=2*cm,
-        bottomMargin=1.5*cm
-    )
-
-    # Elementos do PDF
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Estilo para título
-    titulo_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=14,
-        textColor=colors.HexColor('#1e293b'),
-        spaceAfter=10,
-        alignment=1
-    )
-
-    # Estilo para subtítulo
-    subtitulo_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#64748b'),
-        spaceAfter=15,
-        alignment=1
-    )
-
-    # Cabeçalho
-    campo_style = ParagraphStyle(
-        'CampoPDF',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-        fontSize=8,
-        leading=10,
-        textColor=colors.whitesmoke
-    )
-
-    valor_style = ParagraphStyle(
-        'ValorPDF',
-        parent=styles['Normal'],
-        fontName='Helvetica',
-        fontSize=8,
-        leading=11,
-        textColor=colors.HexColor('#1e293b'),
-        alignment=TA_JUSTIFY,
-        wordWrap='CJK'
-    )
-
-    def limpar_texto_pdf(valor):
-        """Remove espaços/quebras excessivas sem alterar o conteúdo."""
-        texto = str(valor).replace('\r', ' ').replace('\n', ' ')
-        texto = re.sub(r'\s+', ' ', texto).strip()
-        return texto or '-'
-
-    elements.append(Paragraph("UNIDADE EXECUTORA DE CONTROLE INTERNO - UECI", titulo_style))
-    elements.append(Paragraph(f"Plano de Respostas - {aba_config.aba_name}", subtitulo_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    # Preparar dados da tabela
     dados_registro = registro.get_data()
-    colunas = aba_config.get_columns()
-
-    # Criar lista de dados para a tabela (formato vertical)
-    table_data = []
-
-    for col in colunas:
-        col_name = col.get('name') if isinstance(col, dict) else col
-        valor = dados_registro.get(col_name, '-')
-
-        col_name_safe = escape(limpar_texto_pdf(col_name))
-        valor_safe = escape(limpar_texto_pdf(valor))
-
-        # Adicionar linha [Campo | Valor]
-        table_data.append([
-            Paragraph(f"<b>{col_name_safe}</b>", campo_style),
-            Paragraph(valor_safe, valor_style)
-        ])
-
-    # Criar tabela (2 colunas: campo e valor)
-    table = Table(table_data, colWidths=[5.8*cm, 20.2*cm], splitByRow=1)
-
-    # Estilo da tabela
-    table.setStyle(TableStyle([
-        # Coluna de campos (esquerda)
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (0, -1), 8),
-        ('LEFTPADDING', (0, 0), (0, -1), 8),
-        ('RIGHTPADDING', (0, 0), (0, -1), 8),
-        ('TOPPADDING', (0, 0), (0, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (0, -1), 6),
-
-        # Coluna de valores (direita)
-        ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#f8fafc')),
-        ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1e293b')),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (1, 0), (1, -1), 8),
-        ('RIGHTPADDING', (1, 0), (1, -1), 8),
-        ('LEFTPADDING', (1, 0), (1, -1), 8),
-        ('TOPPADDING', (1, 0), (1, -1), 5),
-        ('BOTTOMPADDING', (1, 0), (1, -1), 5),
-        ('WORDWRAP', (1, 0), (1, -1), 'CJK'),
-
-        # Bordas
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-
-    elements.append(table)
-
-    # Rodapé
-    elements.append(Spacer(1, 0.5*cm))
-
-    rodape_style = ParagraphStyle(
-        'Rodape',
-        parent=styles['Normal'],
-        fontSize=7,
-        textColor=colors.HexColor('#94a3b8'),
-        alignment=1
-    )
-
-    elements.append(Paragraph(
-        f"Documento gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M')} | UECI",
-        rodape_style
-    ))
+    esquema = esquema_da_aba(aba_config)
 
-    # Construir PDF
     try:
-        doc.build(elements)
-        buffer.seek(0)
-
-        # Nome do arquivo
-        nota_num = dados_registro.get('Nº Nota Recomendatória', 'SemNumero')
-        if nota_num:
-            nota_num = str(nota_num).replace('/', '_').replace(' ', '_')
-
-        filename = f'Preenchimento_Nota_{nota_num}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        artefato = artefato_plano_respostas(aba_config.aba_name, esquema.nomes, dados_registro)
+        return enviar_artefato(artefato, nome_plano_respostas_pdf(dados_registro))
 
     except Exception as e:
         print(f"Erro ao gerar PDF: {str(e)}")
@@ -331,208 +165,214 @@ def finalizar_preenchimento(token):
 @main_bp.route('/api/calendario/prazos')
 @login_required
 def get_calendario_prazos():
-    """Retorna eventos para o calendário"""
-    from datetime import date
-    import unicodedata
+    """Retorna eventos para o calendário (com ETag pela versão dos dados das abas)"""
+    hoje = date.today()
 
-    def remove_acentos(texto):
-        nfkd = unicodedata.normalize('NFKD', texto)
-        return ''.join([c for c in nfkd if not unicodedata.combining(c)])
+    # O FullCalendar informa o intervalo visível (start/end); sem ele, retorna tudo
+    inicio = request.args.get('start', '')[:10]
+    fim = request.args.get('end', '')[:10]
 
-    print("\n" + "=" * 70)
-    print("CARREGANDO CALENDÁRIO")
-    print("=" * 70)
+    chave = ('calendario', versoes_ativas(), inicio, fim, hoje.isoformat())
+    return resposta_com_etag(chave, lambda: eventos_calendario(inicio, fim, hoje))
 
-    eventos = []
-    hoje = date.today()
 
-    abas = AbaConfig.query.filter_by(is_active=True).all()
-
-    for aba in abas:
-        print(f"\nABA: {aba.aba_name}")
-        registros = PlanilhaData.query.filter_by(aba_name=aba.aba_name).all()
-
-        for registro in registros:
-            dados = registro.get_data()
-
-            for campo_nome, valor in dados.items():
-                if not valor:
-                    continue
-
-                campo_normalizado = remove_acentos(campo_nome.lower())
-
-                # Verificar prazo de término OU data limite de retorno
-                eh_prazo_termino = 'prazo' in campo_normalizado and 'termino' in campo_normalizado
-                eh_data_limite_retorno = 'data' in campo_normalizado and 'limite' in campo_normalizado and 'retorno' in campo_normalizado
-
-                if eh_prazo_termino or eh_data_limite_retorno:
-                    tipo_prazo = "Término" if eh_prazo_termino else "Retorno da Área"
-                    icone = "📅" if eh_prazo_termino else "📬"
-
-                    try:
-                        data_prevista = None
-                        data_formatada = str(valor).strip()
-
-                        if '/' in data_formatada:
-                            parts = data_formatada.split('/')
-                            if len(parts) == 3 and len(parts[2]) == 4:
-                                data_prevista = date(int(parts[2]), int(parts[1]), int(parts[0]))
-                        elif '-' in data_formatada:
-                            data_limpa = data_formatada.split(' ')[0]
-                            parts = data_limpa.split('-')
-                            if len(parts) == 3 and len(parts[0]) == 4:
-                                data_prevista = date(int(parts[0]), int(parts[1]), int(parts[2]))
-                                data_formatada = f"{parts[2]}/{parts[1]}/{parts[0]}"
-
-                        if data_prevista:
-                            diferenca = (data_prevista - hoje).days
-
-                            nota_recomendatoria = dados.get('Nº Nota Recomendatória', '')
-                            identificacao = f"Nota {nota_recomendatoria}" if nota_recomendatoria else f'Reg #{registro.id}'
-
-                            recomendacao = dados.get('Recomendação', '')[:100] or dados.get('Constatação', '')[:100]
-                            if recomendacao:
-                                if len(recomendacao) > 100:
-                                    recomendacao = recomendacao[:100] + '...'
-
-                            if diferenca < 0:
-                                classe = 'fc-event-vencido'
-                                status = f'Vencido há {abs(diferenca)} dia(s)'
-                                badge = 'danger'
-                            elif diferenca == 0:
-                                classe = 'fc-event-hoje'
-                                status = 'Vence Hoje'
-                                badge = 'warning'
-                            elif diferenca <= 7:
-                                classe = 'fc-event-proximo'
-                                status = f'Em {diferenca} dia(s)'
-                                badge = 'info'
-                            else:
-                                classe = 'fc-event-futuro'
-                                status = f'Em {diferenca} dias'
-                                badge = 'success'
-
-                            evento = {
-                                'title': f'{icone} {tipo_prazo}: {identificacao}',
-                                'start': data_prevista.isoformat(),
-                                'className': classe,
-                                'extendedProps': {
-                                    'aba_name': aba.aba_name,
-                                    'registro_id': registro.id,
-                                    'descricao': recomendacao or identificacao,
-                                    'data_formatada': data_formatada,
-                                    'status_texto': status,
-                                    'badge_color': badge,
-                                    'dias': diferenca,
-                                    'tipo_prazo': tipo_prazo
-                                }
-                            }
-                            eventos.append(evento)
-                            print(f"  ✓ Evento: {data_formatada} - {tipo_prazo} - {status}")
-                    except:
-                        pass
-
-    print(f"\nTOTAL EVENTOS: {len(eventos)}")
+def eventos_calendario(inicio, fim, hoje):
+    """Monta os eventos do calendário a partir do índice de prazos"""
+    eventos = []
 
-    return jsonify({
+    consulta = db.session.query(Prazo).join(
+        AbaConfig, AbaConfig.aba_name == Prazo.aba_name
+    ).filter(AbaConfig.is_active == True)
+
+    if inicio:
+        consulta = consulta.filter(Prazo.data >= inicio)
+    if fim:
+        consulta = consulta.filter(Prazo.data < fim)
+
+    for prazo in consulta.order_by(Prazo.data).all():
+        data_prevista = date.fromisoformat(prazo.data)
+        diferenca = (data_prevista - hoje).days
+
+        eh_prazo_termino = prazo.tipo == TIPO_TERMINO
+        tipo_prazo = "Término" if eh_prazo_termino else "Retorno da Área"
+        icone = "📅" if eh_prazo_termino else "📬"
+
+        identificacao = f"Nota {prazo.nota}" if prazo.nota else f'Reg #{prazo.registro_id}'
+
+        if diferenca < 0:
+            classe = 'fc-event-vencido'
+            status = f'Vencido há {abs(diferenca)} dia(s)'
+            badge = 'danger'
+        elif diferenca == 0:
+            classe = 'fc-event-hoje'
+            status = 'Vence Hoje'
+            badge = 'warning'
+        elif diferenca <= 7:
+            classe = 'fc-event-proximo'
+            status = f'Em {diferenca} dia(s)'
+            badge = 'info'
+        else:
+            classe = 'fc-event-futuro'
+            status = f'Em {diferenca} dias'
+            badge = 'success'
+
+        eventos.append({
+            'title': f'{icone} {tipo_prazo}: {identificacao}',
+            'start': prazo.data,
+            'className': classe,
+            'extendedProps': {
+                'aba_name': prazo.aba_name,
+                'registro_id': prazo.registro_id,
+                'descricao': prazo.descricao or identificacao,
+                'data_formatada': data_prevista.strftime('%d/%m/%Y'),
+                'status_texto': status,
+                'badge_color': badge,
+                'dias': diferenca,
+                'tipo_prazo': tipo_prazo
+            }
+        })
+
+    return {
         'success': True,
         'eventos': eventos
-    })
+    }
 
 
 @main_bp.route('/planilha/<aba_name>')
 @login_required
 def view_planilha(aba_name):
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
-    registros = PlanilhaData.query.filter_by(aba_name=aba_name).order_by(PlanilhaData.row_order).all()
+
+    # Filtros opcionais por papel (?status=...&setor=...) resolvidos no SQL
+    filtros = {papel: request.args.get(papel) for papel in PAPEIS if request.args.get(papel)}
+    consulta = filtrar_por_papeis(PlanilhaData.query.filter_by(aba_name=aba_name), filtros)
+
+    # Modo paginado: a tabela carrega as linhas sob demanda via /api/planilha/<aba>/rows
+    modo = request.args.get('modo')
+    if modo == 'paginado':
+        modo_paginado = True
+    elif modo == 'completo':
+        modo_paginado = False
+    else:
+        modo_paginado = consulta.count() > current_app.config.get('PLANILHA_LIMITE_RENDERIZACAO', 300)
+
+    registros = [] if modo_paginado else consulta.order_by(PlanilhaData.row_order).all()
     dropdown_rows = DropdownConfig.query.filter_by(
         aba_name=aba_name,
         is_active=True
     ).order_by(DropdownConfig.ordem).all()
 
-    # Converter JSON para lista de dicionários
+    esquema = esquema_da_aba(aba)
+
+    # Converter JSON para lista de dicionários (datas em dd/mm/aaaa)
     data = []
     for reg in registros:
         row = reg.get_data()
         row['id'] = reg.id
-
-        # Converter datas para formato brasileiro (dd/mm/aaaa)
-        columns = aba.get_columns()
-        for col in columns:
-            col_name = col.get('name', col) if isinstance(col, dict) else col
-            col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-
-            if col_type == 'date' and col_name in row and row[col_name]:
-                try:
-                    valor = str(row[col_name])
-                    if ' ' in valor:
-                        valor = valor.split(' ')[0]
-
-                    if '-' in valor:
-                        date_parts = valor.split('-')
-                        if len(date_parts) == 3:
-                            row[col_name] = f"{date_parts[2]}/{date_parts[1]}/{date_parts[0]}"
-                except:
-                    pass
-
+        esquema.formatar_para_exibicao(row)
         data.append(row)
 
-    def normalize_field_name(name):
-        text = str(name or '').strip().lower()
-        text = ''.join(
-            c for c in unicodedata.normalize('NFKD', text)
-            if not unicodedata.combining(c)
-        )
-        return ' '.join(text.split())
-
-    columns = aba.get_columns()
-    orange_columns = aba.get_orange_columns()
-
-    dropdown_index = {}
-    for dropdown in dropdown_rows:
-        dropdown_index[normalize_field_name(dropdown.campo_nome)] = dropdown.get_opcoes()
-
     dropdown_configs = {}
-    for col in columns:
-        col_name = col.get('name', col) if isinstance(col, dict) else col
-        matched_options = dropdown_index.get(normalize_field_name(col_name))
-        if matched_options:
+    for dropdown in dropdown_rows:
+        col_name = esquema.nomes_normalizados.get(normalizar(dropdown.campo_nome))
+        matched_options = dropdown.get_opcoes()
+        if col_name and matched_options:
             dropdown_configs[col_name] = matched_options
 
     return render_template('planilha.html',
                          aba=aba,
                          data=data,
-                         columns=columns,
-                         orange_columns=orange_columns,
+                         columns=esquema.colunas,
+                         orange_columns=esquema.laranjas,
                          dropdown_configs=dropdown_configs,
-                         aba_name=aba_name)
+                         aba_name=aba_name,
+                         modo_paginado=modo_paginado,
+                         filtros=filtros)
 
 
-@main_bp.route('/planilha/<aba_name>/add', methods=['POST'])
+@main_bp.route('/api/planilha/<aba_name>/rows')
 @login_required
-def add_row(aba_name):
+def api_planilha_rows(aba_name):
+    """Página de linhas com ordenação, busca e filtros feitos no SQL"""
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
+    esquema = esquema_da_aba(aba)
+    params = parametros_da_requisicao(request.args)
+
+    total, registros = pagina_linhas(esquema, params)
+
+    rows = []
+    for reg in registros:
+        row = reg.get_data()
+        row['id'] = reg.id
+        esquema.formatar_para_exibicao(row)
+        rows.append(row)
+
+    return jsonify({
+        'success': True,
+        'total': total,
+        'offset': params['offset'],
+        'limit': params['limit'],
+        'rows': rows
+    })
+
+
+@main_bp.route('/api/planilha/<aba_name>/export.<formato>')
+@login_required
+def api_planilha_export(aba_name, formato):
+    """Exporta em CSV, NDJSON ou Parquet, em streaming, as linhas filtradas como na grade
+
+    Aceita os mesmos parâmetros de /rows (q, sort, dir e filtros por papel; sem
+    paginação) e fields=a,b,... para escolher as colunas.
+    """
+    if formato not in FORMATOS_STREAMING:
+        return jsonify({'success': False, 'message': 'Formato inválido (use csv, ndjson ou parquet)'}), 404
+    if formato == 'parquet' and not parquet_disponivel():
+        return jsonify({'success': False, 'message': 'Exportação Parquet requer o pacote pyarrow'}), 501
+
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
+    esquema = esquema_da_aba(aba)
+    try:
+        campos = campos_da_exportacao(aba.aba_name, esquema, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    consulta = montar_consulta(esquema, parametros_da_requisicao(request.args))
+    gerador, mimetype = FORMATOS_STREAMING[formato]
+    nome = f'{aba.aba_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{formato}'
+
+    return Response(
+        stream_with_context(gerador(registros_filtrados(consulta), campos)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(nome)}"}
+    )
 
-    form_data = {}
-    columns = aba.get_columns()
 
-    for col in columns:
-        col_name = col.get('name', col) if isinstance(col, dict) else col
-        col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-        valor = request.form.get(col_name, '')
+@main_bp.route('/api/busca')
+@login_required
+def api_busca():
+    """Busca textual ranqueada (FTS5) em uma aba ou em todas as abas ativas"""
+    q = request.args.get('q', '').strip()
+    aba_name = request.args.get('aba') or None
+    limite = min(request.args.get('limit', 50, type=int) or 50, 200)
+
+    if not q:
+        return jsonify({'success': True, 'resultados': []})
+
+    if not busca_disponivel():
+        return jsonify({'success': False, 'message': 'Busca textual indisponível'}), 503
 
-        if col_type == 'date' and valor:
-            try:
-                if '/' in valor:
-                    date_parts = valor.split('/')
-                    if len(date_parts) == 3:
-                        valor = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-                elif ' ' in valor:
-                    valor = valor.split(' ')[0]
-            except:
-                pass
+    return jsonify({
+        'success': True,
+        'resultados': buscar(q, aba_name=aba_name, limite=limite)
+    })
+
+
+@main_bp.route('/planilha/<aba_name>/add', methods=['POST'])
+@login_required
+def add_row(aba_name):
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
 
-        form_data[col_name] = valor
+    form_data = esquema_da_aba(aba).ler_formulario(request.form)
 
     max_order = db.session.query(db.func.max(PlanilhaData.row_order)).filter_by(aba_name=aba_name).scalar() or 0
 
@@ -554,117 +394,59 @@ def add_row(aba_name):
 @main_bp.route('/api/alertas/prazos')
 @login_required
 def get_alertas_prazos():
-    """Retorna alertas de prazos próximos ou vencidos"""
-    from datetime import date
-    import unicodedata
-
-    def remove_acentos(texto):
-        nfkd = unicodedata.normalize('NFKD', texto)
-        return ''.join([c for c in nfkd if not unicodedata.combining(c)])
+    """Retorna alertas de prazos próximos ou vencidos (com ETag pela versão dos dados)"""
+    hoje = date.today()
+    chave = ('alertas', versoes_ativas(), hoje.isoformat())
+    return resposta_com_etag(chave, lambda: alertas_prazos(hoje))
 
-    print("\n" + "=" * 70)
-    print("VERIFICANDO ALERTAS DE PRAZO")
-    print("=" * 70)
 
+def alertas_prazos(hoje):
+    """Prazos vencidos ou que vencem nos próximos 7 dias (até 15)"""
     alertas = []
-    hoje = date.today()
-    print(f"Data de hoje: {hoje}")
-
-    abas = AbaConfig.query.filter_by(is_active=True).all()
-    print(f"\nAbas ativas: {len(abas)}")
-
-    for aba in abas:
-        print(f"\n{'=' * 70}")
-        print(f"ABA: {aba.aba_name}")
-        print("=" * 70)
-
-        registros = PlanilhaData.query.filter_by(aba_name=aba.aba_name).all()
-        print(f"Registros: {len(registros)}")
-
-        for idx, registro in enumerate(registros, 1):
-            dados = registro.get_data()
-
-            for campo_nome, valor in dados.items():
-                if not valor:
-                    continue
-
-                campo_normalizado = remove_acentos(campo_nome.lower())
-
-                eh_prazo_termino = 'prazo' in campo_normalizado and 'termino' in campo_normalizado
-                eh_data_limite_retorno = 'data' in campo_normalizado and 'limite' in campo_normalizado and 'retorno' in campo_normalizado
-
-                if eh_prazo_termino or eh_data_limite_retorno:
-                    tipo_prazo = "Prazo de Término" if eh_prazo_termino else "Data Limite de Retorno da Área"
-
-                    print(f"\nReg #{idx} (ID:{registro.id}) - Campo: '{campo_nome}'")
-                    print(f"  Tipo: {tipo_prazo}")
-                    print(f"  Valor: '{valor}'")
-
-                    try:
-                        data_prevista = None
-                        data_formatada = str(valor).strip()
-
-                        if '/' in data_formatada:
-                            parts = data_formatada.split('/')
-                            if len(parts) == 3 and len(parts[2]) == 4:
-                                data_prevista = date(int(parts[2]), int(parts[1]), int(parts[0]))
-                        elif '-' in data_formatada:
-                            data_limpa = data_formatada.split(' ')[0]
-                            parts = data_limpa.split('-')
-                            if len(parts) == 3 and len(parts[0]) == 4:
-                                data_prevista = date(int(parts[0]), int(parts[1]), int(parts[2]))
-                                data_formatada = f"{parts[2]}/{parts[1]}/{parts[0]}"
-
-                        if data_prevista:
-                            diferenca = (data_prevista - hoje).days
-                            print(f"  Data: {data_prevista}, Dif: {diferenca} dias")
-
-                            if diferenca <= 7:
-                                nota_recomendatoria = dados.get('Nº Nota Recomendatória', '')
-                                identificacao = f"Nota {nota_recomendatoria}" if nota_recomendatoria else f'Registro #{registro.id}'
-
-                                recomendacao = dados.get('Recomendação', '')[:100] or dados.get('Constatação', '')[:100]
-                                if recomendacao:
-                                    identificacao += f" - {recomendacao}"
-                                    if len(recomendacao) > 100:
-                                        identificacao += '...'
-
-                                if diferenca < 0:
-                                    tipo = 'vencido'
-                                    titulo = f'⚠️ {tipo_prazo} Vencido há {abs(diferenca)} dia(s)!'
-                                elif diferenca == 0:
-                                    tipo = 'hoje'
-                                    titulo = f'🔔 {tipo_prazo} Vence Hoje!'
-                                else:
-                                    tipo = 'proximo'
-                                    titulo = f'📅 {tipo_prazo} em {diferenca} dia(s)'
-
-                                alerta = {
-                                    'tipo': tipo,
-                                    'titulo': titulo,
-                                    'mensagem': identificacao,
-                                    'data_prevista': data_formatada,
-                                    'aba_name': aba.aba_name,
-                                    'registro_id': registro.id,
-                                    'dias': diferenca,
-                                    'tipo_prazo': tipo_prazo
-                                }
-                                alertas.append(alerta)
-                                print(f"  ✅ ALERTA: {titulo}")
-
-                    except Exception as e:
-                        print(f"  ❌ Erro: {e}")
-
-    alertas.sort(key=lambda x: x['dias'])
-
-    print(f"\n{'=' * 70}")
-    print(f"TOTAL DE ALERTAS: {len(alertas)}")
-    print("=" * 70)
-
-    return jsonify({
+    limite = (hoje + timedelta(days=7)).isoformat()
+
+    prazos = db.session.query(Prazo).join(
+        AbaConfig, AbaConfig.aba_name == Prazo.aba_name
+    ).filter(
+        AbaConfig.is_active == True,
+        Prazo.data <= limite
+    ).order_by(Prazo.data, Prazo.id).limit(15).all()
+
+    for prazo in prazos:
+        data_prevista = date.fromisoformat(prazo.data)
+        diferenca = (data_prevista - hoje).days
+
+        tipo_prazo = "Prazo de Término" if prazo.tipo == TIPO_TERMINO else "Data Limite de Retorno da Área"
+
+        identificacao = f"Nota {prazo.nota}" if prazo.nota else f'Registro #{prazo.registro_id}'
+        if prazo.descricao:
+            identificacao += f" - {prazo.descricao}"
+
+        if diferenca < 0:
+            tipo = 'vencido'
+            titulo = f'⚠️ {tipo_prazo} Vencido há {abs(diferenca)} dia(s)!'
+        elif diferenca == 0:
+            tipo = 'hoje'
+            titulo = f'🔔 {tipo_prazo} Vence Hoje!'
+        else:
+            tipo = 'proximo'
+            titulo = f'📅 {tipo_prazo} em {diferenca} dia(s)'
+
+        alertas.append({
+            'tipo': tipo,
+            'titulo': titulo,
+            'mensagem': identificacao,
+            'data_prevista': data_prevista.strftime('%d/%m/%Y'),
+            'aba_name': prazo.aba_name,
+            'registro_id': prazo.registro_id,
+            'dias': diferenca,
+            'tipo_prazo': tipo_prazo
+        })
+
+    return {
         'success': True,
-        'alertas': alertas[:15]
-    })
+        'alertas': alertas
+    }
 
 
 @main_bp.route('/planilha/<aba_name>/edit/<int:row_id>', methods=['POST'])
@@ -673,26 +455,7 @@ def edit_row(aba_name, row_id):
     registro = PlanilhaData.query.filter_by(id=row_id, aba_name=aba_name).first_or_404()
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
 
-    form_data = {}
-    columns = aba.get_columns()
-
-    for col in columns:
-        col_name = col.get('name', col) if isinstance(col, dict) else col
-        col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-        valor = request.form.get(col_name, '')
-
-        if col_type == 'date' and valor:
-            try:
-                if '/' in valor:
-                    date_parts = valor.split('/')
-                    if len(date_parts) == 3:
-                        valor = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-                elif ' ' in valor:
-                    valor = valor.split(' ')[0]
-            except:
-                pass
-
-        form_data[col_name] = valor
+    form_data = esquema_da_aba(aba).ler_formulario(request.form)
 
     registro.set_data(form_data)
     registro.updated_by = current_user.id
@@ -718,81 +481,49 @@ def delete_row(aba_name, row_id):
 @main_bp.route('/planilha/<aba_name>/export/excel')
 @login_required
 def export_planilha_excel(aba_name):
-    """Exporta a planilha para Excel com formatação profissional"""
+    """Exporta a planilha para Excel com formatação profissional (ou a já gerada, se atual)"""
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
-    registros = PlanilhaData.query.filter_by(aba_name=aba_name).order_by(PlanilhaData.row_order).all()
-    columns = aba.get_columns()
+    artefato = gerar_artefato('planilha_excel', aba.aba_name)
+    return enviar_artefato(artefato, nome_planilha_excel(aba.aba_name))
 
-    data = []
-    for reg in registros:
-        row_data = reg.get_data()
-
-        for col in columns:
-            col_name = col.get('name', col) if isinstance(col, dict) else col
-            col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-
-            if col_type == 'date' and col_name in row_data and row_data[col_name]:
-                try:
-                    valor = str(row_data[col_name])
-                    if ' ' in valor:
-                        valor = valor.split(' ')[0]
-
-                    if '-' in valor:
-                        date_parts = valor.split('-')
-                        if len(date_parts) == 3:
-                            row_data[col_name] = f"{date_parts[2]}/{date_parts[1]}/{date_parts[0]}"
-                except:
-                    pass
-
-        data.append(row_data)
-
-    df = pd.DataFrame(data)
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name=aba_name[:31], index=False)
-
-        workbook = writer.book
-        worksheet = writer.sheets[aba_name[:31]]
-
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF', size=11)
-        header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-
-            for cell in column:
-                try:
-                    cell_value = str(cell.value) if cell.value is not None else ''
-                    if len(cell_value) > max_length:
-                        max_length = len(cell_value)
-
-                    if cell.row > 1:
-                        cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-                except:
-                    pass
-
-            adjusted_width = min(max(max_length + 2, 10), 60)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-
-        worksheet.freeze_panes = 'A2'
-        worksheet.row_dimensions[1].height = 30
-
-    output.seek(0)
-    filename = f'{aba_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+
+@main_bp.route('/export/consolidado.xlsx')
+@login_required
+def export_consolidado_excel():
+    """Exporta todas as abas ativas numa só pasta do Excel (ou a já gerada, se atual)"""
+    artefato = gerar_artefato('consolidado_excel', TODAS_AS_ABAS)
+    return enviar_artefato(artefato, nome_consolidado_excel())
+
+
+@main_bp.route('/planilha/<aba_name>/export/planos.zip')
+@login_required
+def export_planos_zip(aba_name):
+    """ZIP com o PDF "Plano de Respostas" de cada registro selecionado, em streaming
+
+    Seleção por ids=1,2,3 ou, sem ids, pelos mesmos parâmetros de busca,
+    filtro e ordenação da grade.
+    """
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
+    esquema = esquema_da_aba(aba)
+
+    if request.args.get('ids'):
+        try:
+            ids = [int(valor) for valor in request.args['ids'].split(',') if valor.strip()]
+        except ValueError:
+            return jsonify({'success': False, 'message': 'ids inválidos'}), 400
+        consulta = PlanilhaData.query.filter(
+            PlanilhaData.aba_name == aba.aba_name, PlanilhaData.id.in_(ids)
+        ).order_by(PlanilhaData.row_order, PlanilhaData.id)
+    else:
+        consulta = montar_consulta(esquema, parametros_da_requisicao(request.args))
+
+    if not consulta.order_by(None).first():
+        return jsonify({'success': False, 'message': 'Nenhum registro selecionado'}), 404
+
+    return Response(
+        stream_with_context(blocos_zip_planos(aba.aba_name, esquema.nomes, registros_filtrados(consulta))),
+        mimetype=MIMETYPE_ZIP,
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(nome_zip_planos(aba.aba_name))}"}
     )
 
 
@@ -861,32 +592,15 @@ def preencher_area(aba_name, registro_id, token):
         return render_template('error.html', message='Link de acesso inválido ou expirado')
 
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
-    columns = aba.get_columns()
-    orange_columns = aba.get_orange_columns()
-    data = registro.get_data()
-
-    for col in columns:
-        col_name = col.get('name', col) if isinstance(col, dict) else col
-        col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-
-        if col_type == 'date' and col_name in data and data[col_name]:
-            try:
-                valor = str(data[col_name])
-                if ' ' in valor:
-                    valor = valor.split(' ')[0]
-                if '-' in valor:
-                    date_parts = valor.split('-')
-                    if len(date_parts) == 3:
-                        data[col_name] = f"{date_parts[2]}/{date_parts[1]}/{date_parts[0]}"
-            except:
-                pass
+    esquema = esquema_da_aba(aba)
+    data = esquema.formatar_para_exibicao(registro.get_data())
 
     return render_template('area_preencher.html',
                          aba_name=aba_name,
                          registro_id=registro_id,
                          token=token,
-                         columns=columns,
-                         orange_columns=orange_columns,
+                         columns=esquema.colunas,
+                         orange_columns=esquema.laranjas,
                          data=data)
 
 
@@ -915,27 +629,9 @@ def salvar_area(aba_name, registro_id, token):
                                token=token))
 
     aba = AbaConfig.query.filter_by(aba_name=aba_name).first_or_404()
-    orange_columns = aba.get_orange_columns()
-    columns = aba.get_columns()
+    esquema = esquema_da_aba(aba)
     data_atual = registro.get_data()
-
-    for col in columns:
-        col_name = col.get('name', col) if isinstance(col, dict) else col
-        col_type = col.get('type', 'text') if isinstance(col, dict) else 'text'
-
-        if col_name in orange_columns:
-            valor = request.form.get(col_name, '')
-
-            if col_type == 'date' and valor:
-                try:
-                    if '/' in valor:
-                        date_parts = valor.split('/')
-                        if len(date_parts) == 3:
-                            valor = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-                except:
-                    pass
-
-            data_atual[col_name] = valor
+    data_atual.update(esquema.ler_formulario(request.form, esquema.nomes_laranja))
 
     registro.set_data(data_atual)
     registro.updated_at = datetime.utcnow()
@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify, url_for
+from flask_login import login_required, current_user
+from models import db
+from models.planilha import AbaConfig
+from models.tarefa import Tarefa
+from utils.tarefas import enfileirar, artefato_disponivel, enviar_tarefa, TIPOS, CONCLUIDA, TODAS_AS_ABAS
+
+tarefas_bp = Blueprint('tarefas', __name__, url_prefix='/tarefas')
+
+
+def _situacao(tarefa):
+    """Representação JSON do andamento da tarefa"""
+    situacao = {
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'aba_name': tarefa.aba_name,
+        'status': tarefa.status,
+        'progresso': tarefa.progresso or 0,
+        'mensagem': tarefa.mensagem,
+        'criado_em': tarefa.created_at.isoformat() if tarefa.created_at else None,
+        'concluido_em': tarefa.concluido_em.isoformat() if tarefa.concluido_em else None,
+        'expira_em': tarefa.expira_em.isoformat() if tarefa.expira_em else None,
+        'download_url': None
+    }
+    if tarefa.status == CONCLUIDA:
+        situacao['download_url'] = url_for('tarefas.baixar_tarefa', tarefa_id=tarefa.id)
+    return situacao
+
+
+@tarefas_bp.route('', methods=['POST'])
+@login_required
+def criar_tarefa():
+    """Enfileira a geração de um relatório/exportação (ou reaproveita uma equivalente)"""
+    data = request.get_json(silent=True) or request.form
+    tipo = data.get('tipo')
+    aba_name = data.get('aba_name')
+
+    if tipo not in TIPOS:
+        return jsonify({'success': False, 'message': 'Tipo de tarefa inválido'}), 400
+
+    if 'versao' in TIPOS[tipo]:
+        aba_name = TODAS_AS_ABAS
+    elif not AbaConfig.query.filter_by(aba_name=aba_name).first():
+        return jsonify({'success': False, 'message': 'Aba não encontrada'}), 404
+
+    parametros = {'graficos': data.get('graficos')} if data.get('graficos') else {}
+    tarefa = enfileirar(tipo, aba_name, parametros, usuario_id=current_user.id)
+
+    return jsonify({'success': True, 'tarefa': _situacao(tarefa)}), 202
+
+
+@tarefas_bp.route('/<int:tarefa_id>')
+@login_required
+def situacao_tarefa(tarefa_id):
+    """Status e progresso da tarefa"""
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    if not tarefa:
+        return jsonify({'success': False, 'message': 'Tarefa não encontrada'}), 404
+
+    return jsonify({'success': True, 'tarefa': _situacao(tarefa)})
+
+
+@tarefas_bp.route('/<int:tarefa_id>/download')
+@login_required
+def baixar_tarefa(tarefa_id):
+    """Download do arquivo gerado pela tarefa"""
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    if not tarefa:
+        return jsonify({'success': False, 'message': 'Tarefa não encontrada'}), 404
+
+    if tarefa.status != CONCLUIDA:
+        return jsonify({'success': False, 'message': 'Tarefa ainda não concluída', 'tarefa': _situacao(tarefa)}), 409
+
+    if not artefato_disponivel(tarefa):
+        return jsonify({'success': False, 'message': 'Arquivo expirado, gere novamente'}), 410
+
+    return enviar_tarefa(tarefa)
@@ -0,0 +1,55 @@
+"""Aplicação de teste com um banco SQLite próprio em diretório temporário"""
+
+import os
+import sys
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from models.user import User
+from utils.sqlite_funcoes import registrar_funcoes_sqlite
+from utils.sqlite_perfil import aplicar_perfil_sqlite
+from utils.migracoes import aplicar_migracoes
+from utils.prazos import garantir_indice_prazos
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.busca import garantir_indice_busca
+from utils.agregados import garantir_agregados
+from utils.versoes import garantir_versoes
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'teste.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 5000, 'synchronous': 'NORMAL'},
+        ARTEFATOS_DIR=str(tmp_path / 'artefatos'),
+        GRAFICOS_CACHE_DIR=None,
+        GRAFICOS_PARALELO=False,
+        AGENDADOR_ATIVO=False,
+    )
+    db.init_app(app)
+
+    with app.app_context():
+        aplicar_perfil_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        registrar_funcoes_sqlite(db.engine)
+        db.create_all()
+        aplicar_migracoes()
+        garantir_indice_prazos()
+        sincronizar_colunas_geradas()
+        garantir_indice_busca()
+        garantir_agregados()
+        garantir_versoes()
+
+        usuario = User(username='admin', email='admin@teste', is_admin=True)
+        usuario.set_password('admin123')
+        db.session.add(usuario)
+        db.session.commit()
+
+        yield app
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,34 @@
+import json
+from sqlalchemy import insert
+from models import db
+from models.planilha import PlanilhaData, AbaConfig
+from utils.analise import analisar
+from utils.colunas_geradas import sincronizar_colunas_geradas
+
+ABA = 'Plano de Ação - TCEES'
+
+
+def test_papel_com_cabecalho_diferente_nos_registros(app):
+    # Configuração com o nome curto; registros com o cabeçalho original do Excel (quebra de linha)
+    aba = AbaConfig(aba_name=ABA, display_order=0)
+    aba.set_columns([{'name': 'STATUS DA RECOMENDAÇÃO', 'type': 'text'},
+                     {'name': 'Setor(es) responsável(is)', 'type': 'text'}])
+    db.session.add(aba)
+    db.session.commit()
+
+    status = 'STATUS DA RECOMENDAÇÃO\nQual é a situação atual da recomendação?'
+    linhas = [{status: 'Cumprida', 'Setor(es) responsável (is)': 'GPE'},
+              {status: 'A cumprir', 'Setor(es) responsável (is)': 'GEO'},
+              {status: 'Cumprida', 'Setor(es) responsável (is)': 'GPE'}]
+    db.session.execute(insert(PlanilhaData.__table__), [
+        {'aba_name': ABA, 'row_order': i, 'row_data': json.dumps(dados, ensure_ascii=False)}
+        for i, dados in enumerate(linhas)
+    ])
+    db.session.commit()
+    sincronizar_colunas_geradas()
+
+    resultado = analisar(ABA).para_json()
+    assert resultado['kpis']['cumpridas'] == 2
+    assert resultado['kpis']['a_cumprir'] == 1
+    assert resultado['charts']['status_consolidado']['data'] == [2, 0, 0, 1]
+    assert resultado['charts']['por_setor'] == {'labels': ['GPE', 'GEO'], 'data': [2, 1]}
@@ -0,0 +1,43 @@
+import pytest
+from models import db, login_manager
+from models.planilha import AbaConfig
+from routes.configuracoes import config_bp
+from utils.colunas_geradas import PAPEL_NENHUM, resolver_papeis
+
+ABA = 'Plano de Ação - UECI'
+STATUS = 'STATUS DA RECOMENDAÇÃO'
+
+
+@pytest.fixture
+def cliente(app):
+    app.config['LOGIN_DISABLED'] = True
+    login_manager.init_app(app)
+    app.register_blueprint(config_bp)
+
+    aba = AbaConfig(aba_name=ABA, display_order=0)
+    aba.set_columns([{'name': 'Constatação', 'type': 'text'}, {'name': STATUS, 'type': 'text'}])
+    db.session.add(aba)
+    db.session.commit()
+    return app.test_client()
+
+
+def _editar(cliente, **dados):
+    resposta = cliente.post(f'/configuracoes/colunas/editar/{ABA}/1', json=dict(nome=STATUS, tipo='select', **dados))
+    assert resposta.get_json()['success']
+    db.session.expire_all()
+    return AbaConfig.query.filter_by(aba_name=ABA).first().get_columns()
+
+
+def test_editar_coluna_sem_papel_mantem_deteccao_pelo_nome(cliente):
+    colunas = _editar(cliente, papel='')
+    assert 'papel' not in colunas[1]
+    assert resolver_papeis(colunas)['status'] == STATUS
+
+
+def test_editar_coluna_com_papel_nenhum_desliga_deteccao(cliente):
+    colunas = _editar(cliente, papel=PAPEL_NENHUM)
+    assert colunas[1]['papel'] == PAPEL_NENHUM
+    assert 'status' not in resolver_papeis(colunas)
+
+    # Sem 'papel' no pedido, o papel atual é mantido
+    assert _editar(cliente)[1]['papel'] == PAPEL_NENHUM
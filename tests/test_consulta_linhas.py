@@ -0,0 +1,51 @@
+import json
+from sqlalchemy import insert, text
+from models import db
+from models.planilha import PlanilhaData, AbaConfig
+from utils import consulta_linhas
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.consulta_linhas import montar_consulta, parametros_da_requisicao
+from utils.esquema import esquema_da_aba
+
+ABA = 'Plano de Ação - UECI'
+STATUS = 'STATUS DA RECOMENDAÇÃO'
+
+
+def _esquema(*linhas):
+    aba = AbaConfig(aba_name=ABA, display_order=0)
+    aba.set_columns([{'name': 'Constatação', 'type': 'text'}, {'name': STATUS, 'type': 'text'}])
+    db.session.add(aba)
+    db.session.commit()
+    sincronizar_colunas_geradas()
+    db.session.execute(insert(PlanilhaData.__table__), [
+        {'aba_name': ABA, 'row_order': i, 'row_data': json.dumps(dados, ensure_ascii=False)}
+        for i, dados in enumerate(linhas)
+    ])
+    db.session.commit()
+    return esquema_da_aba(aba)
+
+
+def test_ordenacao_por_papel_usa_o_indice(app):
+    esquema = _esquema({'Constatação': 'b', STATUS: 'Cumprida'}, {'Constatação': 'a', STATUS: 'A cumprir'})
+    consulta = montar_consulta(esquema, parametros_da_requisicao({'sort': STATUS}))
+
+    compilada = consulta.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    plano = ' '.join(str(linha[-1]) for linha in db.session.execute(text(f'EXPLAIN QUERY PLAN {compilada}')))
+    assert 'ix_planilha_data_g_status' in plano
+    assert 'TEMP B-TREE FOR ORDER BY' not in plano
+    assert [registro.get_data()[STATUS] for registro in consulta] == ['A cumprir', 'Cumprida']
+
+
+def test_busca_sem_fts_trata_curinga_como_texto(app, monkeypatch):
+    monkeypatch.setattr(consulta_linhas, 'busca_disponivel', lambda: False)
+    esquema = _esquema({'Constatação': 'meta de 50% atingida', STATUS: ''},
+                       {'Constatação': 'meta de 500 atingida', STATUS: ''},
+                       {'Constatação': 'campo_a', STATUS: ''},
+                       {'Constatação': 'campoxa', STATUS: ''})
+
+    def constatacoes(q):
+        consulta = montar_consulta(esquema, parametros_da_requisicao({'q': q}))
+        return [registro.get_data()['Constatação'] for registro in consulta]
+
+    assert constatacoes('50%') == ['meta de 50% atingida']
+    assert constatacoes('o_a') == ['campo_a']
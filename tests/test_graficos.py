@@ -0,0 +1,20 @@
+from utils import graficos
+
+SPECS = {
+    'status': {'tipo': 'pizza', 'labels': ['Cumprida', 'A cumprir'], 'data': [3, 5],
+               'colors': ['#4caf50', '#ff9800'], 'titulo': 'Status'},
+    'setores': {'tipo': 'barras', 'labels': ['GPE', 'GEO', 'GOV'], 'data': [4, 2, 7], 'titulo': 'Setores'},
+}
+
+
+def test_graficos_no_pool_de_processos(app, capsys):
+    app.config['GRAFICOS_PARALELO'] = True
+    app.config['GRAFICOS_PROCESSOS'] = 2
+    try:
+        pngs = graficos.graficos_png(SPECS)
+    finally:
+        graficos._pool.descartar()
+
+    assert 'indisponível' not in capsys.readouterr().out
+    assert set(pngs) == set(SPECS)
+    assert all(png.startswith(b'\x89PNG') for png in pngs.values())
@@ -0,0 +1,36 @@
+from openpyxl import Workbook
+from models import db
+from models.planilha import PlanilhaData
+from utils.import_data import import_excel_data
+
+CABECALHOS = ['Nº Nota Recomendatória', 'Exercício', 'Constatação', 'Status']
+
+
+def _pasta(caminho):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for aba in ('Plano de Ação - UECI', 'Plano de Ação - TCEES'):
+        planilha = workbook.create_sheet(aba)
+        planilha.append(CABECALHOS)
+        for i in range(1, 301):
+            planilha.append([f'{i}/2024', 2024, f'{aba} {i}', 'A cumprir' if i % 2 else 'Cumprida'])
+    workbook.save(caminho)
+    return str(caminho)
+
+
+def _registros():
+    return [(registro.aba_name, registro.row_order, registro.row_data)
+            for registro in PlanilhaData.query.order_by(PlanilhaData.id)]
+
+
+def test_importacao_em_processos_igual_a_em_serie(app, tmp_path):
+    arquivo = _pasta(tmp_path / 'planilha.xlsx')
+
+    import_excel_data(app, arquivo, processos=1)
+    em_serie = _registros()
+    PlanilhaData.query.delete()
+    db.session.commit()
+
+    import_excel_data(app, arquivo, processos=2)
+    assert len(em_serie) == 600
+    assert _registros() == em_serie
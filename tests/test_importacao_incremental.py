@@ -0,0 +1,35 @@
+from models import db
+from models.planilha import PlanilhaData
+from models.registro_removido import RegistroRemovido
+from utils.importacao_incremental import sincronizar_aba
+from utils.tipos_colunas import TiposDaAba
+
+ABA = 'Plano de Ação - UECI'
+CHAVE = ['Constatação']
+CABECALHOS = ['Constatação', 'Status']
+TIPOS = TiposDaAba({'Constatação': 'text', 'Status': 'text'})
+
+
+def _sincronizar(*constatacoes):
+    registros = [(i, {'Constatação': constatacao, 'Status': 'A cumprir'}) for i, constatacao in enumerate(constatacoes)]
+    return sincronizar_aba(ABA, 0, CABECALHOS, TIPOS, registros, CHAVE)
+
+
+def _constatacoes():
+    return sorted(registro.get_data()['Constatação'] for registro in PlanilhaData.query.filter_by(aba_name=ABA))
+
+
+def test_remove_so_registros_importados(app):
+    _sincronizar('IMPORTADO-1', 'IMPORTADO-2')
+
+    criado = PlanilhaData(aba_name=ABA, row_order=99, created_by=1)
+    criado.set_data({'Constatação': 'CRIADO-NO-APP', 'Status': 'A cumprir'})
+    db.session.add(criado)
+    db.session.commit()
+
+    relatorio = _sincronizar('IMPORTADO-1')
+
+    assert [item['chave'] for item in relatorio['removidos']] == ['IMPORTADO-2']
+    assert relatorio['mantidos'] == 1
+    assert _constatacoes() == ['CRIADO-NO-APP', 'IMPORTADO-1']
+    assert RegistroRemovido.query.count() == 1
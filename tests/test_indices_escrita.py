@@ -0,0 +1,73 @@
+from sqlalchemy import select, text
+from models import db
+from models.planilha import PlanilhaData, AbaConfig
+from models.prazo import Prazo
+from utils.agregados import reconstruir_agregados
+from utils.busca import buscar, subconsulta_ids
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.versoes import versao_da_aba
+
+ABA = 'Plano de Ação - UECI'
+STATUS = 'STATUS DA RECOMENDAÇÃO'
+PRAZO = 'Prazo previsto de término'
+
+
+def _agregados():
+    return db.session.execute(text(
+        'SELECT papel, valor, total, primeiro_id FROM analytics_agregado '
+        'WHERE aba_name = :aba ORDER BY papel, valor'
+    ), {'aba': ABA}).all()
+
+
+def _conferir(registro_id, termo, data, encontrado):
+    """Agregados, prazos, busca e versão seguem a escrita em planilha_data"""
+    mantidos = _agregados()
+    reconstruir_agregados(ABA)
+    assert mantidos == _agregados()
+
+    prazos = db.session.execute(select(Prazo.data).where(Prazo.registro_id == registro_id)).scalars().all()
+    assert prazos == ([data] if data else [])
+
+    ids = db.session.execute(subconsulta_ids(termo, ABA)).scalars().all()
+    assert (registro_id in ids) == encontrado
+    assert any(r['registro_id'] == registro_id for r in buscar(termo, ABA)) == encontrado
+
+
+def test_escrita_mantem_agregados_prazos_busca_e_versao(app):
+    aba = AbaConfig(aba_name=ABA, display_order=0)
+    aba.set_columns([{'name': 'Constatação', 'type': 'text'},
+                     {'name': STATUS, 'type': 'text'},
+                     {'name': PRAZO, 'type': 'text'}])
+    db.session.add(aba)
+    db.session.commit()
+    sincronizar_colunas_geradas()
+
+    anterior = PlanilhaData(aba_name=ABA, row_order=0)
+    anterior.set_data({'Constatação': 'almoxarifado', STATUS: 'Cumprida', PRAZO: ''})
+    db.session.add(anterior)
+    db.session.commit()
+    versao = versao_da_aba(ABA)
+
+    registro = PlanilhaData(aba_name=ABA, row_order=1)
+    registro.set_data({'Constatação': 'conciliação bancária', STATUS: 'A cumprir', PRAZO: '31/12/2025'})
+    db.session.add(registro)
+    db.session.commit()
+    registro_id = registro.id
+    assert versao_da_aba(ABA) > versao
+    versao = versao_da_aba(ABA)
+    assert ('status', 'A cumprir', 1, registro_id) in _agregados()
+    _conferir(registro_id, 'conciliação', '2025-12-31', True)
+
+    registro.set_data({'Constatação': 'conciliação bancária', STATUS: 'Cumprida', PRAZO: '30/06/2026'})
+    db.session.commit()
+    assert versao_da_aba(ABA) > versao
+    versao = versao_da_aba(ABA)
+    assert ('status', 'Cumprida', 2, anterior.id) in _agregados()
+    assert not any(linha.valor == 'A cumprir' for linha in _agregados())
+    _conferir(registro_id, 'conciliação', '2026-06-30', True)
+
+    db.session.delete(registro)
+    db.session.commit()
+    assert versao_da_aba(ABA) > versao
+    assert ('status', 'Cumprida', 1, anterior.id) in _agregados()
+    _conferir(registro_id, 'conciliação', None, False)
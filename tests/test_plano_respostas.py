@@ -0,0 +1,21 @@
+import zipfile
+from io import BytesIO
+from utils import plano_respostas
+
+COLUNAS = ['Nº Nota Recomendatória', 'Constatação', 'Status']
+
+
+def test_zip_de_planos_no_pool_de_processos(app, capsys):
+    app.config['PDF_LOTE_PROCESSOS'] = 2
+    registros = [{'id': i, 'Nº Nota Recomendatória': f'{i}/2024', 'Constatação': f'Constatação {i}',
+                  'Status': 'A cumprir'} for i in range(1, 6)]
+    try:
+        conteudo = b''.join(plano_respostas.blocos_zip_planos('Plano de Ação - UECI', COLUNAS, registros))
+    finally:
+        plano_respostas._pool.descartar()
+
+    assert 'indisponível' not in capsys.readouterr().out
+    with zipfile.ZipFile(BytesIO(conteudo)) as arquivo_zip:
+        nomes = arquivo_zip.namelist()
+        assert len(nomes) == 5
+        assert all(arquivo_zip.read(nome).startswith(b'%PDF') for nome in nomes)
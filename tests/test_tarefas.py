@@ -0,0 +1,70 @@
+import json
+from datetime import datetime, timedelta
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from models import db
+from models.planilha import PlanilhaData, AbaConfig
+from models.tarefa import Tarefa
+from utils import tarefas
+
+ABA = 'Plano de Ação - UECI'
+
+
+def _popular(total):
+    aba = AbaConfig(aba_name=ABA, display_order=0)
+    aba.set_columns([{'name': 'Constatação', 'type': 'text'}, {'name': 'Exercício', 'type': 'number'}])
+    db.session.add(aba)
+    db.session.execute(insert(PlanilhaData.__table__), [
+        {'aba_name': ABA, 'row_order': i, 'created_by': 1,
+         'row_data': json.dumps({'Constatação': f'Constatação {i}', 'Exercício': str(2000 + i % 25)},
+                                ensure_ascii=False)}
+        for i in range(total)
+    ])
+    db.session.commit()
+
+
+def test_exportacao_excel_pela_fila_grava_progresso(app, monkeypatch):
+    # Progresso gravado a cada lote, enquanto o cursor da exportação está aberto
+    monkeypatch.setattr(tarefas, 'INTERVALO_PROGRESSO', 0)
+    _popular(5000)
+
+    parametros = tarefas.TIPOS['planilha_excel']['parametros']({})
+    tarefa = Tarefa(tipo='planilha_excel', aba_name=ABA, status=tarefas.PENDENTE, progresso=0,
+                    chave=tarefas.chave_tarefa('planilha_excel', ABA, parametros), criado_por=1)
+    tarefa.set_parametros(parametros)
+    db.session.add(tarefa)
+    db.session.commit()
+    tarefa_id = tarefa.id
+
+    tarefas.executar_tarefa(tarefa_id)
+    db.session.expire_all()
+
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    assert tarefa.status == tarefas.CONCLUIDA, tarefa.mensagem
+    assert tarefas.artefato_disponivel(tarefa)
+
+    planilha = load_workbook(tarefa.arquivo, read_only=True).active
+    linhas = list(planilha.iter_rows(values_only=True))
+    assert linhas[0] == ('Constatação', 'Exercício')
+    assert len(linhas) == 5001
+    assert linhas[-1][0] == 'Constatação 4999'
+
+
+def test_retomar_tarefas_so_devolve_as_interrompidas(app, monkeypatch):
+    submetidas = []
+    monkeypatch.setattr(tarefas, '_submeter', submetidas.append)
+
+    agora = datetime.utcnow()
+    em_andamento = Tarefa(tipo='planilha_excel', aba_name=ABA, chave='a', status=tarefas.EXECUTANDO,
+                          iniciado_em=agora - timedelta(hours=2), atualizado_em=agora)
+    interrompida = Tarefa(tipo='planilha_excel', aba_name=ABA, chave='b', status=tarefas.EXECUTANDO,
+                          iniciado_em=agora - timedelta(hours=2), atualizado_em=agora - timedelta(hours=1))
+    db.session.add_all([em_andamento, interrompida])
+    db.session.commit()
+
+    tarefas.retomar_tarefas()
+    db.session.expire_all()
+
+    assert em_andamento.status == tarefas.EXECUTANDO
+    assert interrompida.status == tarefas.PENDENTE
+    assert submetidas == [interrompida.id]
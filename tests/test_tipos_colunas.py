@@ -0,0 +1,20 @@
+import pytest
+from utils.tipos_colunas import numero, numero_canonico
+
+
+@pytest.mark.parametrize('valor', [2.125, 1.5, -0.75, 2024, 1234567, 0, 3.0])
+def test_numero_canonico_ida_e_volta(valor):
+    assert numero(numero_canonico(valor)) == valor
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1.234,56', 1234.56),
+    ('1.234.567', 1234567),
+    ('12,5', 12.5),
+    ('2.125', 2.125),
+    ('2024', 2024),
+    ('007', None),
+    ('abc', None),
+])
+def test_numero_de_texto(texto, esperado):
+    assert numero(texto) == esperado
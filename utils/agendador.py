@@ -0,0 +1,184 @@
+"""Agendador de rotinas dentro da aplicação (sem dependências externas)
+
+Rotinas diárias em horário fixo ("02:00") ou a cada N horas, verificadas por
+uma thread em segundo plano. Os horários das rotinas periódicas são alinhados
+ao relógio (ex.: a cada 6 horas = 00h, 06h, 12h, 18h), de modo que todos os
+processos do servidor calculam os mesmos horários.
+
+Quando a aplicação roda em vários processos, cada execução é reservada no
+banco (configuracao_sistema, chave 'agendador_<nome>') com um UPDATE
+condicional: só um processo executa cada horário.
+
+Rotinas da aplicação (app.config):
+    AGENDADOR_ATIVO         liga a thread do agendador (padrão True)
+    RELATORIOS_HORARIO      horário da pré-geração noturna dos relatórios ("HH:MM"; None desativa)
+    BACKUP_INTERVALO_HORAS  backup do banco a cada N horas (None desativa)
+"""
+
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert
+from models import db
+from models.configuracoes import ConfiguracaoSistema
+
+# Intervalo (s) entre duas verificações de rotinas pendentes
+INTERVALO_VERIFICACAO = 30
+
+_thread = None
+_lock = threading.Lock()
+
+
+class Agendador:
+    """Lista de rotinas com o horário da próxima execução de cada uma"""
+
+    def __init__(self, reservar=None):
+        # reservar(nome, horario) -> bool decide se este processo executa o horário
+        self.rotinas = []
+        self.reservar = reservar
+
+    def diariamente(self, horario, nome, funcao):
+        """Executa `funcao` todo dia no horário "HH:MM" (hora local)"""
+        hora, minuto = (int(parte) for parte in horario.split(':'))
+        self._adicionar(nome, funcao, diario=(hora, minuto))
+
+    def a_cada(self, horas, nome, funcao):
+        """Executa `funcao` a cada `horas` horas"""
+        self._adicionar(nome, funcao, intervalo=timedelta(hours=horas))
+
+    def _adicionar(self, nome, funcao, diario=None, intervalo=None):
+        rotina = {'nome': nome, 'funcao': funcao, 'diario': diario, 'intervalo': intervalo}
+        rotina['proxima'] = self._calcular_proxima(rotina, datetime.now())
+        self.rotinas.append(rotina)
+
+    @staticmethod
+    def _calcular_proxima(rotina, agora):
+        if rotina['diario']:
+            hora, minuto = rotina['diario']
+            proxima = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+            return proxima if proxima > agora else proxima + timedelta(days=1)
+
+        segundos = int(rotina['intervalo'].total_seconds())
+        meia_noite = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+        decorridos = int((agora - meia_noite).total_seconds())
+        return meia_noite + timedelta(seconds=(decorridos // segundos + 1) * segundos)
+
+    def proxima_execucao(self, nome=None):
+        """Horário da próxima execução (da rotina `nome` ou da primeira de todas)"""
+        horarios = [r['proxima'] for r in self.rotinas if nome is None or r['nome'] == nome]
+        return min(horarios) if horarios else None
+
+    def executar_pendentes(self, agora=None):
+        """Executa as rotinas cujo horário chegou; devolve os nomes executados"""
+        agora = agora or datetime.now()
+        executadas = []
+
+        for rotina in self.rotinas:
+            if rotina['proxima'] > agora:
+                continue
+
+            horario = rotina['proxima']
+            rotina['proxima'] = self._calcular_proxima(rotina, agora)
+
+            if self.reservar and not self.reservar(rotina['nome'], horario):
+                continue
+
+            try:
+                rotina['funcao']()
+                executadas.append(rotina['nome'])
+            except Exception as e:
+                print(f"⚠ Erro na rotina agendada '{rotina['nome']}': {e}")
+                traceback.print_exc()
+
+        return executadas
+
+    def executar_continuamente(self, parar=None, intervalo=INTERVALO_VERIFICACAO):
+        """Laço de verificação; termina quando o evento `parar` é sinalizado"""
+        parar = parar or threading.Event()
+        while not parar.is_set():
+            self.executar_pendentes()
+            parar.wait(intervalo)
+
+
+def reservar_execucao(nome, horario):
+    """Marca no banco que o horário da rotina foi assumido; False se outro processo já o fez"""
+    tabela = ConfiguracaoSistema.__table__
+    chave = f'agendador_{nome}'
+    valor = json.dumps({'horario': horario.isoformat(timespec='minutes')})
+
+    db.session.execute(insert(tabela).values(chave=chave, valor=None).on_conflict_do_nothing())
+    resultado = db.session.execute(
+        tabela.update()
+        .where(tabela.c.chave == chave, (tabela.c.valor.is_(None)) | (tabela.c.valor != valor))
+        .values(valor=valor, updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return resultado.rowcount == 1
+
+
+def pre_renderizar_relatorios():
+    """Enfileira o PDF executivo e o Excel de todas as abas ativas e os consolidados (utils.tarefas)
+
+    Os arquivos ficam disponíveis para as rotas de download enquanto a versão
+    dos dados da aba não mudar.
+    """
+    from models.planilha import AbaConfig
+    from utils.agregados import agregados_da_aba, total_de_registros
+    from utils.tarefas import enfileirar, TODAS_AS_ABAS
+
+    abas = AbaConfig.query.filter_by(is_active=True).order_by(AbaConfig.display_order).all()
+    for aba in abas:
+        if total_de_registros(agregados_da_aba(aba.aba_name)):
+            enfileirar('relatorio_pdf', aba.aba_name)
+        enfileirar('planilha_excel', aba.aba_name)
+    if abas:
+        enfileirar('consolidado_pdf', TODAS_AS_ABAS)
+        enfileirar('consolidado_excel', TODAS_AS_ABAS)
+
+    print(f"✓ Pré-geração de relatórios enfileirada para {len(abas)} aba(s)")
+
+
+def _backup():
+    from backup_automatico import criar_backup
+    criar_backup()
+
+
+def iniciar_agendador(app):
+    """Inicia (uma vez por processo) a thread com as rotinas configuradas"""
+    global _thread
+
+    if not app.config.get('AGENDADOR_ATIVO', True):
+        return None
+
+    def no_contexto(funcao):
+        def executar():
+            with app.app_context():
+                try:
+                    funcao()
+                finally:
+                    db.session.remove()
+        return executar
+
+    def reservar(nome, horario):
+        with app.app_context():
+            try:
+                return reservar_execucao(nome, horario)
+            finally:
+                db.session.remove()
+
+    agendador = Agendador(reservar=reservar)
+    if app.config.get('RELATORIOS_HORARIO'):
+        agendador.diariamente(app.config['RELATORIOS_HORARIO'], 'relatorios', no_contexto(pre_renderizar_relatorios))
+    if app.config.get('BACKUP_INTERVALO_HORAS'):
+        agendador.a_cada(app.config['BACKUP_INTERVALO_HORAS'], 'backup', _backup)
+
+    if not agendador.rotinas:
+        return None
+
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=agendador.executar_continuamente, name='agendador', daemon=True)
+            _thread.start()
+
+    return agendador
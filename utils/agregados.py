@@ -0,0 +1,149 @@
+"""Agregados do analytics (contagem por aba, papel e valor) mantidos na escrita
+
+A tabela `analytics_agregado` guarda, para cada aba, quantos registros têm cada
+valor de status, setor, UG, origem, tipo e prazo (colunas geradas g_<papel>),
+além do total de registros (papel '*'). Ela é atualizada por triggers em
+planilha_data, cobrindo rotas, preenchimento externo, importações e scripts,
+de modo que o dashboard não precisa percorrer os registros.
+
+Os triggers referenciam as colunas geradas; por isso são removidos antes de
+sincronizar_colunas_geradas() alterar essas colunas e recriados em seguida,
+com a reconstrução dos agregados.
+"""
+
+from models import db
+from sqlalchemy import text
+from utils.colunas_geradas import PAPEIS, nome_coluna
+
+PAPEL_TOTAL = '*'
+
+_TRIGGERS = ['analytics_agregado_ai', 'analytics_agregado_au', 'analytics_agregado_ad']
+
+_TABELA = """CREATE TABLE IF NOT EXISTS analytics_agregado (
+    aba_name TEXT NOT NULL,
+    papel TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    primeiro_id INTEGER,
+    PRIMARY KEY (aba_name, papel, valor)
+) WITHOUT ROWID"""
+
+
+def _somar(linha):
+    """Comandos que somam o registro `linha` (new) aos agregados"""
+    comandos = [
+        f"INSERT INTO analytics_agregado(aba_name, papel, valor, total, primeiro_id) "
+        f"VALUES ({linha}.aba_name, '{PAPEL_TOTAL}', '', 1, {linha}.id) "
+        f"ON CONFLICT(aba_name, papel, valor) DO UPDATE SET total = total + 1;"
+    ]
+    for papel in PAPEIS:
+        col = f'{linha}.{nome_coluna(papel)}'
+        comandos.append(
+            f"INSERT INTO analytics_agregado(aba_name, papel, valor, total, primeiro_id) "
+            f"SELECT {linha}.aba_name, '{papel}', {col}, 1, {linha}.id WHERE {col} IS NOT NULL "
+            f"ON CONFLICT(aba_name, papel, valor) DO UPDATE SET total = total + 1, "
+            f"primeiro_id = min(primeiro_id, excluded.primeiro_id);"
+        )
+    return '\n'.join(comandos)
+
+
+def _subtrair(linha):
+    """Comandos que retiram o registro `linha` (old) dos agregados"""
+    comandos = [
+        f"UPDATE analytics_agregado SET total = total - 1 "
+        f"WHERE aba_name = {linha}.aba_name AND papel = '{PAPEL_TOTAL}' AND valor = '';"
+    ]
+    for papel in PAPEIS:
+        col = f'{linha}.{nome_coluna(papel)}'
+        comandos.append(
+            f"UPDATE analytics_agregado SET total = total - 1 "
+            f"WHERE aba_name = {linha}.aba_name AND papel = '{papel}' AND valor = CAST({col} AS TEXT);"
+        )
+    comandos.append("DELETE FROM analytics_agregado WHERE total <= 0;")
+    return '\n'.join(comandos)
+
+
+def _ddl_triggers():
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS analytics_agregado_ai AFTER INSERT ON planilha_data BEGIN
+            {_somar('new')}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS analytics_agregado_au AFTER UPDATE OF row_data, aba_name ON planilha_data BEGIN
+            {_subtrair('old')}
+            {_somar('new')}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS analytics_agregado_ad AFTER DELETE ON planilha_data BEGIN
+            {_subtrair('old')}
+        END""",
+    ]
+
+
+def remover_triggers_agregados():
+    """Remove os triggers (necessário antes de alterar as colunas geradas)"""
+    for nome in _TRIGGERS:
+        db.session.execute(text(f'DROP TRIGGER IF EXISTS {nome}'))
+
+
+def garantir_agregados(reconstruir=False):
+    """Cria a tabela e os triggers, reconstruindo os agregados se a tabela é nova"""
+    existia = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_agregado'"
+    )).first() is not None
+
+    db.session.execute(text(_TABELA))
+    for ddl in _ddl_triggers():
+        db.session.execute(text(ddl))
+
+    if reconstruir or not existia:
+        reconstruir_agregados(commit=False)
+        print("✓ Agregados do analytics reconstruídos")
+
+    db.session.commit()
+
+
+def reconstruir_agregados(aba_name=None, commit=True):
+    """Recalcula os agregados a partir de planilha_data (todas as abas ou uma)"""
+    filtro = ''
+    params = {}
+    if aba_name:
+        filtro = 'WHERE aba_name = :aba'
+        params['aba'] = aba_name
+
+    db.session.execute(text(f'DELETE FROM analytics_agregado {filtro}'), params)
+    db.session.execute(text(
+        "INSERT INTO analytics_agregado(aba_name, papel, valor, total, primeiro_id) "
+        f"SELECT aba_name, '{PAPEL_TOTAL}', '', COUNT(*), MIN(id) FROM planilha_data {filtro} GROUP BY aba_name"
+    ), params)
+
+    for papel in PAPEIS:
+        col = nome_coluna(papel)
+        condicao = f'{col} IS NOT NULL' + (' AND aba_name = :aba' if aba_name else '')
+        db.session.execute(text(
+            "INSERT INTO analytics_agregado(aba_name, papel, valor, total, primeiro_id) "
+            f"SELECT aba_name, '{papel}', {col}, COUNT(*), MIN(id) FROM planilha_data "
+            f"WHERE {condicao} GROUP BY aba_name, CAST({col} AS TEXT)"
+        ), params)
+
+    if commit:
+        db.session.commit()
+
+
+def agregados_da_aba(aba_name):
+    """Retorna {papel: [(valor, total), ...]} em ordem decrescente de total
+
+    Empates seguem a ordem de aparição do valor nos registros (primeiro_id).
+    """
+    linhas = db.session.execute(text(
+        'SELECT papel, valor, total FROM analytics_agregado '
+        'WHERE aba_name = :aba ORDER BY papel, total DESC, primeiro_id'
+    ), {'aba': aba_name})
+
+    agregados = {}
+    for linha in linhas:
+        agregados.setdefault(linha.papel, []).append((linha.valor, linha.total))
+    return agregados
+
+
+def total_de_registros(agregados):
+    contagem = agregados.get(PAPEL_TOTAL)
+    return contagem[0][1] if contagem else 0
@@ -0,0 +1,191 @@
+"""Motor de análise gerencial de uma aba
+
+Calcula, numa única passada vetorizada sobre os agregados da aba
+(analytics_agregado), os KPIs de status, as distribuições por papel e a
+situação dos prazos. O resultado é imutável e fica num cache LRU indexado
+pela versão dos dados da aba (utils.versoes), sendo consumido tanto pelo JSON
+do dashboard quanto pelo PDF.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+import numpy as np
+import pandas as pd
+from utils.agregados import PAPEL_TOTAL
+from utils.versoes import CacheLRU, versao_da_aba
+from utils.esquema import esquema_da_aba
+from models import db
+from models.planilha import AbaConfig
+from sqlalchemy import text
+
+CATEGORIAS_STATUS = ('cumpridas', 'nao_cumpridas', 'em_andamento', 'a_cumprir')
+ROTULOS_STATUS = ['Cumpridas', 'Não Cumpridas', 'Em Andamento', 'A Cumprir']
+CORES_STATUS = ['#10b981', '#ef4444', '#f59e0b', '#3b82f6']
+
+# Gráficos de distribuição simples: (papel, chave do gráfico, limite de itens)
+GRAFICOS_PAPEL = (
+    ('setor', 'por_setor', 10),
+    ('ug', 'por_ug', None),
+    ('origem', 'por_origem', None),
+    ('tipo', 'por_tipo', None),
+)
+
+_resultados = CacheLRU(maximo=64)
+
+
+@dataclass(frozen=True)
+class ResultadoAnalise:
+    """Resultado da análise de uma aba (somente leitura)"""
+    aba_name: str
+    total_registros: int
+    status: tuple            # ((valor, quantidade), ...) em ordem decrescente
+    consolidado: tuple       # quantidades na ordem de CATEGORIAS_STATUS
+    contagens: dict          # {papel: ((valor, quantidade), ...)}
+    atrasadas: int
+    no_prazo: int
+    papeis: frozenset
+
+    @property
+    def taxa_cumprimento(self):
+        if not self.total_registros:
+            return 0
+        return round((self.consolidado[0] / self.total_registros * 100), 1)
+
+    @property
+    def tem_prazos(self):
+        return self.atrasadas + self.no_prazo > 0
+
+    def kpis_status(self):
+        return dict(zip(CATEGORIAS_STATUS, self.consolidado))
+
+    def para_json(self):
+        """Formato do endpoint /analytics/data (total_registros, charts, kpis)"""
+        charts = {}
+        kpis = {'total_registros': self.total_registros}
+
+        if self.status:
+            kpis.update(self.kpis_status())
+            kpis['taxa_cumprimento'] = self.taxa_cumprimento
+
+            charts['status_consolidado'] = {
+                'labels': ROTULOS_STATUS,
+                'data': list(self.consolidado),
+                'colors': CORES_STATUS
+            }
+            charts['status_detalhado'] = {
+                'labels': [str(s)[:50] for s, _ in self.status],
+                'data': [count for _, count in self.status]
+            }
+
+        for papel, chart_key, limite in GRAFICOS_PAPEL:
+            counts = self.contagens.get(papel, ())[:limite]
+            if counts:
+                charts[chart_key] = {
+                    'labels': [str(s) for s, _ in counts],
+                    'data': [count for _, count in counts]
+                }
+
+        if self.tem_prazos:
+            kpis['atrasadas'] = self.atrasadas
+            kpis['no_prazo'] = self.no_prazo
+            charts['situacao_prazos'] = {
+                'labels': ['No Prazo', 'Atrasadas'],
+                'data': [self.no_prazo, self.atrasadas],
+                'colors': ['#10b981', '#ef4444']
+            }
+
+        return {
+            'total_registros': self.total_registros,
+            'charts': charts,
+            'kpis': kpis
+        }
+
+
+def _classificar_status(valores):
+    """Índice da categoria de cada status (-1 = não classificado), via np.select"""
+    texto = valores.astype(str).str.lower()
+    cumprida = texto.str.contains('cumprida', regex=False)
+    nao = texto.str.contains('não', regex=False)
+    return np.select(
+        [
+            cumprida & ~nao,
+            texto.str.contains('não cumprida', regex=False),
+            texto.str.contains('andamento', regex=False),
+            texto.str.contains('cumprir', regex=False),
+        ],
+        [0, 1, 2, 3],
+        default=-1
+    )
+
+
+def _calcular(aba_name, linhas, papeis, hoje):
+    df = pd.DataFrame(linhas, columns=['papel', 'valor', 'total', 'ordem'])
+    if df.empty:
+        return ResultadoAnalise(aba_name, 0, (), (0, 0, 0, 0), {}, 0, 0, frozenset(papeis))
+
+    df['papel'] = df['papel'].astype('category')
+    df = df[df['papel'].isin(list(papeis) + [PAPEL_TOTAL])]
+    df = df.sort_values(['papel', 'total', 'ordem'], ascending=[True, False, True], kind='stable')
+
+    total = int(df.loc[df['papel'] == PAPEL_TOTAL, 'total'].sum())
+
+    contagens = {}
+    for papel, grupo in df.groupby('papel', observed=True, sort=False):
+        if papel != PAPEL_TOTAL:
+            contagens[papel] = tuple(zip(grupo['valor'].tolist(), grupo['total'].astype(int).tolist()))
+
+    # Status consolidado: classificação vetorizada ponderada pela quantidade
+    status = df[df['papel'] == 'status']
+    consolidado = (0, 0, 0, 0)
+    if not status.empty:
+        categorias = _classificar_status(status['valor'])
+        somas = np.bincount(categorias[categorias >= 0], weights=status['total'].to_numpy()[categorias >= 0], minlength=4)
+        consolidado = tuple(int(x) for x in somas)
+
+    # Prazos em ISO: atrasado quando a data é anterior a hoje
+    prazos = df[(df['papel'] == 'prazo') & df['valor'].str.fullmatch(r'\d{4}-\d{2}-\d{2}')]
+    vencidos = (prazos['valor'] < hoje).to_numpy()
+    quantidades = prazos['total'].to_numpy()
+    atrasadas = int(quantidades[vencidos].sum())
+    no_prazo = int(quantidades[~vencidos].sum())
+
+    return ResultadoAnalise(
+        aba_name=aba_name,
+        total_registros=total,
+        status=contagens.get('status', ()),
+        consolidado=consolidado,
+        contagens=contagens,
+        atrasadas=atrasadas,
+        no_prazo=no_prazo,
+        papeis=frozenset(papeis),
+    )
+
+
+def analisar_aba(aba_name, papeis, versao):
+    """Retorna o ResultadoAnalise da aba, reaproveitando o cálculo da mesma versão
+
+    `papeis` são os papéis configurados na aba (EsquemaAba.papeis) e `versao`
+    identifica dados e configuração, ex.: (versao_da_aba(), esquema.versao).
+    """
+    hoje = date.today().isoformat()
+
+    def calcular():
+        linhas = db.session.execute(text(
+            'SELECT papel, valor, total, primeiro_id FROM analytics_agregado WHERE aba_name = :aba'
+        ), {'aba': aba_name}).all()
+        return _calcular(aba_name, [tuple(linha) for linha in linhas], papeis, hoje)
+
+    return _resultados.obter_ou_calcular((aba_name, versao, hoje), calcular)
+
+
+def versao_analise(aba_name):
+    """(versão dos dados, versão da configuração) da aba"""
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    return (versao_da_aba(aba_name), aba.config_version if aba else None)
+
+
+def analisar(aba_name, versao=None):
+    """Resultado do motor de análise para a aba, conforme os papéis configurados"""
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    papeis = esquema_da_aba(aba).papeis if aba else {}
+    return analisar_aba(aba_name, papeis, versao or versao_analise(aba_name))
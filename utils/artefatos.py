@@ -0,0 +1,185 @@
+"""Armazenamento em disco dos arquivos gerados (PDFs e Excel), endereçado pelo conteúdo
+
+Cada artefato é identificado por uma chave: o hash das entradas que
+determinam o arquivo (tipo e versão do modelo em VERSOES_MODELO, versão do
+esquema e dos dados da aba ou valores do registro, parâmetros). Os geradores
+consultam o armazenamento antes de gerar e guardam o resultado depois.
+
+Os arquivos ficam em ARTEFATOS_DIR/<aa>/<sha256>.<ext>, nomeados pelo hash do
+próprio conteúdo: chaves diferentes que resultam nos mesmos bytes dividem o
+arquivo. Os metadados ficam na tabela `artefato`; quando o total passa de
+ARTEFATOS_MAX_MB, os conteúdos acessados há mais tempo são descartados (LRU).
+
+As operações usam transações próprias (db.engine), independentes da sessão
+da requisição, para poderem ocorrer no meio de uma resposta em streaming que
+ainda está lendo um cursor.
+
+Configuração (app.config):
+    ARTEFATOS_DIR     diretório dos arquivos
+    ARTEFATOS_MAX_MB  tamanho máximo do armazenamento (padrão 500)
+"""
+
+import hashlib
+import mimetypes
+import os
+import uuid
+from datetime import datetime
+from flask import current_app, send_file
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert
+from models import db
+from models.artefato import Artefato
+from utils.versoes import gerar_etag
+
+# Versão do modelo de cada tipo de arquivo: incrementar quando o layout mudar
+# invalida os artefatos já guardados
+VERSOES_MODELO = {
+    'relatorio_pdf': 1,
+    'consolidado_pdf': 1,
+    'planilha_excel': 1,
+    'consolidado_excel': 1,
+    'plano_respostas_pdf': 1,
+}
+
+_EXTENSOES = {
+    'application/pdf': '.pdf',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+}
+
+
+def chave_artefato(tipo, *entradas):
+    """Chave do artefato a partir do tipo, da versão do seu modelo e das entradas do gerador"""
+    return gerar_etag(tipo, VERSOES_MODELO.get(tipo, 1), *entradas)
+
+
+def _diretorio():
+    diretorio = current_app.config.get('ARTEFATOS_DIR') or os.path.join(current_app.instance_path, 'artefatos')
+    os.makedirs(diretorio, exist_ok=True)
+    return diretorio
+
+
+def caminho_temporario(extensao):
+    """Caminho para o gerador escrever o arquivo antes de guardar() (mesmo disco do armazenamento)"""
+    pasta = os.path.join(_diretorio(), 'tmp')
+    os.makedirs(pasta, exist_ok=True)
+    return os.path.join(pasta, f'{uuid.uuid4().hex}.{extensao}')
+
+
+def obter(chave):
+    """Artefato guardado sob a chave (marcando o acesso), ou None"""
+    tabela = Artefato.__table__
+    with db.engine.begin() as conexao:
+        artefato = conexao.execute(select(tabela).where(tabela.c.chave == chave)).first()
+        if artefato is None:
+            return None
+        if not os.path.exists(artefato.arquivo):
+            conexao.execute(tabela.delete().where(tabela.c.id == artefato.id))
+            return None
+        conexao.execute(tabela.update().where(tabela.c.id == artefato.id).values(acessado_em=datetime.utcnow()))
+    return artefato
+
+
+def ler(artefato):
+    with open(artefato.arquivo, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def enviar_artefato(artefato, download_name):
+    """Resposta de download do artefato"""
+    return send_file(artefato.arquivo, mimetype=artefato.mimetype, as_attachment=True, download_name=download_name)
+
+
+def _hash_do_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _remover_se_sem_referencia(conexao, conteudo, arquivo):
+    tabela = Artefato.__table__
+    if not conexao.execute(select(tabela.c.id).where(tabela.c.conteudo == conteudo).limit(1)).first():
+        try:
+            os.remove(arquivo)
+        except OSError:
+            pass
+
+
+def guardar(chave, tipo, origem, mimetype):
+    """Guarda o arquivo sob a chave e devolve o artefato
+
+    `origem` são os bytes do arquivo ou o caminho de um arquivo temporário
+    (caminho_temporario()), que é movido para o armazenamento.
+    """
+    if isinstance(origem, bytes):
+        conteudo, tamanho = hashlib.sha256(origem).hexdigest(), len(origem)
+    else:
+        conteudo, tamanho = _hash_do_arquivo(origem), os.path.getsize(origem)
+
+    extensao = _EXTENSOES.get(mimetype) or mimetypes.guess_extension(mimetype or '') or ''
+    pasta = os.path.join(_diretorio(), conteudo[:2])
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = os.path.join(pasta, conteudo + extensao)
+
+    if isinstance(origem, bytes):
+        if not os.path.exists(arquivo):
+            temporario = f'{arquivo}.{uuid.uuid4().hex}.tmp'
+            with open(temporario, 'wb') as destino:
+                destino.write(origem)
+            os.replace(temporario, arquivo)
+    elif os.path.exists(arquivo):
+        os.remove(origem)
+    else:
+        os.replace(origem, arquivo)
+
+    tabela = Artefato.__table__
+    agora = datetime.utcnow()
+    valores = {'tipo': tipo, 'conteudo': conteudo, 'arquivo': arquivo, 'tamanho': tamanho,
+               'mimetype': mimetype, 'acessado_em': agora}
+    with db.engine.begin() as conexao:
+        anterior = conexao.execute(select(tabela.c.conteudo, tabela.c.arquivo).where(tabela.c.chave == chave)).first()
+        conexao.execute(
+            insert(tabela).values(chave=chave, created_at=agora, **valores)
+            .on_conflict_do_update(index_elements=['chave'], set_=valores)
+        )
+        if anterior and anterior.conteudo != conteudo:
+            _remover_se_sem_referencia(conexao, anterior.conteudo, anterior.arquivo)
+        artefato = conexao.execute(select(tabela).where(tabela.c.chave == chave)).first()
+
+    limitar()
+    return artefato
+
+
+def limitar(maximo_mb=None):
+    """Descarta os conteúdos usados há mais tempo até o armazenamento caber no limite; devolve quantos"""
+    if maximo_mb is None:
+        maximo_mb = current_app.config.get('ARTEFATOS_MAX_MB', 500)
+    maximo = maximo_mb * 1024 * 1024
+    tabela = Artefato.__table__
+
+    with db.engine.begin() as conexao:
+        conteudos = conexao.execute(
+            select(tabela.c.conteudo, func.max(tabela.c.arquivo).label('arquivo'),
+                   func.max(tabela.c.tamanho).label('tamanho'), func.max(tabela.c.acessado_em).label('ultimo'))
+            .group_by(tabela.c.conteudo)
+            .order_by(func.max(tabela.c.acessado_em).desc())
+        ).all()
+
+        total = 0
+        descartados = []
+        for i, linha in enumerate(conteudos):
+            total += linha.tamanho or 0
+            # O mais recente fica sempre, mesmo se sozinho passar do limite
+            if total > maximo and i > 0:
+                descartados.append(linha)
+
+        for linha in descartados:
+            conexao.execute(tabela.delete().where(tabela.c.conteudo == linha.conteudo))
+
+    for linha in descartados:
+        try:
+            os.remove(linha.arquivo)
+        except OSError:
+            pass
+    return len(descartados)
@@ -0,0 +1,132 @@
+"""Busca textual (SQLite FTS5) sobre os valores de PlanilhaData.row_data
+
+O índice `planilha_fts` usa o tokenizador unicode61 com remove_diacritics, de
+modo que "recomendacao" encontra "Recomendação". Ele é mantido por triggers
+no próprio SQLite, cobrindo rotas, importações e scripts de manutenção.
+"""
+
+from html import escape
+from models import db
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+_disponivel = None
+
+# Concatena os valores textuais do JSON (ignora listas como _temp_links)
+_CONTEUDO = "(SELECT group_concat(value, ' ') FROM json_each({linha}.row_data) WHERE type = 'text')"
+
+_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS planilha_fts USING fts5(
+        aba_name UNINDEXED,
+        conteudo,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS planilha_fts_ai AFTER INSERT ON planilha_data BEGIN
+        INSERT INTO planilha_fts(rowid, aba_name, conteudo)
+        VALUES (new.id, new.aba_name, {_CONTEUDO.format(linha='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS planilha_fts_au AFTER UPDATE OF row_data, aba_name ON planilha_data BEGIN
+        DELETE FROM planilha_fts WHERE rowid = old.id;
+        INSERT INTO planilha_fts(rowid, aba_name, conteudo)
+        VALUES (new.id, new.aba_name, {_CONTEUDO.format(linha='new')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS planilha_fts_ad AFTER DELETE ON planilha_data BEGIN
+        DELETE FROM planilha_fts WHERE rowid = old.id;
+    END""",
+]
+
+
+def garantir_indice_busca():
+    """Cria o índice e os triggers, populando o índice quando ele é novo"""
+    global _disponivel
+
+    existia = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'planilha_fts'"
+    )).first() is not None
+
+    try:
+        for ddl in _DDL:
+            db.session.execute(text(ddl))
+    except OperationalError as e:
+        db.session.rollback()
+        _disponivel = False
+        print(f"⚠ Busca FTS5 indisponível neste SQLite: {e}")
+        return
+
+    if not existia:
+        reconstruir_indice_busca(commit=False)
+        print("✓ Índice de busca textual criado")
+
+    db.session.commit()
+    _disponivel = True
+
+
+def reconstruir_indice_busca(commit=True):
+    """Recria todo o conteúdo do índice a partir de planilha_data"""
+    db.session.execute(text("DELETE FROM planilha_fts"))
+    db.session.execute(text(
+        "INSERT INTO planilha_fts(rowid, aba_name, conteudo) "
+        f"SELECT id, aba_name, {_CONTEUDO.format(linha='planilha_data')} FROM planilha_data"
+    ))
+    if commit:
+        db.session.commit()
+
+
+def busca_disponivel():
+    return bool(_disponivel)
+
+
+def montar_expressao(q):
+    """Converte o texto digitado em uma consulta FTS5 segura (AND de prefixos)"""
+    termos = []
+    for termo in str(q or '').replace('"', ' ').split():
+        termos.append(f'"{termo}"*')
+    return ' '.join(termos)
+
+
+def _destacar(trecho):
+    """Escapa o trecho e troca os marcadores do snippet por <mark>"""
+    return escape((trecho or '').strip()).replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+
+def subconsulta_ids(q, aba_name=None):
+    """SELECT dos ids que casam com a busca, para uso em filtros IN (...)"""
+    expressao = montar_expressao(q)
+    sql = 'SELECT rowid FROM planilha_fts WHERE planilha_fts MATCH :expressao'
+    params = {'expressao': expressao}
+    if aba_name:
+        sql += ' AND aba_name = :aba'
+        params['aba'] = aba_name
+    return text(sql).bindparams(**params)
+
+
+def buscar(q, aba_name=None, limite=50):
+    """Retorna os registros mais relevantes com trechos destacados"""
+    expressao = montar_expressao(q)
+    if not expressao:
+        return []
+
+    sql = """
+        SELECT planilha_fts.rowid AS registro_id,
+               planilha_fts.aba_name AS aba_name,
+               snippet(planilha_fts, 1, char(2), char(3), '…', 16) AS trecho,
+               bm25(planilha_fts) AS relevancia
+        FROM planilha_fts
+        JOIN aba_config ON aba_config.aba_name = planilha_fts.aba_name AND aba_config.is_active = 1
+        WHERE planilha_fts MATCH :expressao
+    """
+    params = {'expressao': expressao, 'limite': int(limite)}
+    if aba_name:
+        sql += ' AND planilha_fts.aba_name = :aba'
+        params['aba'] = aba_name
+    sql += ' ORDER BY bm25(planilha_fts) LIMIT :limite'
+
+    return [
+        {
+            'registro_id': linha.registro_id,
+            'aba_name': linha.aba_name,
+            'trecho': _destacar(linha.trecho),
+            'relevancia': round(-linha.relevancia, 4),
+        }
+        for linha in db.session.execute(text(sql), params)
+    ]
@@ -0,0 +1,209 @@
+"""Colunas geradas (json_extract) e indexadas sobre PlanilhaData.row_data
+
+Cada papel (status, setor, UG, origem, tipo, prazo) vira uma coluna virtual
+`g_<papel>` em planilha_data, cujo valor é extraído do JSON conforme o campo
+que cumpre aquele papel em cada aba. O papel de uma coluna pode ser definido
+explicitamente em AbaConfig (chave 'papel' da coluna) ou detectado pelo nome;
+com papel PAPEL_NENHUM a coluna não recebe papel nem pelo nome. Se o campo
+configurado não aparece no JSON dos registros (ex.: cabeçalho importado com
+quebra de linha), o papel é detectado pelo nome nas chaves dos registros.
+"""
+
+import json
+from models import db
+from models.planilha import AbaConfig
+from models.configuracoes import ConfiguracaoSistema
+from sqlalchemy import text, literal_column
+
+PAPEIS = {
+    'status': 'Status da recomendação',
+    'setor': 'Setor responsável',
+    'ug': 'Unidade gestora',
+    'origem': 'Origem',
+    'tipo': 'Tipo de ação',
+    'prazo': 'Prazo de término',
+}
+
+# Valor da chave 'papel' de uma coluna que não deve receber papel (nem detectado pelo nome)
+PAPEL_NENHUM = 'nenhum'
+
+
+def _papel_pelo_nome(nome):
+    """Detecta o papel de uma coluna pelo nome (mesmas regras do analytics)"""
+    nome_upper = str(nome).upper()
+
+    if 'STATUS' in nome_upper and 'RECOMENDA' in nome_upper:
+        return 'status'
+    if 'SETOR' in nome_upper and 'RESPONSÁVEL' in nome_upper:
+        return 'setor'
+    if 'UNIDADE' in nome_upper and 'GESTORA' in nome_upper or nome_upper == 'UG':
+        return 'ug'
+    if nome_upper == 'ORIGEM':
+        return 'origem'
+    if 'TIPO' in nome_upper and 'AÇÃO' in nome_upper:
+        return 'tipo'
+    if 'PRAZO' in nome_upper and ('TÉRMINO' in nome_upper or 'CONCLUSÃO' in nome_upper):
+        return 'prazo'
+    return None
+
+
+def resolver_papeis(colunas):
+    """Retorna {papel: nome do campo} para a lista de colunas de uma aba"""
+    papeis = {}
+
+    # Papéis definidos explicitamente têm prioridade
+    for col in colunas:
+        if isinstance(col, dict) and col.get('papel') in PAPEIS:
+            papeis.setdefault(col['papel'], col.get('name'))
+
+    for col in colunas:
+        nome = col.get('name') if isinstance(col, dict) else col
+        if isinstance(col, dict) and col.get('papel') == PAPEL_NENHUM:
+            continue  # papel removido manualmente
+        papel = _papel_pelo_nome(nome)
+        if papel and papel not in papeis:
+            papeis[papel] = nome
+
+    return papeis
+
+
+def chaves_dos_registros(aba_name):
+    """Chaves do JSON dos registros da aba, na ordem em que aparecem"""
+    return [linha[0] for linha in db.session.execute(text(
+        'SELECT j.key FROM planilha_data p, json_each(p.row_data) j '
+        'WHERE p.aba_name = :aba GROUP BY j.key ORDER BY MIN(p.id), MIN(j.id)'
+    ), {'aba': aba_name})]
+
+
+def papeis_da_aba(aba):
+    """resolver_papeis das colunas da aba, com o campo de cada papel presente nos registros
+
+    Um papel cujo campo configurado não é chave de nenhum registro passa para a
+    chave dos registros detectada pelo nome, se houver.
+    """
+    papeis = resolver_papeis(aba.get_columns())
+    chaves = chaves_dos_registros(aba.aba_name) if papeis else []
+    if chaves:
+        presentes = set(chaves)
+        pelas_chaves = resolver_papeis(chaves)
+        for papel, campo in papeis.items():
+            if campo not in presentes and papel in pelas_chaves:
+                papeis[papel] = pelas_chaves[papel]
+    return papeis
+
+
+def nome_coluna(papel):
+    return f'g_{papel}'
+
+
+def coluna(papel):
+    """Expressão SQL da coluna gerada, para uso em filtros e agrupamentos"""
+    if papel not in PAPEIS:
+        raise ValueError(f'Papel desconhecido: {papel}')
+    return literal_column(f'planilha_data.{nome_coluna(papel)}')
+
+
+def caminho_json(campo):
+    """Caminho do json_extract para a chave, escrita como no JSON gravado (ex.: quebra de linha como \\n)"""
+    return '$."' + json.dumps(campo, ensure_ascii=False)[1:-1] + '"'
+
+
+def _literal(valor):
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _expressao(campos_por_aba):
+    """Monta o CASE por aba com o json_extract do campo correspondente"""
+    ramos = []
+    for aba_name, campo in sorted(campos_por_aba.items()):
+        if not campo or '"' in campo:
+            continue
+        caminho = _literal(caminho_json(campo))
+        ramos.append(f"WHEN {_literal(aba_name)} THEN json_extract(row_data, {caminho})")
+
+    if not ramos:
+        return 'NULL'
+    return 'CASE aba_name ' + ' '.join(ramos) + ' END'
+
+
+def sincronizar_colunas_geradas():
+    """Cria, recria ou mantém as colunas geradas conforme a configuração atual
+
+    Só as colunas cuja expressão mudou são reconstruídas (DROP INDEX, DROP COLUMN,
+    ADD COLUMN e CREATE INDEX), sem necessidade de script de migração. Os
+    triggers dos agregados do analytics, que leem essas colunas, são recriados.
+    """
+    from utils.agregados import remover_triggers_agregados, garantir_agregados
+
+    campos = {papel: {} for papel in PAPEIS}
+    for aba in AbaConfig.query.all():
+        for papel, campo in papeis_da_aba(aba).items():
+            campos[papel][aba.aba_name] = campo
+
+    existentes = {
+        linha[1] for linha in db.session.execute(text('PRAGMA table_xinfo(planilha_data)'))
+    }
+
+    config = ConfiguracaoSistema.query.filter_by(chave='colunas_geradas').first()
+    estado = config.get_valor() if config else {}
+    novo_estado = {}
+    alteradas = []
+
+    for papel in PAPEIS:
+        nome = nome_coluna(papel)
+        indice = f'ix_planilha_data_{nome}'
+        expressao = _expressao(campos[papel])
+        novo_estado[papel] = expressao
+
+        if nome in existentes and estado.get(papel) == expressao:
+            continue
+
+        if not alteradas:
+            remover_triggers_agregados()
+
+        if nome in existentes:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {indice}'))
+            db.session.execute(text(f'ALTER TABLE planilha_data DROP COLUMN {nome}'))
+
+        db.session.execute(text(
+            f'ALTER TABLE planilha_data ADD COLUMN {nome} TEXT '
+            f'GENERATED ALWAYS AS ({expressao}) VIRTUAL'
+        ))
+        db.session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS {indice} ON planilha_data (aba_name, {nome})'
+        ))
+        alteradas.append(papel)
+
+    if alteradas or estado != novo_estado:
+        if not config:
+            config = ConfiguracaoSistema(chave='colunas_geradas')
+            db.session.add(config)
+        config.set_valor(novo_estado)
+        db.session.commit()
+
+    if alteradas:
+        garantir_agregados(reconstruir=True)
+
+    return alteradas
+
+
+def contar_por_papel(aba_name, papel, limite=None):
+    """Contagem agrupada (valor, quantidade) do papel, em ordem decrescente"""
+    col = nome_coluna(papel)
+    sql = (
+        f'SELECT {col} AS valor, COUNT(*) AS total FROM planilha_data '
+        f'WHERE aba_name = :aba AND {col} IS NOT NULL '
+        f'GROUP BY {col} ORDER BY total DESC, MIN(id)'
+    )
+    if limite:
+        sql += f' LIMIT {int(limite)}'
+
+    return [(linha.valor, linha.total) for linha in db.session.execute(text(sql), {'aba': aba_name})]
+
+
+def filtrar_por_papeis(consulta, filtros):
+    """Aplica filtros {papel: valor} a uma consulta de PlanilhaData"""
+    for papel, valor in filtros.items():
+        if papel in PAPEIS and valor not in (None, ''):
+            consulta = consulta.filter(coluna(papel) == valor)
+    return consulta
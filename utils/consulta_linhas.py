@@ -0,0 +1,108 @@
+"""Consulta paginada, ordenada e filtrada das linhas de uma aba no SQL"""
+
+from models.planilha import PlanilhaData
+from utils.colunas_geradas import PAPEIS, coluna, filtrar_por_papeis, caminho_json
+from utils.datas import parse_data
+from utils.busca import busca_disponivel, subconsulta_ids
+from sqlalchemy import func, text, cast, Float
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+
+def parametros_da_requisicao(args):
+    """Lê offset, limit, sort, dir, q e filtros por papel da query string"""
+    try:
+        offset = max(int(args.get('offset', 0)), 0)
+    except (TypeError, ValueError):
+        offset = 0
+
+    try:
+        limit = min(max(int(args.get('limit', LIMITE_PADRAO)), 1), LIMITE_MAXIMO)
+    except (TypeError, ValueError):
+        limit = LIMITE_PADRAO
+
+    direcao = str(args.get('dir', 'asc')).lower()
+
+    return {
+        'offset': offset,
+        'limit': limit,
+        'sort': args.get('sort', '').strip(),
+        'dir': 'desc' if direcao == 'desc' else 'asc',
+        'q': args.get('q', '').strip(),
+        'filtros': {papel: args.get(papel) for papel in PAPEIS if args.get(papel)},
+    }
+
+
+def _caminho_json(campo):
+    return caminho_json(campo.replace('"', ''))
+
+
+def _padrao_like(termo):
+    """'%termo%' com \\, % e _ escapados (LIKE ... ESCAPE '\\')"""
+    return '%' + termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _termos_busca(q):
+    """Termo normalizado e, se for uma data dd/mm/aaaa, também sua forma ISO"""
+    from utils.sqlite_funcoes import normalizar
+
+    termos = [normalizar(q)]
+    data = parse_data(q) if '/' in q else None
+    if data:
+        termos.append(data.isoformat())
+    return termos
+
+
+def montar_consulta(esquema, params):
+    """Monta a consulta (sem paginação) conforme busca, filtros e ordenação"""
+    aba_name = esquema.aba_name
+    consulta = PlanilhaData.query.filter(PlanilhaData.aba_name == aba_name)
+    consulta = filtrar_por_papeis(consulta, params.get('filtros', {}))
+
+    # Busca: índice FTS5 quando disponível; senão, varredura dos valores do JSON
+    q = params.get('q')
+    if q and busca_disponivel():
+        consulta = consulta.filter(PlanilhaData.id.in_(subconsulta_ids(q, aba_name)))
+    elif q:
+        condicoes = []
+        valores = {}
+        for i, termo in enumerate(_termos_busca(q)):
+            condicoes.append(f"normalizar(value) LIKE :termo{i} ESCAPE '\\'")
+            valores[f'termo{i}'] = _padrao_like(termo)
+        consulta = consulta.filter(text(
+            'EXISTS (SELECT 1 FROM json_each(planilha_data.row_data) '
+            f"WHERE {' OR '.join(condicoes)})"
+        ).bindparams(**valores))
+
+    # Ordenação: colunas com papel usam a coluna gerada como está, para aproveitar o
+    # índice (aba_name, g_<papel>); vazios (NULL) ficam no início
+    sort = params.get('sort')
+    if sort in esquema.tipos:
+        papeis = {campo: papel for papel, campo in esquema.papeis.items()}
+        valor = func.json_extract(PlanilhaData.row_data, _caminho_json(sort))
+        if sort in papeis:
+            expressao = coluna(papeis[sort])
+        elif esquema.tipo(sort) == 'number':
+            # Números gravados na forma canônica ('1234.56'); vazios (NULL) ficam no início, como na tela
+            expressao = cast(func.nullif(valor, ''), Float)
+        elif esquema.tipo(sort) == 'date':
+            # Campos ausentes ordenam como vazios, igual à ordenação na tela
+            expressao = func.coalesce(valor, '')
+        else:
+            expressao = func.coalesce(func.normalizar(valor), '')
+
+        expressao = expressao.desc() if params.get('dir') == 'desc' else expressao.asc()
+        consulta = consulta.order_by(expressao, PlanilhaData.row_order)
+    else:
+        consulta = consulta.order_by(PlanilhaData.row_order)
+
+    return consulta
+
+
+def pagina(esquema, params):
+    """Retorna (total, registros da página)"""
+    consulta = montar_consulta(esquema, params)
+    total = consulta.order_by(None).count()
+    registros = consulta.offset(params['offset']).limit(params['limit']).all()
+    return total, registros
@@ -0,0 +1,73 @@
+"""Conversão de datas dos registros das planilhas
+
+As datas são gravadas em row_data sempre no formato ISO ('aaaa-mm-dd'), o que
+permite comparações e ordenação diretamente no SQL. O formato 'dd/mm/aaaa'
+é usado apenas na exibição e nos formulários.
+"""
+
+from datetime import date, datetime
+
+
+def parse_data(valor):
+    """Converte 'dd/mm/aaaa', 'aaaa-mm-dd', 'aaaa-mm-dd 00:00:00' ou date em date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+
+    texto = str(valor).strip()
+    try:
+        if '/' in texto:
+            parts = texto.split(' ')[0].split('/')
+            if len(parts) == 3 and len(parts[2]) == 4:
+                return date(int(parts[2]), int(parts[1]), int(parts[0]))
+        elif '-' in texto:
+            parts = texto.split(' ')[0].split('T')[0].split('-')
+            if len(parts) == 3 and len(parts[0]) == 4:
+                return date(int(parts[0]), int(parts[1]), int(parts[2]))
+    except ValueError:
+        pass
+    return None
+
+
+def para_iso(valor):
+    """Valor de data no formato de armazenamento; textos que não são datas ficam como estão"""
+    if valor in (None, ''):
+        return valor
+    data = parse_data(valor)
+    if data is None:
+        return valor
+    return data.isoformat()
+
+
+def para_exibicao(valor):
+    """'aaaa-mm-dd' -> 'dd/mm/aaaa'; textos que não são datas ficam como estão"""
+    if valor in (None, ''):
+        return valor
+
+    texto = str(valor)
+    # Caminho rápido para o formato gravado
+    if len(texto) == 10 and texto[4] == '-' and texto[7] == '-':
+        return f'{texto[8:10]}/{texto[5:7]}/{texto[0:4]}'
+
+    data = parse_data(texto)
+    if data is None:
+        return valor
+    return data.strftime('%d/%m/%Y')
+
+
+def normalizar_datas(dados, campos):
+    """Converte para ISO os campos de data de um registro (altera dados)
+
+    Retorna True se algum valor foi alterado.
+    """
+    alterado = False
+    for campo in campos:
+        valor = dados.get(campo)
+        if not valor:
+            continue
+        novo = para_iso(valor)
+        if novo != valor:
+            dados[campo] = novo
+            alterado = True
+    return alterado
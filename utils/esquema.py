@@ -0,0 +1,108 @@
+"""Esquema compilado das colunas de cada aba, mantido em cache no processo
+
+O JSON de colunas de AbaConfig é decodificado uma única vez por versão da
+configuração. AbaConfig.config_version é incrementado a cada set_columns() e
+set_orange_columns(), o que invalida o cache em todos os processos; as rotas
+de configuração também chamam invalidar_esquema() para o processo atual.
+"""
+
+import threading
+from utils.sqlite_funcoes import normalizar
+from utils.colunas_geradas import resolver_papeis
+from utils.prazos import tipo_prazo_campo
+from utils.datas import para_iso, para_exibicao, normalizar_datas
+from utils.tipos_colunas import numero, numero_canonico
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class EsquemaAba:
+    """Colunas de uma aba já decodificadas e pré-processadas"""
+
+    def __init__(self, aba_name, versao, colunas, laranjas):
+        self.aba_name = aba_name
+        self.versao = versao
+        self.colunas = colunas
+        self.nomes = []
+        self.tipos = {}
+
+        for col in colunas:
+            nome = col.get('name', col) if isinstance(col, dict) else col
+            tipo = col.get('type', 'text') if isinstance(col, dict) else 'text'
+            self.nomes.append(nome)
+            self.tipos[nome] = tipo
+
+        self.laranjas = list(laranjas)
+        self.laranjas_set = frozenset(laranjas)
+        self.nomes_laranja = [nome for nome in self.nomes if nome in self.laranjas_set]
+        self.colunas_laranja = [col for col, nome in zip(colunas, self.nomes) if nome in self.laranjas_set]
+        # Colunas do tipo data e campos de prazo reconhecidos pelo nome
+        self.colunas_data = tuple(
+            nome for nome in self.nomes
+            if self.tipos[nome] == 'date' or tipo_prazo_campo(nome)
+        )
+        self.colunas_data_set = frozenset(self.colunas_data)
+        self.colunas_numero = frozenset(nome for nome in self.nomes if self.tipos[nome] == 'number')
+        self.nomes_normalizados = {normalizar(nome): nome for nome in self.nomes}
+        self.papeis = resolver_papeis(colunas)
+
+    def tipo(self, nome):
+        return self.tipos.get(nome, 'text')
+
+    def formatar_para_exibicao(self, row):
+        """Converte as datas do registro para dd/mm/aaaa (altera e retorna row)"""
+        for nome in self.colunas_data:
+            if row.get(nome):
+                row[nome] = para_exibicao(row[nome])
+        return row
+
+    def normalizar_datas(self, dados):
+        """Converte as datas do registro para ISO (altera dados); True se mudou algo"""
+        return normalizar_datas(dados, self.colunas_data)
+
+    def valor_para_armazenamento(self, nome, valor):
+        """Normaliza um valor vindo de formulário antes de gravar"""
+        if valor and nome in self.colunas_data_set:
+            return para_iso(valor)
+        if valor and nome in self.colunas_numero:
+            convertido = numero(valor)
+            return numero_canonico(convertido) if convertido is not None else valor
+        return valor
+
+    def ler_formulario(self, form, nomes=None, strip=False):
+        """Monta {coluna: valor} a partir do formulário para as colunas indicadas"""
+        dados = {}
+        for nome in (self.nomes if nomes is None else nomes):
+            valor = form.get(nome, '')
+            if strip:
+                valor = valor.strip()
+            dados[nome] = self.valor_para_armazenamento(nome, valor)
+        return dados
+
+    def __repr__(self):
+        return f'<EsquemaAba {self.aba_name} v{self.versao}>'
+
+
+def esquema_da_aba(aba):
+    """Retorna o esquema compilado de uma AbaConfig, recompilando se a versão mudou"""
+    versao = aba.config_version or 0
+    esquema = _cache.get(aba.aba_name)
+    if esquema is not None and esquema.versao == versao:
+        return esquema
+
+    with _lock:
+        esquema = _cache.get(aba.aba_name)
+        if esquema is None or esquema.versao != versao:
+            esquema = EsquemaAba(aba.aba_name, versao, aba.get_columns(), aba.get_orange_columns())
+            _cache[aba.aba_name] = esquema
+    return esquema
+
+
+def invalidar_esquema(aba_name=None):
+    """Descarta o esquema em cache (de uma aba ou de todas)"""
+    with _lock:
+        if aba_name is None:
+            _cache.clear()
+        else:
+            _cache.pop(aba_name, None)
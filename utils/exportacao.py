@@ -0,0 +1,345 @@
+"""Exportação das planilhas em streaming, direto do cursor SQL
+
+Os registros são lidos em lotes (yield_per) e escritos um a um, sem montar
+DataFrame nem carregar a aba inteira: o uso de memória não cresce com o
+número de linhas.
+
+O Excel usa o modo write_only do openpyxl, que grava cada linha no XML da
+planilha assim que ela é adicionada. Nesse modo as larguras das colunas vão no
+início do XML, antes das linhas; por isso a ordem das colunas e o maior
+tamanho de valor de cada uma vêm de uma passada agregada no SQLite
+(json_each), que não traz os registros para o Python.
+
+Na pasta consolidada (uma planilha por aba) essa passada de cada aba roda em
+threads paralelas (o SQLite libera o GIL durante a consulta); as linhas são
+escritas em seguida, uma planilha por vez, pois o openpyxl grava a pasta num
+único fluxo.
+
+CSV, NDJSON e Parquet são gerados em blocos enquanto o cursor é lido, para
+respostas com transferência em partes (chunked): a busca, os filtros e a
+ordenação são os mesmos da grade (utils.consulta_linhas). O Parquet (pyarrow,
+opcional) é escrito em grupos de LOTE_EXPORTACAO linhas; o rodapé do arquivo
+vai no último bloco.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+from sqlalchemy import text, bindparam
+from models import db
+from models.planilha import PlanilhaData
+
+LOTE_EXPORTACAO = 500
+
+ESTILO_CABECALHO = 'ueci_cabecalho'
+ESTILO_CELULA = 'ueci_celula'
+
+LARGURA_MINIMA = 10
+LARGURA_MAXIMA = 60
+
+MIMETYPE_CSV = 'text/csv'  # o Flask acrescenta '; charset=utf-8' aos mimetypes text/*
+MIMETYPE_NDJSON = 'application/x-ndjson'
+MIMETYPE_PARQUET = 'application/vnd.apache.parquet'
+
+
+def _sem_progresso(fracao, mensagem=None):
+    pass
+
+
+def titulo_planilha(nome):
+    """Nome válido para a planilha do Excel (até 31 caracteres, sem \\ / * ? : [ ])"""
+    return re.sub(r'[\\/*?:\[\]]', '-', nome)[:31]
+
+
+def colunas_da_aba(aba_name):
+    """[(coluna, maior tamanho de valor), ...] na ordem em que as colunas aparecem nos registros"""
+    estatisticas = db.session.execute(text(
+        'SELECT j.key, MIN(COALESCE(p.row_order, -1) * 4294967296 + p.id) AS primeira, '
+        'MAX(length(j.value)) AS tamanho '
+        'FROM planilha_data p, json_each(p.row_data) j '
+        'WHERE p.aba_name = :aba GROUP BY j.key'
+    ), {'aba': aba_name}).all()
+    if not estatisticas:
+        return []
+
+    # Desempate pela posição da coluna no primeiro registro em que ela aparece
+    primeiros = {linha.primeira & 0xFFFFFFFF for linha in estatisticas}
+    posicoes = {}
+    for registro_id, row_data in db.session.execute(
+        text('SELECT id, row_data FROM planilha_data WHERE id IN :ids').bindparams(bindparam('ids', expanding=True)),
+        {'ids': sorted(primeiros)}
+    ):
+        posicoes[registro_id] = {coluna: i for i, coluna in enumerate(json.loads(row_data))}
+
+    estatisticas = sorted(
+        estatisticas,
+        key=lambda linha: (linha.primeira, posicoes[linha.primeira & 0xFFFFFFFF].get(linha.key, 0))
+    )
+    return [(linha.key, linha.tamanho or 0) for linha in estatisticas]
+
+
+def registros_da_aba(aba_name):
+    """Itera os registros da aba (dicts) em ordem, lendo o cursor em lotes"""
+    resultado = db.session.connection().execution_options(yield_per=LOTE_EXPORTACAO).execute(
+        text('SELECT row_data FROM planilha_data WHERE aba_name = :aba ORDER BY row_order, id'),
+        {'aba': aba_name}
+    )
+    for (row_data,) in resultado:
+        yield json.loads(row_data) if row_data else {}
+
+
+def _valor_celula(valor):
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def registrar_estilos_excel(workbook):
+    """Estilos nomeados do cabeçalho e das células (uma vez por pasta de trabalho)"""
+    cabecalho = NamedStyle(name=ESTILO_CABECALHO)
+    cabecalho.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+    cabecalho.font = Font(bold=True, color='FFFFFF', size=11)
+    cabecalho.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    celula = NamedStyle(name=ESTILO_CELULA)
+    celula.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+
+    for estilo in (cabecalho, celula):
+        if estilo.name not in workbook.named_styles:
+            workbook.add_named_style(estilo)
+
+
+def escrever_aba_excel(workbook, aba_name, esquema, progresso=None, colunas=None):
+    """Adiciona à pasta (write_only) uma planilha com os registros da aba formatados
+
+    `colunas` aceita o resultado de colunas_da_aba() já calculado.
+    """
+    progresso = progresso or _sem_progresso
+
+    worksheet = workbook.create_sheet(title=titulo_planilha(aba_name))
+    if colunas is None:
+        colunas = colunas_da_aba(aba_name)
+    if not colunas:
+        return 0
+
+    nomes = [coluna for coluna, _ in colunas]
+    for i, (coluna, tamanho) in enumerate(colunas, 1):
+        largura = max(len(str(coluna)), tamanho) + 2
+        worksheet.column_dimensions[get_column_letter(i)].width = min(max(largura, LARGURA_MINIMA), LARGURA_MAXIMA)
+    worksheet.freeze_panes = 'A2'
+    worksheet.row_dimensions[1].height = 30
+
+    def celula(valor, estilo):
+        cell = WriteOnlyCell(worksheet, value=valor)
+        cell.style = estilo
+        return cell
+
+    worksheet.append([celula(coluna, ESTILO_CABECALHO) for coluna in nomes])
+
+    total = db.session.execute(
+        text('SELECT COUNT(*) FROM planilha_data WHERE aba_name = :aba'), {'aba': aba_name}
+    ).scalar() or 1
+
+    escritos = 0
+    for registro in registros_da_aba(aba_name):
+        esquema.formatar_para_exibicao(registro)
+        worksheet.append([celula(_valor_celula(registro.get(coluna)), ESTILO_CELULA) for coluna in nomes])
+        escritos += 1
+        if escritos % LOTE_EXPORTACAO == 0:
+            progresso(escritos / total, f'{escritos} de {total} registros')
+
+    return escritos
+
+
+def escrever_planilha_excel(aba_name, esquema, destino, progresso=None):
+    """Grava em `destino` (caminho ou arquivo) o Excel da aba com formatação profissional"""
+    workbook = Workbook(write_only=True)
+    registrar_estilos_excel(workbook)
+    escrever_aba_excel(workbook, aba_name, esquema, progresso)
+    workbook.save(destino)
+
+
+def _colunas_em_paralelo(nomes):
+    """colunas_da_aba() de várias abas em threads, cada uma com sua sessão"""
+    app = current_app._get_current_object()
+    workers = current_app.config.get('EXPORTACAO_WORKERS') or min(4, os.cpu_count() or 1)
+
+    def calcular(aba_name):
+        with app.app_context():
+            try:
+                return colunas_da_aba(aba_name)
+            finally:
+                db.session.remove()
+
+    if workers <= 1 or len(nomes) <= 1:
+        return [colunas_da_aba(aba_name) for aba_name in nomes]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exportacao') as pool:
+        return list(pool.map(calcular, nomes))
+
+
+def escrever_consolidado_excel(abas, destino, progresso=None):
+    """Grava em `destino` uma pasta com uma planilha por aba ([(aba_name, esquema), ...])"""
+    progresso = progresso or _sem_progresso
+
+    colunas = _colunas_em_paralelo([aba_name for aba_name, _ in abas])
+    progresso(0.1, 'Colunas analisadas')
+
+    workbook = Workbook(write_only=True)
+    registrar_estilos_excel(workbook)
+
+    for i, ((aba_name, esquema), colunas_aba) in enumerate(zip(abas, colunas)):
+        def progresso_aba(fracao, mensagem=None, i=i):
+            progresso(0.1 + 0.9 * (i + fracao) / len(abas), f'{aba_name}: {mensagem}' if mensagem else aba_name)
+
+        escrever_aba_excel(workbook, aba_name, esquema, progresso_aba, colunas=colunas_aba)
+        progresso(0.1 + 0.9 * (i + 1) / len(abas), f'{aba_name} concluída')
+
+    if not abas:
+        workbook.create_sheet('Consolidado')
+    workbook.save(destino)
+
+
+def campos_da_exportacao(aba_name, esquema, pedidos=None):
+    """Campos exportados: 'id' e as colunas da aba, ou a projeção pedida (fields=a,b,...)
+
+    Levanta ValueError com os campos desconhecidos.
+    """
+    conhecidos = ['id'] + [coluna for coluna, _ in colunas_da_aba(aba_name)]
+    conhecidos += [nome for nome in esquema.nomes if nome not in conhecidos]
+    if not pedidos:
+        return conhecidos
+
+    campos = list(dict.fromkeys(campo.strip() for campo in pedidos.split(',') if campo.strip()))
+    desconhecidos = [campo for campo in campos if campo not in conhecidos]
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)}")
+    return campos
+
+
+def registros_filtrados(consulta):
+    """Itera (dicts com 'id') a consulta da grade (utils.consulta_linhas.montar_consulta) em lotes"""
+    linhas = consulta.with_entities(PlanilhaData.id, PlanilhaData.row_data).yield_per(LOTE_EXPORTACAO)
+    for registro_id, row_data in linhas:
+        registro = json.loads(row_data) if row_data else {}
+        registro['id'] = registro_id
+        yield registro
+
+
+def _em_lotes(registros):
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) == LOTE_EXPORTACAO:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return str(valor)
+
+
+def blocos_csv(registros, campos):
+    """CSV (UTF-8 com BOM, para abrir direto no Excel) em blocos de LOTE_EXPORTACAO linhas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    escritor.writerow(campos)
+    for lote in _em_lotes(registros):
+        escritor.writerows([_valor_celula(registro.get(campo)) for campo in campos] for registro in lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def blocos_ndjson(registros, campos):
+    """Um objeto JSON por linha, em blocos de LOTE_EXPORTACAO linhas"""
+    for lote in _em_lotes(registros):
+        yield ''.join(
+            json.dumps({campo: registro.get(campo) for campo in campos}, ensure_ascii=False) + '\n'
+            for registro in lote
+        ).encode('utf-8')
+
+
+def parquet_disponivel():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SaidaEmBlocos:
+    """Destino de escrita (pyarrow, zipfile) que acumula os bytes até o próximo bloco da resposta"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self.partes.append(dados)
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def blocos_parquet(registros, campos):
+    """Parquet escrito em grupos de linhas (um por lote); 'id' inteiro e demais colunas texto"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([(campo, pa.int64() if campo == 'id' else pa.string()) for campo in campos])
+    saida = SaidaEmBlocos()
+    escritor = pq.ParquetWriter(saida, esquema, compression='snappy')
+
+    for lote in _em_lotes(registros):
+        colunas = [
+            pa.array([registro.get(campo) for registro in lote], type=pa.int64()) if campo == 'id'
+            else pa.array([_texto(registro.get(campo)) for registro in lote], type=pa.string())
+            for campo in campos
+        ]
+        escritor.write_table(pa.Table.from_arrays(colunas, schema=esquema), row_group_size=LOTE_EXPORTACAO)
+        yield saida.retirar()
+
+    escritor.close()
+    yield saida.retirar()
+
+
+# formato -> (gerador de blocos, mimetype)
+FORMATOS_STREAMING = {
+    'csv': (blocos_csv, MIMETYPE_CSV),
+    'ndjson': (blocos_ndjson, MIMETYPE_NDJSON),
+    'parquet': (blocos_parquet, MIMETYPE_PARQUET),
+}
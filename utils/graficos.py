@@ -0,0 +1,399 @@
+"""Gráficos dos relatórios com cache das imagens renderizadas
+
+Cada gráfico é descrito por uma especificação (tipo, rótulos, valores, cores,
+título). O PNG é guardado num cache em memória e, opcionalmente, num diretório
+em disco com limite de tamanho (LRU pela data de acesso), indexado pelo hash da
+especificação. O PDF executivo e a rota /analytics/chart/<aba>/<tipo>.png
+compartilham as mesmas imagens.
+
+Há dois backends para o PDF: 'matplotlib' (PNG embutido, o mesmo da rota de
+imagens) e 'reportlab' (desenho vetorial nativo, utils/graficos_vetoriais).
+
+Configuração (app.config):
+    GRAFICOS_BACKEND       backend padrão do PDF ('matplotlib' ou 'reportlab')
+    GRAFICOS_CACHE_ITENS   itens mantidos em memória (padrão 64)
+    GRAFICOS_CACHE_DIR     diretório do cache em disco (None desativa)
+    GRAFICOS_CACHE_MAX_MB  tamanho máximo do cache em disco (padrão 50)
+    GRAFICOS_PARALELO      renderiza os PNGs de um relatório em processos (padrão True)
+    GRAFICOS_PROCESSOS     tamanho do pool de processos (padrão: nº de CPUs, até 4; utils.processos)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from flask import current_app
+from reportlab.platypus import Image as RLImage
+from utils.analise import ROTULOS_STATUS, CORES_STATUS
+from utils.processos import PoolCompartilhado, processos_padrao
+from utils.versoes import CacheLRU
+
+BACKENDS = ('matplotlib', 'reportlab')
+
+_memoria = None
+_lock_disco = threading.Lock()
+
+
+def _pyplot():
+    """Importa o pyplot sob demanda (o backend vetorial não precisa dele)"""
+    import matplotlib
+    matplotlib.use('Agg')  # Backend sem interface gráfica
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def criar_grafico_pizza(labels, data, colors, titulo):
+    """Cria um gráfico de pizza profissional"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 6), facecolor='white')
+
+    # Calcular percentuais
+    total = sum(data)
+    percentages = [(x/total)*100 for x in data]
+
+    # Criar pizza
+    wedges, texts, autotexts = ax.pie(
+        data,
+        labels=None,
+        autopct='%1.1f%%',
+        colors=colors,
+        startangle=90,
+        textprops={'fontsize': 11, 'weight': 'bold', 'color': 'white'}
+    )
+
+    # Legenda
+    legend_labels = [f'{label}: {val} ({perc:.1f}%)' for label, val, perc in zip(labels, data, percentages)]
+    ax.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1), fontsize=10)
+
+    ax.set_title(titulo, fontsize=14, weight='bold', pad=20)
+
+    # Salvar em buffer
+    buf = BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
+def criar_grafico_barras(labels, data, titulo, cor='#667eea', horizontal=False):
+    """Cria um gráfico de barras profissional"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6), facecolor='white')
+
+    # Calcular percentuais
+    total = sum(data)
+    percentages = [(x/total)*100 for x in data]
+
+    if horizontal:
+        bars = ax.barh(labels, data, color=cor, edgecolor='black', linewidth=0.7)
+        ax.set_xlabel('Quantidade', fontsize=11, weight='bold')
+        ax.set_ylabel('')
+
+        # Adicionar valores e percentuais nas barras
+        for i, (bar, val, perc) in enumerate(zip(bars, data, percentages)):
+            width = bar.get_width()
+            ax.text(width + max(data)*0.01, bar.get_y() + bar.get_height()/2,
+                   f'{val} ({perc:.1f}%)',
+                   ha='left', va='center', fontsize=10, weight='bold')
+    else:
+        bars = ax.bar(labels, data, color=cor, edgecolor='black', linewidth=0.7)
+        ax.set_ylabel('Quantidade', fontsize=11, weight='bold')
+        ax.set_xlabel('')
+        plt.xticks(rotation=45, ha='right')
+
+        # Adicionar valores e percentuais nas barras
+        for bar, val, perc in zip(bars, data, percentages):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + max(data)*0.01,
+                   f'{val}\n({perc:.1f}%)',
+                   ha='center', va='bottom', fontsize=10, weight='bold')
+
+    ax.set_title(titulo, fontsize=14, weight='bold', pad=20)
+    ax.grid(axis='x' if horizontal else 'y', alpha=0.3, linestyle='--')
+    ax.spines['right'].set_visible(False)
+    ax.spines['top'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    ax.spines['bottom'].set_visible(False)
+
+    # Salvar em buffer
+    buf = BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
+def graficos_do_relatorio(resultado):
+    """Especificações dos gráficos do relatório executivo, por tipo (na ordem do PDF)"""
+    graficos = {}
+
+    if sum(resultado.consolidado) > 0:
+        graficos['status_consolidado'] = {
+            'tipo': 'pizza',
+            'labels': ROTULOS_STATUS,
+            'data': list(resultado.consolidado),
+            'colors': CORES_STATUS,
+            'titulo': 'Status Consolidado das Recomendações',
+        }
+
+    if resultado.status:
+        graficos['status_detalhado'] = {
+            'tipo': 'barras',
+            'labels': [str(s)[:40] for s, _ in resultado.status],
+            'data': [count for _, count in resultado.status],
+            'cor': '#667eea',
+            'horizontal': True,
+            'titulo': 'Distribuição Detalhada por Status',
+        }
+
+    ug_counts = resultado.contagens.get('ug')
+    if ug_counts:
+        graficos['por_ug'] = {
+            'tipo': 'pizza',
+            'labels': [str(s) for s, _ in ug_counts],
+            'data': [count for _, count in ug_counts],
+            'colors': ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6'][:len(ug_counts)],
+            'titulo': 'Distribuição por Unidade Gestora',
+        }
+
+    origem_counts = resultado.contagens.get('origem')
+    if origem_counts:
+        graficos['por_origem'] = {
+            'tipo': 'barras',
+            'labels': [str(s) for s, _ in origem_counts],
+            'data': [count for _, count in origem_counts],
+            'cor': '#10b981',
+            'horizontal': False,
+            'titulo': 'Distribuição por Fonte/Origem',
+        }
+
+    tipo_counts = resultado.contagens.get('tipo')
+    if tipo_counts:
+        graficos['por_tipo'] = {
+            'tipo': 'pizza',
+            'labels': [str(s) for s, _ in tipo_counts],
+            'data': [count for _, count in tipo_counts],
+            'colors': ['#8b5cf6', '#f59e0b'][:len(tipo_counts)],
+            'titulo': 'Tipo de Ação: Melhoria vs Regularização',
+        }
+
+    if resultado.tem_prazos:
+        graficos['situacao_prazos'] = {
+            'tipo': 'pizza',
+            'labels': ['No Prazo', 'Atrasadas'],
+            'data': [resultado.no_prazo, resultado.atrasadas],
+            'colors': ['#10b981', '#ef4444'],
+            'titulo': 'Situação dos Prazos de Implementação',
+        }
+
+    return graficos
+
+
+def graficos_consolidados(resultados):
+    """Especificações dos gráficos do resumo do relatório consolidado (várias abas)"""
+    graficos = {}
+
+    consolidado = [sum(valores) for valores in zip(*(r.consolidado for r in resultados))]
+    if sum(consolidado) > 0:
+        graficos['status_consolidado'] = {
+            'tipo': 'pizza',
+            'labels': ROTULOS_STATUS,
+            'data': consolidado,
+            'colors': CORES_STATUS,
+            'titulo': 'Status Consolidado - Todas as Planilhas',
+        }
+
+    graficos['por_aba'] = {
+        'tipo': 'barras',
+        'labels': [r.aba_name[:40] for r in resultados],
+        'data': [r.total_registros for r in resultados],
+        'cor': '#667eea',
+        'horizontal': True,
+        'titulo': 'Recomendações por Planilha',
+    }
+
+    return graficos
+
+
+def chave_grafico(spec):
+    """Hash da especificação (tipo, rótulos, valores, cores e título)"""
+    conteudo = json.dumps(spec, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def renderizar(spec):
+    """Renderiza a especificação e retorna os bytes do PNG (sem cache)"""
+    if spec['tipo'] == 'pizza':
+        buf = criar_grafico_pizza(spec['labels'], spec['data'], spec['colors'], spec['titulo'])
+    else:
+        buf = criar_grafico_barras(spec['labels'], spec['data'], spec['titulo'],
+                                   cor=spec.get('cor', '#667eea'), horizontal=spec.get('horizontal', False))
+    return buf.getvalue()
+
+
+def _cache_memoria():
+    global _memoria
+    if _memoria is None:
+        _memoria = CacheLRU(maximo=current_app.config.get('GRAFICOS_CACHE_ITENS', 64))
+    return _memoria
+
+
+def _diretorio_disco():
+    diretorio = current_app.config.get('GRAFICOS_CACHE_DIR')
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    return diretorio
+
+
+def _ler_disco(diretorio, chave):
+    caminho = os.path.join(diretorio, f'{chave}.png')
+    try:
+        with open(caminho, 'rb') as arquivo:
+            png = arquivo.read()
+        os.utime(caminho)  # marca o acesso para o LRU
+        return png
+    except OSError:
+        return None
+
+
+def _gravar_disco(diretorio, chave, png):
+    caminho = os.path.join(diretorio, f'{chave}.png')
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    try:
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(png)
+        os.replace(temporario, caminho)
+    except OSError:
+        return
+    _limitar_disco(diretorio, current_app.config.get('GRAFICOS_CACHE_MAX_MB', 50) * 1024 * 1024)
+
+
+def _limitar_disco(diretorio, limite_bytes):
+    """Remove os PNGs acessados há mais tempo até caber no limite"""
+    with _lock_disco:
+        arquivos = []
+        for entrada in os.scandir(diretorio):
+            if entrada.name.endswith('.png'):
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= limite_bytes:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+            except OSError:
+                pass
+
+
+def grafico_png(spec):
+    """PNG do gráfico, vindo do cache em memória, do disco ou renderizado agora"""
+    chave = chave_grafico(spec)
+    memoria = _cache_memoria()
+
+    png = memoria.obter(chave)
+    if png is not None:
+        return png
+
+    diretorio = _diretorio_disco()
+    if diretorio:
+        png = _ler_disco(diretorio, chave)
+
+    if png is None:
+        png = renderizar(spec)
+        if diretorio:
+            _gravar_disco(diretorio, chave, png)
+
+    return memoria.guardar(chave, png)
+
+
+def _aquecer_processo():
+    """Inicializador dos processos: importa o pyplot e carrega as fontes uma vez"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(2, 2))
+    ax.pie([1, 1])
+    ax.set_title('aquecimento', weight='bold')
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+_pool = PoolCompartilhado(inicializador=_aquecer_processo)
+
+
+def _pool_graficos():
+    """Pool de processos compartilhado, criado no primeiro uso (None = renderizar em série)"""
+    if not current_app.config.get('GRAFICOS_PARALELO', True):
+        return None
+    processos = current_app.config.get('GRAFICOS_PROCESSOS') or processos_padrao()
+    return _pool.obter(processos) if processos > 1 else None
+
+
+def graficos_png(specs):
+    """PNGs de vários gráficos ({tipo: spec} -> {tipo: png}), renderizando em paralelo
+
+    Os que já estão em cache não são renderizados; os demais vão para o pool
+    de processos e, em caso de falha do pool, são renderizados em série.
+    """
+    memoria = _cache_memoria()
+    diretorio = _diretorio_disco()
+
+    pngs = {}
+    pendentes = {}
+    for tipo, spec in specs.items():
+        chave = chave_grafico(spec)
+        png = memoria.obter(chave)
+        if png is None and diretorio:
+            png = _ler_disco(diretorio, chave)
+            if png is not None:
+                memoria.guardar(chave, png)
+        if png is None:
+            pendentes[tipo] = (chave, spec)
+        else:
+            pngs[tipo] = png
+
+    pool = _pool_graficos() if len(pendentes) > 1 else None
+    renderizados = {}
+    if pool is not None:
+        try:
+            futuros = {tipo: pool.submit(renderizar, spec) for tipo, (_, spec) in pendentes.items()}
+            renderizados = {tipo: futuro.result() for tipo, futuro in futuros.items()}
+        except BrokenProcessPool as e:
+            print(f"⚠ Pool de gráficos indisponível, renderizando em série: {e}")
+            _pool.descartar()
+            renderizados = {}
+
+    for tipo, (chave, spec) in pendentes.items():
+        png = renderizados.get(tipo)
+        if png is None:
+            png = renderizar(spec)
+        if diretorio:
+            _gravar_disco(diretorio, chave, png)
+        pngs[tipo] = memoria.guardar(chave, png)
+
+    return pngs
+
+
+def backend_graficos(solicitado=None):
+    """Backend pedido na requisição ou, na falta dele, o configurado"""
+    backend = solicitado or current_app.config.get('GRAFICOS_BACKEND', 'matplotlib')
+    return backend if backend in BACKENDS else 'matplotlib'
+
+
+def elemento_pdf(spec, largura, altura, backend='matplotlib'):
+    """Flowable do gráfico para o PDF no backend escolhido"""
+    if backend == 'reportlab':
+        from utils.graficos_vetoriais import desenho_pizza, desenho_barras
+
+        if spec['tipo'] == 'pizza':
+            return desenho_pizza(spec['labels'], spec['data'], spec['colors'], spec['titulo'],
+                                 largura=largura, altura=altura)
+        return desenho_barras(spec['labels'], spec['data'], spec['titulo'], cor=spec.get('cor', '#667eea'),
+                              horizontal=spec.get('horizontal', False), largura=largura, altura=altura)
+
+    return RLImage(BytesIO(grafico_png(spec)), width=largura, height=altura)
@@ -0,0 +1,133 @@
+"""Gráficos vetoriais nativos do ReportLab (reportlab.graphics) para os PDFs
+
+Equivalentes aos gráficos de pizza e de barras do matplotlib, com os mesmos
+rótulos de valor e percentual, mas desenhados diretamente no PDF: sem
+rasterização, sem PNG embutido e sem importar o matplotlib.
+"""
+
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.barcharts import HorizontalBarChart, VerticalBarChart
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+FONTE = 'Helvetica'
+FONTE_NEGRITO = 'Helvetica-Bold'
+ALTURA_TITULO = 28
+
+# Cores usadas quando a especificação traz menos cores que fatias
+_CORES_PADRAO = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#06b6d4', '#ec4899', '#84cc16']
+
+
+def _titulo(desenho, titulo, largura, altura):
+    desenho.add(String(largura / 2, altura - 18, titulo, fontName=FONTE_NEGRITO,
+                       fontSize=13, textAnchor='middle'))
+
+
+def _percentuais(data):
+    total = sum(data) or 1
+    return [(x / total) * 100 for x in data]
+
+
+def desenho_pizza(labels, data, cores, titulo, largura=6*inch, altura=4*inch):
+    """Pizza com percentual nas fatias e legenda 'rótulo: valor (x%)' à direita"""
+    desenho = Drawing(largura, altura)
+    _titulo(desenho, titulo, largura, altura)
+
+    percentages = _percentuais(data)
+    cores = list(cores) or _CORES_PADRAO
+    diametro = min(altura - ALTURA_TITULO - 20, largura * 0.45)
+
+    pie = Pie()
+    pie.x = 10
+    pie.y = (altura - ALTURA_TITULO - diametro) / 2
+    pie.width = pie.height = diametro
+    pie.data = list(data)
+    pie.labels = [f'{perc:.1f}%' for perc in percentages]
+    pie.startAngle = 90
+    pie.direction = 'anticlockwise'
+    pie.sideLabels = False
+    pie.simpleLabels = True
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 1
+    pie.slices.labelRadius = 0.65
+    pie.slices.fontName = FONTE_NEGRITO
+    pie.slices.fontSize = 9
+    pie.slices.fontColor = colors.white
+    for i in range(len(data)):
+        pie.slices[i].fillColor = colors.HexColor(cores[i % len(cores)])
+    desenho.add(pie)
+
+    legenda = Legend()
+    legenda.x = pie.x + diametro + 20
+    legenda.y = pie.y + diametro / 2 + 6 * len(data)
+    legenda.alignment = 'right'
+    legenda.fontName = FONTE
+    legenda.fontSize = 9
+    legenda.columnMaximum = 12
+    legenda.deltay = 12
+    legenda.boxAnchor = 'nw'
+    legenda.colorNamePairs = [
+        (colors.HexColor(cores[i % len(cores)]), f'{label}: {val} ({perc:.1f}%)'[:60])
+        for i, (label, val, perc) in enumerate(zip(labels, data, percentages))
+    ]
+    desenho.add(legenda)
+
+    return desenho
+
+
+def desenho_barras(labels, data, titulo, cor='#667eea', horizontal=False, largura=6*inch, altura=4*inch):
+    """Barras com 'valor (x%)' ao final de cada barra"""
+    desenho = Drawing(largura, altura)
+    _titulo(desenho, titulo, largura, altura)
+
+    total = sum(data) or 1
+    maximo = max(data) if data else 0
+
+    if horizontal:
+        grafico = HorizontalBarChart()
+        margem_rotulos = min(max(len(str(label)) for label in labels) * 4.5, largura * 0.45) if labels else 0
+        grafico.x = margem_rotulos + 10
+        grafico.y = 25
+        grafico.width = largura - grafico.x - 70
+        grafico.height = altura - ALTURA_TITULO - 40
+        grafico.categoryAxis.labels.boxAnchor = 'e'
+        grafico.categoryAxis.labels.dx = -4
+        grafico.categoryAxis.reverseDirection = True  # maior valor no topo, como no matplotlib
+        grafico.barLabels.boxAnchor = 'w'
+        grafico.barLabels.dx = 4
+    else:
+        grafico = VerticalBarChart()
+        grafico.x = 40
+        grafico.y = 70
+        grafico.width = largura - 60
+        grafico.height = altura - ALTURA_TITULO - 90
+        grafico.categoryAxis.labels.angle = 45
+        grafico.categoryAxis.labels.boxAnchor = 'ne'
+        grafico.categoryAxis.labels.dy = -4
+        grafico.barLabels.boxAnchor = 's'
+        grafico.barLabels.dy = 3
+
+    grafico.data = [list(data)]
+    grafico.categoryAxis.categoryNames = [str(label) for label in labels]
+    grafico.categoryAxis.labels.fontName = FONTE
+    grafico.categoryAxis.labels.fontSize = 8
+    grafico.categoryAxis.strokeColor = colors.white
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.valueMax = maximo * 1.2 if maximo else 1
+    grafico.valueAxis.labels.fontName = FONTE
+    grafico.valueAxis.labels.fontSize = 8
+    grafico.valueAxis.visibleGrid = True
+    grafico.valueAxis.gridStrokeColor = colors.HexColor('#cccccc')
+    grafico.valueAxis.gridStrokeDashArray = (2, 2)
+    grafico.valueAxis.strokeColor = colors.white
+    grafico.bars[0].fillColor = colors.HexColor(cor)
+    grafico.bars[0].strokeColor = colors.black
+    grafico.bars[0].strokeWidth = 0.7
+    grafico.barLabelFormat = lambda val: f'{int(val)} ({val / total * 100:.1f}%)'
+    grafico.barLabels.fontName = FONTE_NEGRITO
+    grafico.barLabels.fontSize = 8
+    desenho.add(grafico)
+
+    return desenho
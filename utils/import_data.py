@@ -1,121 +1,317 @@
-import pandas as pd
+"""Importação da planilha consolidada (Excel) para o banco
+
+A pasta é aberta uma única vez em modo read_only e cada aba é lida em
+streaming (values_only): o cabeçalho é detectado nas primeiras linhas e as
+demais viram registros, gravados em lotes de LOTE_IMPORTACAO com executemany,
+numa transação por aba. O índice de prazos é preenchido junto, no mesmo lote.
+
+Quando a aba já está configurada, os cabeçalhos da planilha são levados aos
+nomes dos campos dela pelo mapeador de cabeçalhos (utils.mapeamento_cabecalhos),
+e os campos configurados que não estão na planilha continuam na configuração.
+
+O tipo de cada coluna (data, número, lista suspensa, texto longo) é inferido
+das primeiras linhas da aba (utils.tipos_colunas), a não ser que já esteja
+configurado, e os valores são gravados na forma canônica do tipo. As colunas
+inferidas como lista suspensa ganham as opções observadas, se ainda não
+tiverem uma configurada.
+
+Com mais de um processo (IMPORTACAO_PROCESSOS), cada aba é lida e convertida
+num processo do pool, que devolve os lotes já compactos (JSON do registro,
+prazos extraídos e hash da linha, usado pela importação incremental). A
+gravação continua num único processo, na ordem das abas, então o SQLite tem
+um só escritor e o resultado (inclusive os ids) é o mesmo da importação em
+série.
+
+Os processos do pool partem do forkserver (ou de spawn), não de um fork do
+processo que importa (utils.processos).
+
+Configuração (app.config):
+    IMPORTACAO_PROCESSOS  processos que leem as abas (padrão: nº de CPUs, até 4; 1 = em série)
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from itertools import chain, islice, repeat
+from sqlalchemy import insert
 from models import db
 from models.planilha import PlanilhaData, AbaConfig
+from models.configuracoes import DropdownConfig
+from models.prazo import Prazo
 from models.user import User
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.prazos import extrair_prazos
+from utils.sqlite_funcoes import normalizar
+from utils.tipos_colunas import AMOSTRA_TIPOS, inferir_tipos
+from utils.mapeamento_cabecalhos import mapeador_da_aba
+from utils.processos import criar_pool, processos_padrao
 import openpyxl
 
-def import_excel_data(app, excel_file='MONITORAMENTO UECI - CONSOLIDADO.xlsx'):
-    """Importa dados do arquivo Excel para o banco de dados"""
-    
-    with app.app_context():
-        print("Iniciando importação de dados do Excel...")
-        
-        # Abas que devem ser ignoradas
-        ABAS_IGNORADAS = [
-            'Sugestões de iniciativa da área',
-            'Dados lista suspensa',
-            'T Dinâmica'
-        ]
-        
-        # Carregar o arquivo Excel com openpyxl para ler cabeçalhos originais
-        workbook = openpyxl.load_workbook(excel_file)
-        
-        print(f"Abas encontradas: {workbook.sheetnames}")
-        
-        # Processar cada aba
-        for idx, sheet_name in enumerate(workbook.sheetnames):
-            # Pular abas ignoradas
-            if sheet_name in ABAS_IGNORADAS:
-                print(f"\n⏭️  Ignorando aba: {sheet_name}")
-                continue
-            
-            print(f"\n✓ Processando aba: {sheet_name}")
-            
-            worksheet = workbook[sheet_name]
-            
-            # Encontrar a linha do cabeçalho (procurar a primeira linha com dados)
-            header_row_idx = None
-            for row_idx, row in enumerate(worksheet.iter_rows(min_row=1, max_row=20), start=1):
-                # Contar células não vazias
-                non_empty = sum(1 for cell in row if cell.value is not None and str(cell.value).strip())
-                if non_empty > 3:  # Se tem mais de 3 células com conteúdo
-                    header_row_idx = row_idx
-                    break
-            
-            if header_row_idx is None:
-                print(f"  ⚠️  Cabeçalho não encontrado na aba {sheet_name}, pulando...")
+# Abas que devem ser ignoradas
+ABAS_IGNORADAS = [
+    'Sugestões de iniciativa da área',
+    'Dados lista suspensa',
+    'T Dinâmica'
+]
+
+LOTE_IMPORTACAO = 1000
+
+# O cabeçalho é a primeira linha, entre as LINHAS_BUSCA_CABECALHO primeiras, com
+# mais de MINIMO_CELULAS_CABECALHO células preenchidas
+LINHAS_BUSCA_CABECALHO = 20
+MINIMO_CELULAS_CABECALHO = 3
+
+# Textos tratados como célula vazia (os mesmos que o pandas.read_excel lia como NaN)
+VALORES_VAZIOS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+
+def _preenchida(valor):
+    return valor is not None and str(valor).strip() != ''
+
+
+def _vazia(valor):
+    return valor is None or (isinstance(valor, str) and valor in VALORES_VAZIOS)
+
+
+def _cabecalhos(linha):
+    """Nomes das colunas até a última célula preenchida do cabeçalho (vazias viram Coluna_<n>)"""
+    ultima = max(i for i, valor in enumerate(linha) if _preenchida(valor))
+    return [str(valor).strip() if _preenchida(valor) else f'Coluna_{i}' for i, valor in enumerate(linha[:ultima + 1])]
+
+
+def _sem_valor(valor):
+    return _vazia(valor) or not _preenchida(valor)
+
+
+def ler_aba(worksheet, configurados=None, mapeador=None):
+    """(cabeçalhos, TiposDaAba, iterador de (row_order, dados)) da aba, ou (None, None, None) sem cabeçalho
+
+    Com `mapeador` (MapeadorCabecalhos), os cabeçalhos são trocados pelos
+    nomes dos campos da aba. Os tipos são inferidos das primeiras
+    AMOSTRA_TIPOS linhas, exceto os de `configurados` ({coluna: tipo}). A lista de cabeçalhos cresce durante a
+    leitura se alguma linha tiver valores além da última coluna nomeada
+    (essas colunas ficam como texto).
+    """
+    linhas = worksheet.iter_rows(values_only=True)
+
+    cabecalhos = None
+    for posicao, linha in enumerate(linhas):
+        if sum(1 for valor in linha if _preenchida(valor)) > MINIMO_CELULAS_CABECALHO:
+            cabecalhos = _cabecalhos(linha)
+            break
+        if posicao + 1 >= LINHAS_BUSCA_CABECALHO:
+            break
+
+    if cabecalhos is None:
+        return None, None, None
+
+    if mapeador is not None:
+        mapeamento = mapeador.mapear(cabecalhos)
+        for cabecalho, campo in mapeamento.aproximados.items():
+            print(f"  🔁 Cabeçalho {cabecalho!r} importado como {campo!r} (nome parecido)")
+        cabecalhos = mapeamento.renomear()
+
+    def linhas_com_dados():
+        for ordem, linha in enumerate(linhas, start=1):
+            # Linhas completamente vazias são ignoradas (a ordem continua contando)
+            if all(_vazia(valor) for valor in linha):
                 continue
-            
-            # Ler cabeçalhos originais da linha identificada
-            header_row = list(worksheet.iter_rows(min_row=header_row_idx, max_row=header_row_idx))[0]
-            original_headers = []
-            
-            for idx_col, cell in enumerate(header_row):
-                if cell.value is not None and str(cell.value).strip():
-                    original_headers.append(str(cell.value).strip())
-                else:
-                    original_headers.append(f'Coluna_{idx_col}')
-            
-            # Agora usar pandas para ler os dados, mas com o cabeçalho já identificado
-            df = pd.read_excel(excel_file, sheet_name=sheet_name, header=header_row_idx-1)
-            
-            # Aplicar os cabeçalhos originais
-            if len(original_headers) <= len(df.columns):
-                # Garantir que temos cabeçalhos para todas as colunas
-                while len(original_headers) < len(df.columns):
-                    original_headers.append(f'Coluna_{len(original_headers)}')
-                df.columns = original_headers[:len(df.columns)]
-            
-            # Remover linhas completamente vazias
-            df = df.dropna(how='all')
-            
-            print(f"  📋 Colunas identificadas: {df.columns.tolist()[:5]}{'...' if len(df.columns) > 5 else ''}")
-            print(f"  📊 Total de linhas: {len(df)}")
-            
-            # Criar ou atualizar configuração da aba
-            aba_config = AbaConfig.query.filter_by(aba_name=sheet_name).first()
-            if not aba_config:
-                aba_config = AbaConfig(
-                    aba_name=sheet_name,
-                    display_order=idx
-                )
-                db.session.add(aba_config)
-            
-            # Configurar colunas
-            columns = []
-            for col in df.columns:
-                columns.append({
-                    'name': col,
-                    'type': 'text'
-                })
-            aba_config.set_columns(columns)
-            
-            # Importar dados (limitando a 100 linhas por aba para não sobrecarregar)
-            max_rows = min(100, len(df))
-            
-            for row_idx, row in df.head(max_rows).iterrows():
-                # Converter linha para dicionário
-                row_data = {}
-                for col in df.columns:
-                    value = row[col]
-                    if pd.notna(value):
-                        row_data[col] = str(value)
-                    else:
-                        row_data[col] = ''
-                
-                # Criar registro
-                planilha_data = PlanilhaData(
-                    aba_name=sheet_name,
-                    row_order=row_idx + 1,
-                    created_by=1  # Admin
-                )
-                planilha_data.set_data(row_data)
-                db.session.add(planilha_data)
-            
-            print(f"Importadas {max_rows} linhas da aba {sheet_name}")
-        
-        # Commit todas as mudanças
+            for i in range(len(cabecalhos), len(linha)):
+                if not _vazia(linha[i]):
+                    cabecalhos.extend(f'Coluna_{n}' for n in range(len(cabecalhos), i + 1))
+            yield ordem, linha
+
+    restantes = linhas_com_dados()
+    amostra = list(islice(restantes, AMOSTRA_TIPOS))
+    tipos = inferir_tipos(cabecalhos, [linha for _, linha in amostra], configurados, vazia=_sem_valor)
+
+    def registros():
+        for ordem, linha in chain(amostra, restantes):
+            yield ordem, {coluna: '' if _vazia(valor) else tipos.valor(coluna, valor)
+                          for coluna, valor in zip(cabecalhos, linha)}
+
+    return cabecalhos, tipos, registros()
+
+
+def hash_importacao(dados):
+    """Hash do conteúdo importado de uma linha (independe da ordem das colunas)"""
+    return hashlib.sha1(json.dumps(dados, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def compactar(ordem, dados):
+    """Registro lido -> (row_order, JSON, prazos extraídos, hash), pronto para gravar"""
+    return ordem, json.dumps(dados, ensure_ascii=False), extrair_prazos(dados), hash_importacao(dados)
+
+
+def lotes_da_aba(worksheet, configurados=None, mapeador=None):
+    """(cabeçalhos, TiposDaAba, iterador de lotes compactos) da aba, ou (None, None, None) sem cabeçalho"""
+    cabecalhos, tipos, registros = ler_aba(worksheet, configurados, mapeador)
+    if cabecalhos is None:
+        return None, None, None
+
+    def lotes():
+        lote = []
+        for ordem, dados in registros:
+            lote.append(compactar(ordem, dados))
+            if len(lote) == LOTE_IMPORTACAO:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    return cabecalhos, tipos, lotes()
+
+
+def _ler_aba_do_arquivo(excel_file, sheet_name, configurados, mapeador):
+    """No processo do pool: abre a pasta e devolve (cabeçalhos, tipos, lotes compactos) da aba"""
+    workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        cabecalhos, tipos, lotes = lotes_da_aba(workbook[sheet_name], configurados, mapeador)
+        if cabecalhos is None:
+            return None, None, None
+        lotes = list(lotes)
+        return cabecalhos, tipos, lotes
+    finally:
+        workbook.close()
+
+
+def gravar_lote(aba_name, lote, usuario_id):
+    """Insere os registros do lote (executemany) e os prazos extraídos deles; devolve os ids"""
+    tabela = PlanilhaData.__table__
+    ids = db.session.execute(
+        insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+        [{'aba_name': aba_name, 'row_order': ordem, 'row_data': row_data, 'hash_importacao': hash_linha,
+          'created_by': usuario_id} for ordem, row_data, _, hash_linha in lote]
+    ).scalars().all()
+    gravar_prazos(aba_name, [(registro_id, prazos) for registro_id, (_, _, prazos, _) in zip(ids, lote)])
+    return ids
+
+
+def gravar_prazos(aba_name, prazos_por_registro):
+    """Insere no índice de prazos as linhas extraídas de cada registro ([(id, prazos), ...])"""
+    agora = datetime.utcnow()
+    linhas = [dict(linha, aba_name=aba_name, registro_id=registro_id, updated_at=agora)
+              for registro_id, prazos in prazos_por_registro for linha in prazos]
+    if linhas:
+        db.session.execute(insert(Prazo.__table__), linhas)
+
+
+def tipos_configurados(aba_name):
+    """{coluna: tipo} das colunas já configuradas com tipo diferente de 'text' (prevalecem sobre a inferência)"""
+    aba_config = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    if not aba_config:
+        return {}
+    return {col['name']: col['type'] for col in aba_config.get_columns()
+            if isinstance(col, dict) and col.get('type', 'text') != 'text'}
+
+
+def mapeador_configurado(aba_name):
+    """Mapeador de cabeçalhos da aba já configurada (None para aba nova: os cabeçalhos viram os campos)"""
+    aba_config = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    return mapeador_da_aba(aba_config) if aba_config else None
+
+
+def gravar_opcoes(aba_name, tipos, colunas, usuario_id=1):
+    """Cria as listas suspensas das colunas inferidas como 'select' que ainda não têm uma"""
+    existentes = {normalizar(d.campo_nome) for d in DropdownConfig.query.filter_by(aba_name=aba_name)}
+    for coluna in colunas:
+        opcoes = tipos.opcoes.get(coluna)
+        if tipos.tipo(coluna) != 'select' or not opcoes or normalizar(coluna) in existentes:
+            continue
+        dropdown = DropdownConfig(aba_name=aba_name, campo_nome=coluna, is_active=True,
+                                  created_by=usuario_id, updated_by=usuario_id)
+        dropdown.set_opcoes(opcoes)
+        db.session.add(dropdown)
+
+
+def gravar_aba(aba_name, display_order, cabecalhos, tipos, lotes, usuario_id=1):
+    """Grava os lotes e a configuração da aba (com os tipos) numa transação; devolve o número de registros"""
+    total = 0
+    try:
+        for lote in lotes:
+            gravar_lote(aba_name, lote, usuario_id)
+            total += len(lote)
+
+        # Criar ou atualizar configuração da aba (os cabeçalhos só estão completos após a leitura)
+        aba_config = AbaConfig.query.filter_by(aba_name=aba_name).first()
+        colunas = tipos.colunas(cabecalhos)
+        if not aba_config:
+            aba_config = AbaConfig(aba_name=aba_name, display_order=display_order)
+            db.session.add(aba_config)
+        else:
+            # Campos configurados que a planilha não tem (ex.: preenchidos só no sistema) continuam
+            presentes = set(cabecalhos)
+            colunas += [col for col in aba_config.get_columns()
+                        if (col['name'] if isinstance(col, dict) else col) not in presentes]
+        aba_config.set_columns(colunas)
+        gravar_opcoes(aba_name, tipos, cabecalhos, usuario_id)
+
         db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print(f"  📋 Colunas identificadas: {cabecalhos[:5]}{'...' if len(cabecalhos) > 5 else ''}")
+    inferidas = [f'{coluna} ({tipos.tipo(coluna)})' for coluna in cabecalhos if tipos.tipo(coluna) != 'text']
+    if inferidas:
+        print(f"  🔎 Tipos: {', '.join(inferidas)}")
+    return total
+
+
+def _processos_importacao(app, abas):
+    processos = app.config.get('IMPORTACAO_PROCESSOS') or processos_padrao()
+    return max(1, min(processos, len(abas)))
+
+
+def import_excel_data(app, excel_file='MONITORAMENTO UECI - CONSOLIDADO.xlsx', processos=None):
+    """Importa dados do arquivo Excel para o banco de dados
+
+    `processos` sobrepõe IMPORTACAO_PROCESSOS (1 = leitura em série).
+    """
+
+    with app.app_context():
+        print("Iniciando importação de dados do Excel...")
+
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+        pool = None
+        try:
+            print(f"Abas encontradas: {workbook.sheetnames}")
+
+            abas = [nome for nome in workbook.sheetnames if nome not in ABAS_IGNORADAS]
+            processos = min(processos, len(abas)) if processos else _processos_importacao(app, abas)
+            configurados = {nome: tipos_configurados(nome) for nome in abas}
+            mapeadores = {nome: mapeador_configurado(nome) for nome in abas}
+
+            if processos > 1:
+                # Leitura em paralelo; map devolve as abas na ordem, para a gravação seguir a mesma sequência
+                pool = criar_pool(processos)
+                lidas = pool.map(_ler_aba_do_arquivo, repeat(excel_file), abas,
+                                 [configurados[nome] for nome in abas], [mapeadores[nome] for nome in abas])
+            else:
+                lidas = (lotes_da_aba(workbook[nome], configurados[nome], mapeadores[nome]) for nome in abas)
+
+            for idx, sheet_name in enumerate(workbook.sheetnames):
+                if sheet_name in ABAS_IGNORADAS:
+                    print(f"\n⏭️  Ignorando aba: {sheet_name}")
+                    continue
+
+                print(f"\n✓ Processando aba: {sheet_name}")
+                cabecalhos, tipos, lotes = next(lidas)
+                if cabecalhos is None:
+                    print(f"  ⚠️  Cabeçalho não encontrado na aba {sheet_name}, pulando...")
+                    continue
+                total = gravar_aba(sheet_name, idx, cabecalhos, tipos, lotes)
+                print(f"Importadas {total} linhas da aba {sheet_name}")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            workbook.close()
+
+        # Recriar colunas geradas conforme as novas configurações das abas
+        sincronizar_colunas_geradas()
         print("\n✓ Importação concluída com sucesso!")
 
 
@@ -0,0 +1,370 @@
+"""Importação incremental do Excel: só insere, atualiza ou remove o que mudou
+
+Cada linha da planilha é associada a um registro existente da aba pela chave
+de negócio (ex.: Nº Nota Recomendatória + Exercício), configurável por aba em
+configuracao_sistema ('importacao_chaves'). A comparação usa o hash da linha
+gravado na importação anterior (planilha_data.hash_importacao):
+
+- linha sem registro com a mesma chave: inserida;
+- hash igual ao da importação anterior: nada muda, preservando o que foi
+  editado no sistema desde então;
+- hash diferente: os campos da planilha são atualizados no registro (os
+  demais campos e os internos, como '_temp_links', ficam como estão);
+- registro importado cuja chave não aparece mais na planilha: removido, com
+  uma lápide em registro_removido guardando os dados que ele tinha.
+
+Registros que nunca passaram por importação com hash (criados no sistema ou
+importados antes do hash existir) são comparados pelo conteúdo atual e, se a
+chave não está na planilha, ficam como estão. Os cabeçalhos passam pelo
+mapeador da aba (utils.mapeamento_cabecalhos); as colunas já configuradas
+mantêm o tipo e as novas entram com o tipo inferido da planilha
+(utils.tipos_colunas). Cada aba é gravada numa transação, e o relatório de
+diferenças é devolvido; com simular=True nada é gravado.
+"""
+
+import json
+from datetime import datetime
+from sqlalchemy import select, bindparam
+import openpyxl
+from models import db
+from models.configuracoes import ConfiguracaoSistema
+from models.planilha import PlanilhaData, AbaConfig
+from models.prazo import Prazo
+from models.registro_removido import RegistroRemovido
+from utils.colunas_geradas import sincronizar_colunas_geradas
+from utils.import_data import (ABAS_IGNORADAS, LOTE_IMPORTACAO, ler_aba, compactar, hash_importacao,
+                               gravar_lote, gravar_prazos, gravar_opcoes, mapeador_configurado)
+from utils.prazos import extrair_prazos
+from utils.sqlite_funcoes import normalizar
+
+CHAVE_PADRAO = ['Nº Nota Recomendatória', 'Exercício']
+
+# configuracao_sistema: {aba_name: [campos da chave]}
+CONFIG_CHAVES = 'importacao_chaves'
+
+
+def chave_da_aba(aba_name):
+    """Campos que identificam um registro da aba na importação incremental"""
+    config = ConfiguracaoSistema.query.filter_by(chave=CONFIG_CHAVES).first()
+    return (config.get_valor() if config else {}).get(aba_name) or list(CHAVE_PADRAO)
+
+
+def definir_chave(aba_name, campos, usuario_id=None):
+    """Grava os campos da chave de negócio da aba"""
+    config = ConfiguracaoSistema.query.filter_by(chave=CONFIG_CHAVES).first()
+    if not config:
+        config = ConfiguracaoSistema(chave=CONFIG_CHAVES)
+        db.session.add(config)
+    chaves = config.get_valor()
+    chaves[aba_name] = list(campos)
+    config.set_valor(chaves)
+    config.updated_by = usuario_id
+    db.session.commit()
+
+
+def _valores_chave(dados, campos):
+    """Chave normalizada (sem acentos/caixa/espaços extras); None se todos os campos estão vazios"""
+    valores = tuple(normalizar(dados.get(campo)) or '' for campo in campos)
+    return valores if any(valores) else None
+
+
+def _rotulo(dados, campos):
+    return ' | '.join(str(dados.get(campo) or '') for campo in campos)
+
+
+class _Existente:
+    """Registro já gravado, com os dados lidos do JSON só quando necessário"""
+
+    __slots__ = ('id', 'row_order', 'hash', 'row_data', '_dados')
+
+    def __init__(self, registro_id, row_order, hash_linha, row_data):
+        self.id = registro_id
+        self.row_order = row_order
+        self.hash = hash_linha
+        self.row_data = row_data
+        self._dados = None
+
+    @property
+    def dados(self):
+        if self._dados is None:
+            self._dados = json.loads(self.row_data) if self.row_data else {}
+        return self._dados
+
+
+def _registros_existentes(aba_name, campos):
+    """{chave: _Existente} da aba (o primeiro pela ordem, se a chave se repetir) e o nº de repetidos"""
+    tabela = PlanilhaData.__table__
+    existentes = {}
+    repetidos = 0
+    for registro_id, row_order, hash_linha, row_data in db.session.execute(
+        select(tabela.c.id, tabela.c.row_order, tabela.c.hash_importacao, tabela.c.row_data)
+        .where(tabela.c.aba_name == aba_name)
+        .order_by(tabela.c.row_order, tabela.c.id)
+    ):
+        existente = _Existente(registro_id, row_order, hash_linha, row_data)
+        chave = _valores_chave(existente.dados, campos)
+        existente._dados = None
+        if chave is None:
+            continue
+        if chave in existentes:
+            repetidos += 1
+            continue
+        existentes[chave] = existente
+    return existentes, repetidos
+
+
+def _diferencas(atuais, novos):
+    """{campo: {'antes', 'depois'}} dos campos da planilha que mudaram"""
+    return {
+        campo: {'antes': atuais.get(campo, ''), 'depois': valor}
+        for campo, valor in novos.items()
+        if (atuais.get(campo) or '') != (valor or '')
+    }
+
+
+def _atualizar(aba_name, atualizacoes, usuario_id):
+    """Grava os registros alterados (executemany) e refaz seus prazos"""
+    if not atualizacoes:
+        return
+    tabela = PlanilhaData.__table__
+    agora = datetime.utcnow()
+    db.session.execute(
+        tabela.update().where(tabela.c.id == bindparam('_id')).values(
+            row_data=bindparam('_row_data'), hash_importacao=bindparam('_hash'),
+            updated_at=agora, updated_by=usuario_id
+        ),
+        [{'_id': registro_id, '_row_data': json.dumps(dados, ensure_ascii=False), '_hash': hash_linha}
+         for registro_id, dados, hash_linha in atualizacoes]
+    )
+
+    prazo = Prazo.__table__
+    ids = [registro_id for registro_id, _, _ in atualizacoes]
+    db.session.execute(prazo.delete().where(prazo.c.registro_id.in_(ids)))
+    gravar_prazos(aba_name, [(registro_id, extrair_prazos(dados)) for registro_id, dados, _ in atualizacoes])
+
+
+def _gravar_hashes(hashes):
+    """Só o hash, para registros cujo conteúdo já era igual ao da planilha"""
+    if not hashes:
+        return
+    tabela = PlanilhaData.__table__
+    db.session.execute(
+        tabela.update().where(tabela.c.id == bindparam('_id')).values(hash_importacao=bindparam('_hash')),
+        [{'_id': registro_id, '_hash': hash_linha} for registro_id, hash_linha in hashes]
+    )
+
+
+def _remover(aba_name, removidos, origem, usuario_id):
+    """Apaga os registros guardando a lápide de cada um"""
+    if not removidos:
+        return
+    agora = datetime.utcnow()
+    db.session.execute(RegistroRemovido.__table__.insert(), [
+        {'aba_name': aba_name, 'registro_id': existente.id, 'chave': rotulo, 'row_data': existente.row_data,
+         'row_order': existente.row_order, 'origem': origem, 'removido_em': agora, 'removido_por': usuario_id}
+        for existente, rotulo in removidos
+    ])
+
+    ids = [existente.id for existente, _ in removidos]
+    prazo = Prazo.__table__
+    tabela = PlanilhaData.__table__
+    for inicio in range(0, len(ids), LOTE_IMPORTACAO):
+        lote = ids[inicio:inicio + LOTE_IMPORTACAO]
+        db.session.execute(prazo.delete().where(prazo.c.registro_id.in_(lote)))
+        db.session.execute(tabela.delete().where(tabela.c.id.in_(lote)))
+
+
+def _atualizar_colunas(aba_name, display_order, cabecalhos, tipos, usuario_id):
+    """Cria a configuração da aba ou acrescenta as colunas novas da planilha; devolve as acrescentadas"""
+    aba_config = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    if not aba_config:
+        aba_config = AbaConfig(aba_name=aba_name, display_order=display_order)
+        db.session.add(aba_config)
+        colunas, novas = [], list(cabecalhos)
+    else:
+        colunas = aba_config.get_columns()
+        existentes = {col['name'] if isinstance(col, dict) else col for col in colunas}
+        novas = [coluna for coluna in cabecalhos if coluna not in existentes]
+
+    if novas:
+        aba_config.set_columns(colunas + tipos.colunas(novas))
+        gravar_opcoes(aba_name, tipos, novas, usuario_id)
+    return novas
+
+
+def tipos_da_aba(aba_name):
+    """{coluna: tipo} de todas as colunas configuradas (os valores seguem o tipo já configurado)"""
+    aba_config = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    if not aba_config:
+        return {}
+    tipos = {}
+    for col in aba_config.get_columns():
+        if isinstance(col, dict):
+            tipos[col['name']] = col.get('type', 'text')
+        else:
+            tipos[col] = 'text'
+    return tipos
+
+
+def sincronizar_aba(aba_name, display_order, cabecalhos, tipos, registros, campos_chave, origem=None,
+                    simular=False, remover_ausentes=True, usuario_id=1):
+    """Aplica (ou só calcula, se simular) as diferenças entre a planilha e a aba; devolve o relatório"""
+    existentes, repetidos = _registros_existentes(aba_name, campos_chave)
+    relatorio = {
+        'aba': aba_name,
+        'chave': list(campos_chave),
+        'simulacao': simular,
+        'inseridos': [],
+        'atualizados': [],
+        'removidos': [],
+        'inalterados': 0,
+        # Ausentes da planilha, mas sem hash de importação (ex.: criados no sistema): não são removidos
+        'mantidos': 0,
+        'sem_chave': [],
+        'duplicados': [],
+        'repetidos_no_banco': repetidos,
+        'colunas_novas': [],
+    }
+
+    vistas = set()
+    insercoes, atualizacoes, hashes = [], [], []
+
+    def gravar_pendentes(forcar=False):
+        if simular:
+            return
+        if insercoes and (forcar or len(insercoes) >= LOTE_IMPORTACAO):
+            gravar_lote(aba_name, insercoes, usuario_id)
+            insercoes.clear()
+        if atualizacoes and (forcar or len(atualizacoes) >= LOTE_IMPORTACAO):
+            _atualizar(aba_name, atualizacoes, usuario_id)
+            atualizacoes.clear()
+        if hashes and (forcar or len(hashes) >= LOTE_IMPORTACAO):
+            _gravar_hashes(hashes)
+            hashes.clear()
+
+    try:
+        for ordem, dados in registros:
+            chave = _valores_chave(dados, campos_chave)
+            if chave is None:
+                relatorio['sem_chave'].append(ordem)
+                continue
+            if chave in vistas:
+                relatorio['duplicados'].append({'chave': _rotulo(dados, campos_chave), 'linha': ordem})
+                continue
+            vistas.add(chave)
+
+            hash_linha = hash_importacao(dados)
+            existente = existentes.get(chave)
+
+            if existente is None:
+                insercoes.append(compactar(ordem, dados))
+                relatorio['inseridos'].append({'chave': _rotulo(dados, campos_chave), 'linha': ordem})
+            elif existente.hash == hash_linha:
+                relatorio['inalterados'] += 1
+            else:
+                atuais = existente.dados
+                campos = _diferencas(atuais, dados)
+                if not campos:
+                    # Conteúdo já igual (registro antigo, sem hash, ou editado no sistema igual à planilha)
+                    hashes.append((existente.id, hash_linha))
+                    relatorio['inalterados'] += 1
+                else:
+                    atualizacoes.append((existente.id, dict(atuais, **dados), hash_linha))
+                    relatorio['atualizados'].append({
+                        'chave': _rotulo(dados, campos_chave), 'id': existente.id, 'linha': ordem, 'campos': campos
+                    })
+                existente._dados = None
+
+            gravar_pendentes()
+
+        removidos = []
+        if remover_ausentes:
+            for chave, existente in existentes.items():
+                if chave in vistas:
+                    continue
+                if existente.hash is None:
+                    relatorio['mantidos'] += 1
+                else:
+                    rotulo = _rotulo(existente.dados, campos_chave)
+                    removidos.append((existente, rotulo))
+                    relatorio['removidos'].append({'chave': rotulo, 'id': existente.id})
+
+        if simular:
+            relatorio['colunas_novas'] = [coluna for coluna in cabecalhos if coluna not in tipos_da_aba(aba_name)]
+            return relatorio
+
+        gravar_pendentes(forcar=True)
+        _remover(aba_name, removidos, origem, usuario_id)
+        relatorio['colunas_novas'] = _atualizar_colunas(aba_name, display_order, cabecalhos, tipos, usuario_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return relatorio
+
+
+def importar_incremental(excel_file, abas=None, chave=None, simular=False, remover_ausentes=True, usuario_id=1):
+    """Importação incremental de todas as abas (ou das indicadas); devolve um relatório por aba
+
+    `chave` sobrepõe, para esta importação, os campos configurados em chave_da_aba().
+    """
+    workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    relatorios = []
+    try:
+        for idx, sheet_name in enumerate(workbook.sheetnames):
+            if sheet_name in ABAS_IGNORADAS or (abas and sheet_name not in abas):
+                continue
+
+            # Colunas já configuradas mantêm o tipo (e o hash das linhas); só as novas são inferidas
+            cabecalhos, tipos, registros = ler_aba(
+                workbook[sheet_name], tipos_da_aba(sheet_name), mapeador_configurado(sheet_name)
+            )
+            if cabecalhos is None:
+                print(f"  ⚠️  Cabeçalho não encontrado na aba {sheet_name}, pulando...")
+                continue
+
+            campos_chave = chave or chave_da_aba(sheet_name)
+            faltando = [campo for campo in campos_chave if campo not in cabecalhos]
+            if faltando:
+                # Sem a chave, todas as linhas cairiam na mesma (e os registros seriam removidos)
+                print(f"  ⚠️  Aba {sheet_name} sem a(s) coluna(s) da chave {', '.join(faltando)}, pulando...")
+                continue
+
+            relatorios.append(sincronizar_aba(
+                sheet_name, idx, cabecalhos, tipos, registros, campos_chave,
+                origem=str(excel_file), simular=simular, remover_ausentes=remover_ausentes, usuario_id=usuario_id
+            ))
+    finally:
+        workbook.close()
+
+    if not simular and any(relatorio['colunas_novas'] for relatorio in relatorios):
+        sincronizar_colunas_geradas()
+    return relatorios
+
+
+def resumo_relatorio(relatorio, detalhes=10):
+    """Texto com as contagens e os primeiros itens de cada tipo de mudança"""
+    linhas = [
+        f"{relatorio['aba']}{' (simulação)' if relatorio['simulacao'] else ''} - chave: {' + '.join(relatorio['chave'])}",
+        f"  inseridos: {len(relatorio['inseridos'])}  atualizados: {len(relatorio['atualizados'])}  "
+        f"removidos: {len(relatorio['removidos'])}  inalterados: {relatorio['inalterados']}",
+    ]
+    if relatorio['sem_chave']:
+        linhas.append(f"  ⚠️  {len(relatorio['sem_chave'])} linha(s) sem chave ignorada(s): {relatorio['sem_chave'][:detalhes]}")
+    if relatorio['duplicados']:
+        linhas.append(f"  ⚠️  {len(relatorio['duplicados'])} chave(s) repetida(s) na planilha (mantida a primeira)")
+    if relatorio['repetidos_no_banco']:
+        linhas.append(f"  ⚠️  {relatorio['repetidos_no_banco']} registro(s) com chave repetida no banco (não comparados)")
+    if relatorio['mantidos']:
+        linhas.append(f"  {relatorio['mantidos']} registro(s) fora da planilha mantido(s) (não vieram da importação)")
+    if relatorio['colunas_novas']:
+        linhas.append(f"  colunas novas: {', '.join(relatorio['colunas_novas'])}")
+
+    for item in relatorio['inseridos'][:detalhes]:
+        linhas.append(f"  + {item['chave']} (linha {item['linha']})")
+    for item in relatorio['atualizados'][:detalhes]:
+        linhas.append(f"  ~ {item['chave']} (id {item['id']}): {', '.join(item['campos'])}")
+    for item in relatorio['removidos'][:detalhes]:
+        linhas.append(f"  - {item['chave']} (id {item['id']})")
+    return '\n'.join(linhas)
@@ -0,0 +1,221 @@
+"""Mapeamento dos cabeçalhos de uma planilha para os campos configurados da aba
+
+Os cabeçalhos do Excel variam entre versões da planilha (maiúsculas, acentos,
+"Servidor (es) responsável" x "Servidor(es) responsável(is)", "UG" x
+"Unidade Gestora"...). O MapeadorCabecalhos compila, uma vez por configuração
+da aba, um índice {nome normalizado: campo} com:
+
+1. os nomes dos próprios campos;
+2. os apelidos configurados em configuracao_sistema ('mapeamento_cabecalhos':
+   {aba_name ou '*': {campo: [apelidos]}});
+3. os grupos de nomes equivalentes de GRUPOS_EQUIVALENTES.
+
+A normalização ignora caixa, acentos, pontuação e espaços extras. Cada
+cabeçalho é procurado no índice; os que não estão lá são comparados com os
+campos ainda não usados: primeiro por prefixo ("Data do Envio" -> "Data do
+Envio à GPE", com pelo menos PALAVRAS_MINIMAS_PREFIXO palavras em comum),
+depois por semelhança (difflib). Cada campo recebe no
+máximo um cabeçalho, e a linha de cabeçalhos inteira é resolvida de uma vez.
+
+O mapeador não acessa o banco depois de compilado, então pode ser enviado aos
+processos do pool de importação.
+"""
+
+import difflib
+import re
+import threading
+from collections import defaultdict
+from models import db
+from models.configuracoes import ConfiguracaoSistema
+from utils.sqlite_funcoes import normalizar
+
+# configuracao_sistema: {aba_name ou '*': {campo: [apelidos]}}
+CONFIG_APELIDOS = 'mapeamento_cabecalhos'
+TODAS_AS_ABAS = '*'
+
+# Semelhança mínima (difflib.SequenceMatcher.ratio) para aceitar um cabeçalho fora do índice
+SIMILARIDADE_MINIMA = 0.85
+# Palavras que o nome mais curto precisa ter para um ser aceito como prefixo do outro
+PALAVRAS_MINIMAS_PREFIXO = 3
+
+# Nomes usados para o mesmo campo nas várias versões da planilha e da configuração
+GRUPOS_EQUIVALENTES = [
+    ['Exercício', 'Ano'],
+    ['Data do Envio', 'Data Envio'],
+    ['Data da Ciência', 'Data Ciencia'],
+    ['E-docs', 'Edocs'],
+    ['Unidade Gestora', 'UG'],
+    ['STATUS DA RECOMENDAÇÃO', 'STATUS DA RECOMENDAÇÃO - Qual é a situação atual da recomendação?',
+     'STATUS DA RECOMENDAÇÃO\nQual é a situação atual da recomendação?', 'Status'],
+    ['Setor(es) responsável(is)', 'Setor responsável', 'Setor'],
+    ['Servidor(es) responsável(is)', 'Servidor (es) responsável', 'Servidor(es) responsável',
+     'Servidor responsável', 'Servidor'],
+    ['Iniciativa da área', 'Retorno da área', 'Retorno'],
+    ['Data da Resposta', 'Data Resposta'],
+    ['Prazo previsto de início', 'Prazo inicio'],
+    ['Prazo previsto de término', 'Prazo previsto de conclusão', 'Prazo termino'],
+    ['Análise do retorno da área', 'Analise'],
+]
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def chave_cabecalho(texto):
+    """Forma normalizada de um cabeçalho: minúsculas, sem acentos, só letras/dígitos separados por espaço"""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', normalizar(texto) or '').split())
+
+
+_GRUPOS = [frozenset(chave_cabecalho(nome) for nome in grupo) for grupo in GRUPOS_EQUIVALENTES]
+
+
+def _por_prefixo(chave, candidatas):
+    """[candidata] mais próxima que começa com a chave (ou com que a chave começa), por palavras"""
+    palavras = chave.split()
+    encontradas = []
+    for candidata in candidatas:
+        outras = candidata.split()
+        menor = min(len(palavras), len(outras))
+        if menor >= PALAVRAS_MINIMAS_PREFIXO and palavras[:menor] == outras[:menor]:
+            encontradas.append((abs(len(outras) - len(palavras)), candidata))
+    return [min(encontradas)[1]] if encontradas else []
+
+
+class Mapeamento:
+    """Resultado do mapeamento de uma linha de cabeçalhos"""
+
+    def __init__(self, cabecalhos, campos, aproximados):
+        self.cabecalhos = list(cabecalhos)
+        # Campo de cada cabeçalho (None se não foi mapeado), na mesma ordem
+        self.campos = campos
+        # {cabeçalho: campo} resolvidos por semelhança, não pelo índice
+        self.aproximados = aproximados
+
+    def pares(self):
+        """[(cabeçalho, campo)] dos cabeçalhos mapeados"""
+        return [(cabecalho, campo) for cabecalho, campo in zip(self.cabecalhos, self.campos) if campo]
+
+    def coluna(self, campo):
+        """Cabeçalho mapeado para o campo, ou None"""
+        for cabecalho, mapeado in zip(self.cabecalhos, self.campos):
+            if mapeado == campo:
+                return cabecalho
+        return None
+
+    def nao_mapeados(self):
+        return [cabecalho for cabecalho, campo in zip(self.cabecalhos, self.campos) if not campo]
+
+    def renomear(self):
+        """Cabeçalhos com o nome do campo no lugar (os não mapeados ficam como estão)"""
+        return [campo or cabecalho for cabecalho, campo in zip(self.cabecalhos, self.campos)]
+
+
+class MapeadorCabecalhos:
+    """Índice de apelidos dos campos de uma aba, compilado uma vez"""
+
+    def __init__(self, campos, apelidos=None):
+        self.campos = list(campos)
+        # Em reversed: se dois campos têm o mesmo nome normalizado, fica o primeiro
+        self.nomes = {chave_cabecalho(campo): campo for campo in reversed(self.campos)}
+        self.indice = dict(self.nomes)
+
+        # Apelidos configurados têm prioridade sobre os grupos; um apelido que serviria
+        # a mais de um campo da aba é ambíguo e fica de fora
+        for fonte in (apelidos or {}, self._apelidos_dos_grupos()):
+            candidatos = defaultdict(set)
+            for campo, nomes in fonte.items():
+                if campo in self.campos:
+                    for nome in nomes:
+                        candidatos[chave_cabecalho(nome)].add(campo)
+            for chave, encontrados in candidatos.items():
+                if chave and chave not in self.indice and len(encontrados) == 1:
+                    self.indice[chave] = encontrados.pop()
+
+    def _apelidos_dos_grupos(self):
+        apelidos = {}
+        for campo in self.campos:
+            chave = chave_cabecalho(campo)
+            for grupo in _GRUPOS:
+                if chave in grupo:
+                    apelidos.setdefault(campo, set()).update(grupo)
+        return apelidos
+
+    def mapear(self, cabecalhos):
+        """Mapeamento da linha de cabeçalhos (exatos pelo índice primeiro, depois por semelhança)"""
+        cabecalhos = list(cabecalhos)
+        campos = [None] * len(cabecalhos)
+        usados = set()
+
+        # Nomes dos próprios campos antes dos apelidos: com "UG" e "Unidade Gestora" na
+        # mesma planilha, cada um fica com o seu
+        chaves = [chave_cabecalho(cabecalho) for cabecalho in cabecalhos]
+        for nomes in (self.nomes, self.indice):
+            for i, chave in enumerate(chaves):
+                campo = nomes.get(chave)
+                if campos[i] is None and campo and campo not in usados:
+                    campos[i] = campo
+                    usados.add(campo)
+        pendentes = [i for i, campo in enumerate(campos) if campo is None]
+
+        aproximados = {}
+        for i in pendentes:
+            chave = chaves[i]
+            livres = [candidata for candidata, campo in self.indice.items() if campo not in usados]
+            if not chave or not livres:
+                continue
+            parecidas = _por_prefixo(chave, livres) or difflib.get_close_matches(
+                chave, livres, n=1, cutoff=SIMILARIDADE_MINIMA
+            )
+            if parecidas:
+                campo = self.indice[parecidas[0]]
+                campos[i] = campo
+                usados.add(campo)
+                aproximados[cabecalhos[i]] = campo
+
+        return Mapeamento(cabecalhos, campos, aproximados)
+
+    def __repr__(self):
+        return f'<MapeadorCabecalhos {len(self.campos)} campos, {len(self.indice)} nomes>'
+
+
+def _config_apelidos():
+    return ConfiguracaoSistema.query.filter_by(chave=CONFIG_APELIDOS).first()
+
+
+def apelidos_da_aba(aba_name, config=None):
+    """{campo: [apelidos]} configurados para a aba (incluindo os de todas as abas)"""
+    config = config or _config_apelidos()
+    valor = config.get_valor() if config else {}
+    apelidos = defaultdict(list)
+    for origem in (TODAS_AS_ABAS, aba_name):
+        for campo, nomes in valor.get(origem, {}).items():
+            apelidos[campo].extend(nomes)
+    return dict(apelidos)
+
+
+def definir_apelidos(aba_name, campo, apelidos, usuario_id=None):
+    """Grava os apelidos de um campo da aba (aba_name='*' vale para todas as abas)"""
+    config = _config_apelidos()
+    if not config:
+        config = ConfiguracaoSistema(chave=CONFIG_APELIDOS)
+        db.session.add(config)
+    valor = config.get_valor()
+    valor.setdefault(aba_name, {})[campo] = list(apelidos)
+    config.set_valor(valor)
+    config.updated_by = usuario_id
+    db.session.commit()
+
+
+def mapeador_da_aba(aba):
+    """MapeadorCabecalhos dos campos da AbaConfig, recompilado só quando a aba ou os apelidos mudam"""
+    config = _config_apelidos()
+    versao = (aba.config_version or 0, config.updated_at if config else None)
+    em_cache = _cache.get(aba.aba_name)
+    if em_cache is not None and em_cache[0] == versao:
+        return em_cache[1]
+
+    with _lock:
+        nomes = [col['name'] if isinstance(col, dict) else col for col in aba.get_columns()]
+        mapeador = MapeadorCabecalhos(nomes, apelidos_da_aba(aba.aba_name, config))
+        _cache[aba.aba_name] = (versao, mapeador)
+    return mapeador
@@ -0,0 +1,95 @@
+"""Ajustes de esquema e de dados aplicados automaticamente em bancos já existentes"""
+
+import json
+from models import db
+from models.configuracoes import ConfiguracaoSistema
+from sqlalchemy import text, select, bindparam
+
+# Incrementar para repetir a conversão de datas em bancos já migrados
+VERSAO_DATAS = 1
+
+
+def garantir_coluna(tabela, coluna, definicao):
+    """Adiciona a coluna à tabela caso ela ainda não exista"""
+    colunas = {linha[1] for linha in db.session.execute(text(f'PRAGMA table_info({tabela})'))}
+    if coluna in colunas:
+        return False
+
+    db.session.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}'))
+    db.session.commit()
+    print(f"✓ Coluna {tabela}.{coluna} adicionada")
+    return True
+
+
+def aplicar_migracoes():
+    """Colunas adicionadas aos modelos depois da criação do banco"""
+    garantir_coluna('aba_config', 'config_version', 'INTEGER DEFAULT 0')
+    garantir_coluna('planilha_data', 'hash_importacao', 'VARCHAR(40)')
+    garantir_coluna('tarefa', 'atualizado_em', 'DATETIME')
+    garantir_datas_iso()
+
+
+def migrar_datas_iso(aba_name=None, tamanho_lote=500):
+    """Regrava em ISO as datas já armazenadas em outros formatos, em lotes
+
+    Percorre planilha_data por faixas de id e só atualiza os registros que
+    mudaram. Pode ser repetida (ex.: quando uma coluna passa a ser do tipo data).
+    """
+    from models.planilha import AbaConfig, PlanilhaData
+    from utils.esquema import esquema_da_aba
+
+    abas = AbaConfig.query.all() if aba_name is None else AbaConfig.query.filter_by(aba_name=aba_name).all()
+    esquemas = {aba.aba_name: esquema_da_aba(aba) for aba in abas}
+    esquemas = {nome: esquema for nome, esquema in esquemas.items() if esquema.colunas_data}
+    if not esquemas:
+        return 0
+
+    tabela = PlanilhaData.__table__
+    atualizacao = tabela.update().where(tabela.c.id == bindparam('_id')).values(row_data=bindparam('_row_data'))
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        lote = db.session.execute(
+            select(tabela.c.id, tabela.c.aba_name, tabela.c.row_data)
+            .where(tabela.c.id > ultimo_id, tabela.c.aba_name.in_(list(esquemas)))
+            .order_by(tabela.c.id)
+            .limit(tamanho_lote)
+        ).all()
+        if not lote:
+            break
+
+        alterados = []
+        for registro_id, nome, row_data in lote:
+            try:
+                dados = json.loads(row_data) if row_data else {}
+            except ValueError:
+                continue
+            if esquemas[nome].normalizar_datas(dados):
+                alterados.append({'_id': registro_id, '_row_data': json.dumps(dados, ensure_ascii=False)})
+
+        if alterados:
+            db.session.execute(atualizacao, alterados)
+            db.session.commit()
+            total += len(alterados)
+
+        ultimo_id = lote[-1][0]
+
+    return total
+
+
+def garantir_datas_iso():
+    """Executa a migração de datas uma única vez por banco"""
+    config = ConfiguracaoSistema.query.filter_by(chave='datas_iso').first()
+    if config and config.get_valor().get('versao') == VERSAO_DATAS:
+        return
+
+    total = migrar_datas_iso()
+
+    if not config:
+        config = ConfiguracaoSistema(chave='datas_iso')
+        db.session.add(config)
+    config.set_valor({'versao': VERSAO_DATAS})
+    db.session.commit()
+
+    print(f"✓ Datas convertidas para ISO ({total} registros atualizados)")
@@ -0,0 +1,278 @@
+"""PDF "Plano de Respostas" de um registro e o ZIP com os PDFs de vários registros
+
+O PDF é montado só a partir dos nomes das colunas e dos dados do registro, sem
+acessar o banco, então pode ser gerado em outro processo. No lote, os PDFs são
+gerados num pool de processos e gravados no ZIP em streaming, na ordem dos
+registros: no máximo JANELA_POR_PROCESSO PDFs por processo ficam em andamento
+ou na memória de cada vez, e o ZIP sai em blocos à medida que cada PDF fica
+pronto. Os PDFs passam pelo armazenamento de artefatos (utils.artefatos),
+indexados pelos valores que aparecem na tabela.
+
+Configuração (app.config):
+    PDF_LOTE_PROCESSOS  processos que geram os PDFs do lote (padrão: nº de CPUs, até 4; 1 = em série)
+"""
+
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, date
+from io import BytesIO
+from xml.sax.saxutils import escape
+from flask import current_app
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_JUSTIFY
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from utils.artefatos import chave_artefato, obter, guardar, ler
+from utils.exportacao import SaidaEmBlocos
+from utils.processos import PoolCompartilhado, processos_padrao
+
+MIMETYPE_PDF = 'application/pdf'
+MIMETYPE_ZIP = 'application/zip'
+
+# PDFs em andamento (ou prontos aguardando a vez no ZIP) por processo do pool
+JANELA_POR_PROCESSO = 2
+
+_pool = PoolCompartilhado()
+
+
+def _limpar_texto_pdf(valor):
+    """Remove espaços/quebras excessivas sem alterar o conteúdo."""
+    texto = str(valor).replace('\r', ' ').replace('\n', ' ')
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto or '-'
+
+
+def plano_respostas_pdf(aba_name, nomes_colunas, dados_registro):
+    """PDF (bytes) do registro: uma linha [Campo | Valor] por coluna da aba"""
+    buffer = BytesIO()
+
+    # Configurar documento em paisagem
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A4),
+        rightMargin=1*cm,
+        leftMargin=1*cm,
+        topMargin=2*cm,
+        bottomMargin=1.5*cm
+    )
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    titulo_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=14,
+        textColor=colors.HexColor('#1e293b'),
+        spaceAfter=10,
+        alignment=1
+    )
+
+    subtitulo_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#64748b'),
+        spaceAfter=15,
+        alignment=1
+    )
+
+    campo_style = ParagraphStyle(
+        'CampoPDF',
+        parent=styles['Normal'],
+        fontName='Helvetica-Bold',
+        fontSize=8,
+        leading=10,
+        textColor=colors.whitesmoke
+    )
+
+    valor_style = ParagraphStyle(
+        'ValorPDF',
+        parent=styles['Normal'],
+        fontName='Helvetica',
+        fontSize=8,
+        leading=11,
+        textColor=colors.HexColor('#1e293b'),
+        alignment=TA_JUSTIFY,
+        wordWrap='CJK'
+    )
+
+    elements.append(Paragraph("UNIDADE EXECUTORA DE CONTROLE INTERNO - UECI", titulo_style))
+    elements.append(Paragraph(f"Plano de Respostas - {aba_name}", subtitulo_style))
+    elements.append(Spacer(1, 0.3*cm))
+
+    # Tabela vertical (2 colunas: campo e valor)
+    table_data = []
+    for col_name in nomes_colunas:
+        valor = dados_registro.get(col_name, '-')
+        table_data.append([
+            Paragraph(f"<b>{escape(_limpar_texto_pdf(col_name))}</b>", campo_style),
+            Paragraph(escape(_limpar_texto_pdf(valor)), valor_style)
+        ])
+
+    table = Table(table_data, colWidths=[5.8*cm, 20.2*cm], splitByRow=1)
+    table.setStyle(TableStyle([
+        # Coluna de campos (esquerda)
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#667eea')),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (0, -1), 8),
+        ('LEFTPADDING', (0, 0), (0, -1), 8),
+        ('RIGHTPADDING', (0, 0), (0, -1), 8),
+        ('TOPPADDING', (0, 0), (0, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (0, -1), 6),
+
+        # Coluna de valores (direita)
+        ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#f8fafc')),
+        ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1e293b')),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (1, 0), (1, -1), 8),
+        ('RIGHTPADDING', (1, 0), (1, -1), 8),
+        ('LEFTPADDING', (1, 0), (1, -1), 8),
+        ('TOPPADDING', (1, 0), (1, -1), 5),
+        ('BOTTOMPADDING', (1, 0), (1, -1), 5),
+        ('WORDWRAP', (1, 0), (1, -1), 'CJK'),
+
+        # Bordas
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    elements.append(table)
+
+    # Rodapé
+    elements.append(Spacer(1, 0.5*cm))
+    rodape_style = ParagraphStyle(
+        'Rodape',
+        parent=styles['Normal'],
+        fontSize=7,
+        textColor=colors.HexColor('#94a3b8'),
+        alignment=1
+    )
+    elements.append(Paragraph(
+        f"Documento gerado em {date.today().strftime('%d/%m/%Y')} | UECI",
+        rodape_style
+    ))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _numero_nota(dados_registro):
+    nota_num = dados_registro.get('Nº Nota Recomendatória', 'SemNumero')
+    if nota_num:
+        nota_num = str(nota_num).replace('/', '_').replace(' ', '_')
+    return nota_num
+
+
+def nome_plano_respostas_pdf(dados_registro):
+    """Nome do download avulso (rota /preencher/<token>/gerar-pdf)"""
+    return f'Preenchimento_Nota_{_numero_nota(dados_registro)}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+
+
+def nome_no_zip(registro_id, dados_registro):
+    """Nome do PDF dentro do ZIP (o id evita nomes repetidos entre notas iguais)"""
+    return f'Plano_Respostas_{registro_id}_Nota_{_numero_nota(dados_registro)}.pdf'
+
+
+def nome_zip_planos(aba_name):
+    return f'Planos_Respostas_{aba_name.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+
+
+def _processos():
+    return current_app.config.get('PDF_LOTE_PROCESSOS') or processos_padrao()
+
+
+def _pool_pdfs():
+    """Pool de processos compartilhado (utils.processos), criado no primeiro uso (None = gerar em série)"""
+    return _pool.obter(_processos()) if _processos() > 1 else None
+
+
+def chave_plano_respostas(aba_name, nomes_colunas, dados_registro):
+    """Chave do PDF no armazenamento de artefatos: as linhas da tabela e o dia (rodapé)"""
+    return chave_artefato(
+        'plano_respostas_pdf', aba_name,
+        [(nome, dados_registro.get(nome, '-')) for nome in nomes_colunas],
+        date.today().isoformat()
+    )
+
+
+def artefato_plano_respostas(aba_name, nomes_colunas, dados_registro):
+    """PDF do registro no armazenamento de artefatos (gerado e guardado se ainda não estiver lá)"""
+    chave = chave_plano_respostas(aba_name, nomes_colunas, dados_registro)
+    return obter(chave) or guardar(
+        chave, 'plano_respostas_pdf', plano_respostas_pdf(aba_name, nomes_colunas, dados_registro), MIMETYPE_PDF
+    )
+
+
+def _pdfs_em_ordem(aba_name, nomes_colunas, registros):
+    """(nome no ZIP, PDF) de cada registro (dicts com 'id'), na ordem, com janela limitada no pool
+
+    PDFs já guardados no armazenamento de artefatos são lidos de lá; os
+    gerados são guardados.
+    """
+    pool = _pool_pdfs()
+    janela = _processos() * JANELA_POR_PROCESSO
+    fila = deque()
+
+    try:
+        for registro in registros:
+            nome = nome_no_zip(registro['id'], registro)
+            chave = chave_plano_respostas(aba_name, nomes_colunas, registro)
+            guardado = obter(chave)
+            pendente = ler(guardado) if guardado else None
+
+            if pendente is None and pool is not None:
+                try:
+                    pendente = pool.submit(plano_respostas_pdf, aba_name, nomes_colunas, registro)
+                except BrokenProcessPool as e:
+                    print(f"⚠ Pool de PDFs indisponível, gerando em série: {e}")
+                    _pool.descartar()
+                    pool = None
+
+            fila.append((nome, registro, chave, pendente))
+            while len(fila) >= (janela if pool is not None else 1):
+                yield _resultado(aba_name, nomes_colunas, fila.popleft())
+
+        while fila:
+            yield _resultado(aba_name, nomes_colunas, fila.popleft())
+    finally:
+        # Download interrompido: não gera os PDFs que ainda estão na fila
+        for _, _, _, pendente in fila:
+            if isinstance(pendente, Future):
+                pendente.cancel()
+
+
+def _resultado(aba_name, nomes_colunas, item):
+    nome, registro, chave, pendente = item
+    if isinstance(pendente, bytes):
+        return nome, pendente
+
+    pdf = None
+    if pendente is not None:
+        try:
+            pdf = pendente.result()
+        except BrokenProcessPool as e:
+            print(f"⚠ Pool de PDFs indisponível, gerando em série: {e}")
+            _pool.descartar()
+    if pdf is None:
+        pdf = plano_respostas_pdf(aba_name, nomes_colunas, registro)
+
+    guardar(chave, 'plano_respostas_pdf', pdf, MIMETYPE_PDF)
+    return nome, pdf
+
+
+def blocos_zip_planos(aba_name, nomes_colunas, registros):
+    """ZIP com o Plano de Respostas de cada registro, em blocos (um por PDF) para streaming"""
+    saida = SaidaEmBlocos()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome, pdf in _pdfs_em_ordem(aba_name, nomes_colunas, registros):
+            arquivo_zip.writestr(nome, pdf)
+            yield saida.retirar()
+    yield saida.retirar()
@@ -0,0 +1,99 @@
+"""Extração e manutenção do índice de prazos (tabela `prazo`)"""
+
+import unicodedata
+from functools import lru_cache
+from models import db
+from models.planilha import PlanilhaData
+from models.configuracoes import ConfiguracaoSistema
+from models.prazo import Prazo, _gravar_prazos
+from utils.datas import parse_data
+
+TIPO_TERMINO = 'termino'
+TIPO_RETORNO = 'retorno'
+
+# Incrementar quando as regras de extração mudarem, para forçar a reconstrução
+VERSAO_INDICE = 1
+
+
+def remove_acentos(texto):
+    nfkd = unicodedata.normalize('NFKD', texto)
+    return ''.join([c for c in nfkd if not unicodedata.combining(c)])
+
+
+@lru_cache(maxsize=1024)
+def tipo_prazo_campo(campo_nome):
+    """Retorna o tipo de prazo representado pelo campo, ou None (memorizado: os nomes se repetem a cada registro)"""
+    campo_normalizado = remove_acentos(str(campo_nome).lower())
+
+    if 'prazo' in campo_normalizado and 'termino' in campo_normalizado:
+        return TIPO_TERMINO
+    if 'data' in campo_normalizado and 'limite' in campo_normalizado and 'retorno' in campo_normalizado:
+        return TIPO_RETORNO
+    return None
+
+
+def extrair_prazos(dados):
+    """Lista os prazos de um registro no formato das linhas da tabela `prazo`"""
+    prazos = []
+
+    nota = str(dados.get('Nº Nota Recomendatória', '') or '').strip()
+    descricao = str(dados.get('Recomendação', '') or '')[:100] or str(dados.get('Constatação', '') or '')[:100]
+
+    for campo_nome, valor in dados.items():
+        if not valor or not isinstance(valor, str):
+            continue
+
+        tipo = tipo_prazo_campo(campo_nome)
+        if not tipo:
+            continue
+
+        data_prevista = parse_data(valor)
+        if not data_prevista:
+            continue
+
+        prazos.append({
+            'tipo': tipo,
+            'campo_nome': campo_nome[:200],
+            'data': data_prevista.isoformat(),
+            'nota': nota[:200],
+            'descricao': descricao,
+        })
+
+    return prazos
+
+
+def reconstruir_prazos(aba_name=None):
+    """Recria o índice de prazos a partir dos registros (todas as abas ou uma)"""
+    consulta = PlanilhaData.query
+    remocao = Prazo.query
+    if aba_name:
+        consulta = consulta.filter_by(aba_name=aba_name)
+        remocao = remocao.filter_by(aba_name=aba_name)
+
+    remocao.delete(synchronize_session=False)
+
+    connection = db.session.connection()
+    total = 0
+    for registro in consulta.yield_per(500):
+        _gravar_prazos(connection, registro)
+        total += 1
+
+    db.session.commit()
+    return total
+
+
+def garantir_indice_prazos():
+    """Reconstrói o índice quando ele ainda não existe ou está desatualizado"""
+    config = ConfiguracaoSistema.query.filter_by(chave='indice_prazos').first()
+    if config and config.get_valor().get('versao') == VERSAO_INDICE:
+        return
+
+    total = reconstruir_prazos()
+
+    if not config:
+        config = ConfiguracaoSistema(chave='indice_prazos')
+        db.session.add(config)
+    config.set_valor({'versao': VERSAO_INDICE})
+    db.session.commit()
+
+    print(f"✓ Índice de prazos reconstruído ({total} registros processados)")
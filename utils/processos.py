@@ -0,0 +1,67 @@
+"""Pools de processos dos relatórios e da importação
+
+Os pools são criados dentro do servidor, da fila de tarefas e do agendador,
+processos com várias threads. Um fork copiaria também os locks que outra
+thread estivesse segurando, e o processo filho poderia travar para sempre.
+Por isso os processos partem do forkserver (um processo limpo, de uma só
+thread, de onde os filhos são copiados) ou, onde ele não existe (Windows), de
+spawn.
+
+Os filhos não herdam o estado do processo principal: a função e os argumentos
+enviados ao pool vão por pickle, e os módulos de MODULOS_PRE_CARREGADOS são
+importados uma vez no forkserver. O script principal (__main__) também é
+importado lá, então ele não pode iniciar nada fora do bloco
+`if __name__ == '__main__'`.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Carregados no forkserver e herdados, já importados, pelos processos dos pools
+MODULOS_PRE_CARREGADOS = ['__main__', 'utils.graficos', 'utils.plano_respostas', 'utils.import_data']
+
+
+def processos_padrao():
+    """Nº de CPUs, até 4"""
+    return min(4, os.cpu_count() or 1)
+
+
+def contexto_processos():
+    """Contexto do multiprocessing dos pools: forkserver, ou spawn onde ele não existe"""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload(MODULOS_PRE_CARREGADOS)
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+def criar_pool(processos, inicializador=None):
+    """ProcessPoolExecutor com `processos` processos iniciados pelo contexto seguro"""
+    return ProcessPoolExecutor(max_workers=processos, mp_context=contexto_processos(), initializer=inicializador)
+
+
+class PoolCompartilhado:
+    """Pool de processos criado no primeiro uso e mantido entre as chamadas
+
+    Depois de uma falha (BrokenProcessPool), descartar() o encerra e o próximo
+    obter() cria outro.
+    """
+
+    def __init__(self, inicializador=None):
+        self.inicializador = inicializador
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def obter(self, processos):
+        with self._lock:
+            if self._pool is None:
+                self._pool = criar_pool(processos, self.inicializador)
+            return self._pool
+
+    def descartar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
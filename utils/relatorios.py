@@ -0,0 +1,576 @@
+"""Geração dos arquivos de relatório e exportação (PDF executivo e Excel)
+
+O PDF é devolvido em bytes e o Excel é gravado num destino (utils.exportacao);
+as funções são usadas tanto pelas rotas de download direto quanto pela fila de
+tarefas (utils.tarefas), que as executa fora da requisição. `progresso(fracao, mensagem)` é opcional e recebe o
+andamento da geração (0 a 1).
+"""
+
+from datetime import datetime
+from io import BytesIO
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from models.planilha import AbaConfig
+from utils.analise import analisar
+from utils.esquema import esquema_da_aba
+from utils.exportacao import escrever_planilha_excel, escrever_consolidado_excel
+from utils.graficos import graficos_do_relatorio, graficos_consolidados, elemento_pdf, backend_graficos, graficos_png
+
+MIMETYPE_PDF = 'application/pdf'
+MIMETYPE_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _sem_progresso(fracao, mensagem=None):
+    pass
+
+
+def nome_relatorio_pdf(aba_name):
+    return f'Relatorio_Executivo_{aba_name.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
+
+
+def nome_planilha_excel(aba_name):
+    return f'{aba_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+def nome_consolidado_pdf():
+    return f'Relatorio_Executivo_Consolidado_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
+
+
+def nome_consolidado_excel():
+    return f'Consolidado_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+def abas_ativas():
+    """Nomes das abas ativas, na ordem de exibição"""
+    return [aba.aba_name for aba in AbaConfig.query.filter_by(is_active=True).order_by(AbaConfig.display_order)]
+
+
+def estilos_relatorio():
+    """Estilos de parágrafo do relatório executivo (criados uma vez por documento)"""
+    styles = getSampleStyleSheet()
+
+    # Estilos personalizados PROFISSIONAIS
+    title_style = ParagraphStyle(
+        'ExecutiveTitle',
+        parent=styles['Heading1'],
+        fontSize=26,
+        textColor=colors.HexColor('#1a237e'),
+        spaceAfter=10,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    subtitle_style = ParagraphStyle(
+        'Subtitle',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=colors.HexColor('#455a64'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    )
+
+    heading_style = ParagraphStyle(
+        'SectionHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#283593'),
+        spaceAfter=15,
+        spaceBefore=25,
+        fontName='Helvetica-Bold',
+        borderColor=colors.HexColor('#283593'),
+        borderWidth=0,
+        borderPadding=5,
+        leftIndent=0
+    )
+
+    normal_style = ParagraphStyle(
+        'ExecutiveNormal',
+        parent=styles['Normal'],
+        fontSize=11,
+        alignment=TA_JUSTIFY,
+        spaceAfter=12,
+        fontName='Helvetica',
+        leading=16
+    )
+
+    return {
+        'titulo': title_style,
+        'subtitulo': subtitle_style,
+        'secao': heading_style,
+        'normal': normal_style,
+    }
+
+
+def _documento(buffer):
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A4),
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        leftMargin=0.5*inch,
+        rightMargin=0.5*inch
+    )
+
+
+def _capa(elements, titulo, subtitulo, estilos):
+    title_style, subtitle_style, normal_style = estilos['titulo'], estilos['subtitulo'], estilos['normal']
+
+    # ========== CAPA ==========
+    elements.append(Spacer(1, 1.5*inch))
+    elements.append(Paragraph(titulo, title_style))
+    elements.append(Paragraph(f"{subtitulo}", title_style))
+    elements.append(Spacer(1, 0.3*inch))
+    elements.append(Paragraph(f"Período de Análise: {datetime.now().strftime('%B de %Y')}", subtitle_style))
+    elements.append(Paragraph(f"Data de Geração: {datetime.now().strftime('%d/%m/%Y às %H:%M')}", subtitle_style))
+    elements.append(Spacer(1, 0.5*inch))
+
+    # Linha decorativa
+    line_table = Table([['']], colWidths=[10*inch])
+    line_table.setStyle(TableStyle([
+        ('LINEABOVE', (0, 0), (-1, 0), 3, colors.HexColor('#667eea')),
+    ]))
+    elements.append(line_table)
+
+    elements.append(Spacer(1, 1*inch))
+    elements.append(Paragraph("<para alignment='center'><i>Documento Confidencial - Uso Interno</i></para>", normal_style))
+    elements.append(Paragraph("<para alignment='center'><b>UECI - Unidade Executiva de Controle Interno</b></para>", normal_style))
+
+    elements.append(PageBreak())
+
+
+def _secoes_aba(elements, resultado, graficos, backend, estilos):
+    """Sumário, gráficos comentados e conclusões de uma aba"""
+    heading_style, normal_style = estilos['secao'], estilos['normal']
+
+    total_registros = resultado.total_registros
+    cumpridas, nao_cumpridas, em_andamento, a_cumprir = resultado.consolidado
+    taxa_cumprimento = resultado.taxa_cumprimento
+
+    # ========== SUMÁRIO EXECUTIVO ==========
+    elements.append(Paragraph("SUMÁRIO EXECUTIVO", heading_style))
+
+    summary_data = [
+        ['', '', '', ''],
+        ['INDICADOR', 'VALOR', 'PERCENTUAL', 'STATUS'],
+        ['Total de Recomendações', str(total_registros), '100%', '●'],
+        ['Recomendações Cumpridas', str(cumpridas), f'{taxa_cumprimento}%', '✓' if taxa_cumprimento >= 70 else '○'],
+        ['Recomendações Não Cumpridas', str(nao_cumpridas), f'{round((nao_cumpridas/total_registros*100), 1)}%', '✗' if nao_cumpridas > total_registros*0.2 else '○'],
+        ['Em Andamento', str(em_andamento), f'{round((em_andamento/total_registros*100), 1)}%', '⧗'],
+        ['A Cumprir', str(a_cumprir), f'{round((a_cumprir/total_registros*100), 1)}%', '○'],
+    ]
+
+    summary_table = Table(summary_data, colWidths=[3.5*inch, 1.5*inch, 1.5*inch, 1*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#283593')),
+        ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#5c6bc0')),
+        ('TEXTCOLOR', (0, 1), (-1, 1), colors.whitesmoke),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 1), (-1, 1), 12),
+        ('TOPPADDING', (0, 1), (-1, 1), 12),
+        ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#e8f5e9')),
+        ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#c8e6c9')),
+        ('BACKGROUND', (0, 4), (-1, 4), colors.HexColor('#ffebee')),
+        ('BACKGROUND', (0, 5), (-1, 5), colors.HexColor('#fff3e0')),
+        ('BACKGROUND', (0, 6), (-1, 6), colors.HexColor('#e3f2fd')),
+        ('GRID', (0, 1), (-1, -1), 1, colors.grey),
+        ('LINEBELOW', (0, 1), (-1, 1), 2, colors.HexColor('#283593')),
+    ]))
+
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Análise textual
+    if taxa_cumprimento >= 70:
+        analise = f"<b>DESEMPENHO SATISFATÓRIO:</b> A taxa de cumprimento de {taxa_cumprimento}% indica que a maioria das recomendações foi implementada com sucesso. Este resultado demonstra comprometimento e efetividade na gestão de riscos."
+        cor_destaque = 'green'
+    elif taxa_cumprimento >= 50:
+        analise = f"<b>DESEMPENHO MODERADO:</b> A taxa de cumprimento de {taxa_cumprimento}% está na média esperada, mas há margem significativa para melhoria. Recomenda-se intensificar o acompanhamento das recomendações pendentes."
+        cor_destaque = 'orange'
+    else:
+        analise = f"<b>ATENÇÃO NECESSÁRIA:</b> A taxa de cumprimento de {taxa_cumprimento}% está abaixo do esperado e requer atenção imediata da alta gestão. É fundamental estabelecer plano de ação para reverter este cenário."
+        cor_destaque = 'red'
+
+    elements.append(Paragraph(f"<para><font color='{cor_destaque}'>{analise}</font></para>", normal_style))
+
+    elements.append(PageBreak())
+
+    # ========== GRÁFICO 1: STATUS CONSOLIDADO ==========
+    if cumpridas + nao_cumpridas + em_andamento + a_cumprir > 0:
+        elements.append(Paragraph("1. DISTRIBUIÇÃO POR STATUS DAS RECOMENDAÇÕES", heading_style))
+
+        img = elemento_pdf(graficos['status_consolidado'], 6*inch, 4*inch, backend)
+        elements.append(img)
+        elements.append(Spacer(1, 0.2*inch))
+
+        interpretacao = f"""
+        <para>
+        <b>Interpretação:</b> O gráfico apresenta a distribuição consolidada das {total_registros} recomendações por status de implementação.
+        Observa-se que {cumpridas} recomendações ({taxa_cumprimento}%) foram plenamente cumpridas, enquanto {nao_cumpridas} permanecem não implementadas.
+        Adicionalmente, {em_andamento} recomendações estão em fase de implementação e {a_cumprir} aguardam início das ações.
+        </para>
+        """
+        elements.append(Paragraph(interpretacao, normal_style))
+
+        elements.append(PageBreak())
+
+    # ========== GRÁFICO 2: STATUS DETALHADO ==========
+    if resultado.status:
+        elements.append(Paragraph("2. ANÁLISE DETALHADA POR CATEGORIA DE STATUS", heading_style))
+
+        labels = [str(s)[:40] for s, _ in resultado.status]
+        values = [count for _, count in resultado.status]
+
+        img = elemento_pdf(graficos['status_detalhado'], 7*inch, 5*inch, backend)
+        elements.append(img)
+        elements.append(Spacer(1, 0.2*inch))
+
+        top_status = labels[0]
+        top_count = values[0]
+        top_perc = round((top_count/total_registros*100), 1)
+
+        interpretacao = f"""
+        <para>
+        <b>Interpretação:</b> A categoria "{top_status}" concentra o maior volume de recomendações,
+        totalizando {top_count} ocorrências ({top_perc}% do total). Esta distribuição permite identificar
+        padrões de conformidade e direcionar esforços gerenciais de forma mais assertiva.
+        </para>
+        """
+        elements.append(Paragraph(interpretacao, normal_style))
+
+        elements.append(PageBreak())
+
+    # ========== GRÁFICO 3: POR UNIDADE GESTORA ==========
+    ug_counts = resultado.contagens.get('ug')
+
+    if ug_counts:
+        elements.append(Paragraph("3. DISTRIBUIÇÃO POR UNIDADE GESTORA", heading_style))
+
+        labels = [str(s) for s, _ in ug_counts]
+        values = [count for _, count in ug_counts]
+
+        img = elemento_pdf(graficos['por_ug'], 6*inch, 4*inch, backend)
+        elements.append(img)
+        elements.append(Spacer(1, 0.2*inch))
+
+        top_ug = labels[0]
+        top_ug_count = values[0]
+        top_ug_perc = round((top_ug_count/total_registros*100), 1)
+
+        interpretacao = f"""
+        <para>
+        <b>Interpretação:</b> A Unidade Gestora "{top_ug}" apresenta o maior volume de recomendações,
+        com {top_ug_count} registros ({top_ug_perc}% do total). Esta concentração pode indicar necessidade de
+        fortalecimento dos controles internos ou maior exposição a riscos operacionais nesta unidade.
+        </para>
+        """
+        elements.append(Paragraph(interpretacao, normal_style))
+
+        elements.append(PageBreak())
+
+    # ========== GRÁFICO 4: POR ORIGEM ==========
+    origem_counts = resultado.contagens.get('origem')
+
+    if origem_counts:
+        elements.append(Paragraph("4. ANÁLISE POR ORIGEM DAS RECOMENDAÇÕES", heading_style))
+
+        labels = [str(s) for s, _ in origem_counts]
+        values = [count for _, count in origem_counts]
+
+        img = elemento_pdf(graficos['por_origem'], 6*inch, 4*inch, backend)
+        elements.append(img)
+        elements.append(Spacer(1, 0.2*inch))
+
+        top_origem = labels[0]
+        top_origem_count = values[0]
+        top_origem_perc = round((top_origem_count/total_registros*100), 1)
+
+        interpretacao = f"""
+        <para>
+        <b>Interpretação:</b> A origem "{top_origem}" é responsável por {top_origem_count} recomendações
+        ({top_origem_perc}% do total), sendo a principal fonte de apontamentos. Este dado subsidia
+        planejamento de auditorias futuras e priorização de áreas de maior criticidade.
+        </para>
+        """
+        elements.append(Paragraph(interpretacao, normal_style))
+
+        elements.append(PageBreak())
+
+    # ========== GRÁFICO 5: POR TIPO DE AÇÃO ==========
+    tipo_counts = resultado.contagens.get('tipo')
+
+    if tipo_counts:
+        elements.append(Paragraph("5. CLASSIFICAÇÃO POR TIPO DE AÇÃO", heading_style))
+
+        labels = [str(s) for s, _ in tipo_counts]
+        values = [count for _, count in tipo_counts]
+
+        img = elemento_pdf(graficos['por_tipo'], 6*inch, 4*inch, backend)
+        elements.append(img)
+        elements.append(Spacer(1, 0.2*inch))
+
+        melhoria = 0
+        regularizacao = 0
+        for tipo, count in tipo_counts:
+            if 'MELHORIA' in str(tipo).upper():
+                melhoria = count
+            elif 'REGULARIZAÇÃO' in str(tipo).upper():
+                regularizacao = count
+
+        if melhoria > regularizacao:
+            analise_tipo = f"predominam ações de <b>MELHORIA</b> ({melhoria} registros), indicando postura proativa de aprimoramento contínuo"
+        else:
+            analise_tipo = f"predominam ações de <b>REGULARIZAÇÃO</b> ({regularizacao} registros), sinalizando necessidade de correção de não conformidades"
+
+        interpretacao = f"""
+        <para>
+        <b>Interpretação:</b> Na classificação por tipo de ação, {analise_tipo}.
+        Esta proporção reflete o nível de maturidade dos controles internos e a efetividade preventiva da gestão.
+        </para>
+        """
+        elements.append(Paragraph(interpretacao, normal_style))
+
+        elements.append(PageBreak())
+
+    # ========== GRÁFICO 6: SITUAÇÃO DE PRAZOS ==========
+    if 'prazo' in resultado.papeis and resultado.contagens.get('prazo'):
+        elements.append(Paragraph("6. ANÁLISE DE CUMPRIMENTO DE PRAZOS", heading_style))
+
+        if resultado.tem_prazos:
+            atrasadas = resultado.atrasadas
+            no_prazo = resultado.no_prazo
+
+            img = elemento_pdf(graficos['situacao_prazos'], 6*inch, 4*inch, backend)
+            elements.append(img)
+            elements.append(Spacer(1, 0.2*inch))
+
+            perc_atrasadas = round((atrasadas/(atrasadas+no_prazo)*100), 1)
+
+            if perc_atrasadas > 30:
+                alert_tipo = "CRÍTICO"
+                alert_cor = "red"
+                alert_msg = "requer ação imediata da alta gestão para regularização"
+            elif perc_atrasadas > 15:
+                alert_tipo = "ALERTA"
+                alert_cor = "orange"
+                alert_msg = "demanda atenção e acompanhamento intensificado"
+            else:
+                alert_tipo = "CONTROLADO"
+                alert_cor = "green"
+                alert_msg = "situação sob controle, manter monitoramento"
+
+            interpretacao = f"""
+            <para>
+            <b>Interpretação:</b> <font color='{alert_cor}'><b>STATUS {alert_tipo}:</b></font>
+            Do total de {atrasadas + no_prazo} recomendações com prazos definidos,
+            {atrasadas} ({perc_atrasadas}%) encontram-se com prazos vencidos, enquanto {no_prazo}
+            ({round((no_prazo/(atrasadas+no_prazo)*100), 1)}%) estão dentro do prazo.
+            Esta situação {alert_msg}.
+            </para>
+            """
+            elements.append(Paragraph(interpretacao, normal_style))
+
+    elements.append(PageBreak())
+
+    # ========== CONCLUSÕES E RECOMENDAÇÕES ==========
+    elements.append(Paragraph("CONCLUSÕES E RECOMENDAÇÕES GERENCIAIS", heading_style))
+
+    conclusoes = []
+
+    conclusoes.append(f"<b>1. Efetividade da Implementação:</b> Com taxa de cumprimento de {taxa_cumprimento}%, " +
+                     ("o desempenho está acima da média, evidenciando comprometimento institucional." if taxa_cumprimento >= 70 else
+                      "há margem significativa para melhoria na implementação das recomendações." if taxa_cumprimento >= 50 else
+                      "urge estabelecimento de plano de ação com prazos definidos e responsáveis designados."))
+
+    if nao_cumpridas > (total_registros * 0.2):
+        conclusoes.append(f"<b>2. Recomendações Não Cumpridas:</b> O volume de {nao_cumpridas} recomendações não implementadas ({round((nao_cumpridas/total_registros*100), 1)}%) requer análise das justificativas e eventuais impedimentos estruturais.")
+
+    if em_andamento > 0:
+        conclusoes.append(f"<b>3. Recomendações em Andamento:</b> As {em_andamento} recomendações em fase de implementação necessitam de monitoramento próximo para garantir conclusão dentro dos prazos estabelecidos.")
+
+    if 'top_ug' in locals():
+        conclusoes.append(f"<b>4. Concentração por Unidade:</b> A concentração de {top_ug_perc}% das recomendações na unidade '{top_ug}' sugere necessidade de reforço nos controles internos ou capacitação específica da equipe.")
+
+    conclusoes.append("<b>5. Governança e Transparência:</b> Recomenda-se institucionalizar reuniões trimestrais de acompanhamento com os gestores responsáveis, documentando progressos e dificuldades.")
+
+    conclusoes.append("<b>6. Boas Práticas:</b> Identificar e documentar as práticas exitosas dos setores com melhores índices de cumprimento para disseminação institucional.")
+
+    for i, conclusao in enumerate(conclusoes, 1):
+        elements.append(Paragraph(conclusao, normal_style))
+        elements.append(Spacer(1, 0.1*inch))
+
+
+def _encerramento(elements, estilos):
+    """Assinatura e rodapé institucional"""
+    normal_style = estilos['normal']
+
+    elements.append(Spacer(1, 0.4*inch))
+
+    # Assinatura
+    elements.append(Paragraph("<para alignment='center'>___________________________________________</para>", normal_style))
+    elements.append(Paragraph("<para alignment='center'><b>UECI - Unidade Executiva de Controle Interno</b></para>", normal_style))
+    elements.append(Paragraph(f"<para alignment='center'>Gerado automaticamente em {datetime.now().strftime('%d/%m/%Y às %H:%M')}</para>", normal_style))
+
+    # Rodapé institucional
+    elements.append(Spacer(1, 0.3*inch))
+    footer_table = Table([['Documento de uso interno - Confidencial']], colWidths=[10*inch])
+    footer_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.grey),
+        ('LINEABOVE', (0, 0), (-1, 0), 1, colors.grey),
+    ]))
+    elements.append(footer_table)
+
+
+def relatorio_executivo_pdf(aba_name, backend=None, progresso=None):
+    """Relatório executivo em PDF (bytes), ou None se a aba não tem registros
+
+    `backend` é o backend dos gráficos ('matplotlib' ou 'reportlab'); None usa o configurado.
+    """
+    progresso = progresso or _sem_progresso
+
+    resultado = analisar(aba_name)
+
+    if resultado.total_registros == 0:
+        return None
+    progresso(0.1, 'Dados analisados')
+
+    graficos = graficos_do_relatorio(resultado)
+    backend = backend_graficos(backend)
+    if backend == 'matplotlib':
+        graficos_png(graficos)  # renderiza em paralelo o que não estiver em cache
+    progresso(0.6, 'Gráficos gerados')
+
+    buffer = BytesIO()
+    doc = _documento(buffer)
+    estilos = estilos_relatorio()
+
+    elements = []
+    _capa(elements, "RELATÓRIO EXECUTIVO GERENCIAL", aba_name, estilos)
+    _secoes_aba(elements, resultado, graficos, backend, estilos)
+    _encerramento(elements, estilos)
+
+    # Construir PDF
+    progresso(0.8, 'Montando o PDF')
+    doc.build(elements)
+
+    return buffer.getvalue()
+
+
+def planilha_excel(aba_name, destino, progresso=None):
+    """Grava em `destino` (caminho ou arquivo) a planilha da aba em Excel, em streaming"""
+    aba = AbaConfig.query.filter_by(aba_name=aba_name).first()
+    escrever_planilha_excel(aba_name, esquema_da_aba(aba), destino, progresso)
+
+
+def _resumo_consolidado(elements, resultados, graficos, backend, estilos):
+    """Quadro comparativo das abas e gráficos do conjunto"""
+    heading_style, normal_style = estilos['secao'], estilos['normal']
+    celula_style = ParagraphStyle('CelulaConsolidado', parent=normal_style, fontSize=9, leading=11,
+                                  spaceAfter=0, alignment=TA_LEFT)
+
+    elements.append(Paragraph("VISÃO CONSOLIDADA DAS PLANILHAS", heading_style))
+
+    dados = [['PLANILHA', 'REGISTROS', 'CUMPRIDAS', 'NÃO CUMPRIDAS', 'EM ANDAMENTO', 'A CUMPRIR', 'TAXA', 'PRAZOS VENCIDOS']]
+    for r in resultados:
+        dados.append([Paragraph(r.aba_name, celula_style), str(r.total_registros)] +
+                     [str(valor) for valor in r.consolidado] +
+                     [f'{r.taxa_cumprimento}%', str(r.atrasadas)])
+
+    total = sum(r.total_registros for r in resultados)
+    somas = [sum(valores) for valores in zip(*(r.consolidado for r in resultados))]
+    taxa_global = round(somas[0] / total * 100, 1) if total else 0
+    dados.append(['TOTAL', str(total)] + [str(valor) for valor in somas] +
+                 [f'{taxa_global}%', str(sum(r.atrasadas for r in resultados))])
+
+    tabela = Table(dados, colWidths=[3.0*inch, 0.9*inch, 0.9*inch, 1.2*inch, 1.2*inch, 0.9*inch, 0.8*inch, 1.3*inch],
+                   repeatRows=1)
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#283593')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#e8eaf6')]),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#c5cae9')),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(tabela)
+    elements.append(Spacer(1, 0.3*inch))
+
+    maior = max(resultados, key=lambda r: r.taxa_cumprimento)
+    menor = min(resultados, key=lambda r: r.taxa_cumprimento)
+    interpretacao = f"""
+    <para>
+    <b>Interpretação:</b> As {len(resultados)} planilhas analisadas somam {total} recomendações, com taxa global
+    de cumprimento de {taxa_global}%. A maior taxa está em "{maior.aba_name}" ({maior.taxa_cumprimento}%)
+    e a menor em "{menor.aba_name}" ({menor.taxa_cumprimento}%).
+    </para>
+    """
+    elements.append(Paragraph(interpretacao, normal_style))
+    elements.append(PageBreak())
+
+    # Gráficos do conjunto lado a lado
+    lado_a_lado = [elemento_pdf(graficos[chave], 5*inch, 3.4*inch, backend)
+                   for chave in ('status_consolidado', 'por_aba') if chave in graficos]
+    elements.append(Table([lado_a_lado], colWidths=[5.2*inch] * len(lado_a_lado)))
+    elements.append(PageBreak())
+
+
+def relatorio_consolidado_pdf(abas=None, backend=None, progresso=None):
+    """Relatório executivo de várias abas (padrão: as ativas) em PDF (bytes), ou None sem registros
+
+    Os gráficos de todas as abas vão num único lote para o pool de processos de
+    utils.graficos; estilos e backend são definidos uma vez para o documento.
+    """
+    progresso = progresso or _sem_progresso
+
+    resultados = [analisar(aba_name) for aba_name in (abas if abas is not None else abas_ativas())]
+    resultados = [r for r in resultados if r.total_registros]
+    if not resultados:
+        return None
+    progresso(0.1, 'Dados analisados')
+
+    backend = backend_graficos(backend)
+    resumo = graficos_consolidados(resultados)
+    graficos = {r.aba_name: graficos_do_relatorio(r) for r in resultados}
+    if backend == 'matplotlib':
+        lote = {('*', tipo): spec for tipo, spec in resumo.items()}
+        lote.update({(aba_name, tipo): spec for aba_name, specs in graficos.items() for tipo, spec in specs.items()})
+        graficos_png(lote)
+    progresso(0.6, 'Gráficos gerados')
+
+    buffer = BytesIO()
+    doc = _documento(buffer)
+    estilos = estilos_relatorio()
+
+    elements = []
+    _capa(elements, "RELATÓRIO EXECUTIVO CONSOLIDADO", "Todas as Planilhas", estilos)
+    _resumo_consolidado(elements, resultados, resumo, backend, estilos)
+    for i, resultado in enumerate(resultados):
+        if i:
+            elements.append(PageBreak())
+        elements.append(Paragraph(resultado.aba_name, estilos['titulo']))
+        _secoes_aba(elements, resultado, graficos[resultado.aba_name], backend, estilos)
+    _encerramento(elements, estilos)
+
+    progresso(0.8, 'Montando o PDF')
+    doc.build(elements)
+
+    return buffer.getvalue()
+
+
+def consolidado_excel(destino, abas=None, progresso=None):
+    """Grava em `destino` uma pasta com uma planilha por aba (padrão: as ativas)"""
+    consulta = AbaConfig.query.filter_by(is_active=True) if abas is None else AbaConfig.query.filter(AbaConfig.aba_name.in_(abas))
+    configs = consulta.order_by(AbaConfig.display_order).all()
+    escrever_consolidado_excel([(aba.aba_name, esquema_da_aba(aba)) for aba in configs], destino, progresso)
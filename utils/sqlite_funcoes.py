@@ -0,0 +1,23 @@
+"""Funções Python registradas nas conexões SQLite"""
+
+import unicodedata
+from sqlalchemy import event
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços colapsados (busca e ordenação)"""
+    if texto is None:
+        return None
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split())
+
+
+def registrar_funcoes_sqlite(engine):
+    """Disponibiliza normalizar() no SQL de todas as conexões do engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _registrar(dbapi_connection, connection_record):
+        dbapi_connection.create_function('normalizar', 1, normalizar, deterministic=True)
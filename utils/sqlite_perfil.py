@@ -0,0 +1,69 @@
+"""Perfil de PRAGMAs aplicado a cada conexão SQLite do engine
+
+Com WAL, leituras longas (analytics, exportações) não bloqueiam as gravações
+dos formulários, e o busy_timeout faz a conexão aguardar o lock em vez de
+falhar com "database is locked". Os valores vêm de app.config['SQLITE_PRAGMAS'].
+"""
+
+from sqlalchemy import event
+
+PRAGMAS_PADRAO = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,          # ms
+    'synchronous': 'NORMAL',       # seguro com WAL
+    'mmap_size': 134217728,        # 128 MB
+    'cache_size': -32000,          # negativo = KB (32 MB)
+    'temp_store': 'MEMORY',
+}
+
+# Ordem de aplicação: journal_mode primeiro, pois afeta o significado de synchronous
+_ORDEM = ['journal_mode', 'busy_timeout', 'synchronous', 'mmap_size', 'cache_size', 'temp_store']
+
+_NOMES_SYNCHRONOUS = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+_NOMES_TEMP_STORE = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+
+def _ordenar(pragmas):
+    return sorted(pragmas.items(), key=lambda item: _ORDEM.index(item[0]) if item[0] in _ORDEM else len(_ORDEM))
+
+
+def aplicar_perfil_sqlite(engine, pragmas=None):
+    """Registra o evento que aplica os PRAGMAs em toda nova conexão"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    perfil = dict(PRAGMAS_PADRAO)
+    perfil.update(pragmas or {})
+    perfil = {nome: valor for nome, valor in perfil.items() if valor is not None}
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in _ordenar(perfil):
+                cursor.execute(f'PRAGMA {nome} = {valor}')
+        finally:
+            cursor.close()
+
+
+def configuracao_efetiva(engine):
+    """Lê os valores em vigor numa conexão do pool"""
+    valores = {}
+    with engine.connect() as conexao:
+        for nome in _ORDEM:
+            valores[nome] = conexao.exec_driver_sql(f'PRAGMA {nome}').scalar()
+
+    valores['synchronous'] = _NOMES_SYNCHRONOUS.get(valores['synchronous'], valores['synchronous'])
+    valores['temp_store'] = _NOMES_TEMP_STORE.get(valores['temp_store'], valores['temp_store'])
+    return valores
+
+
+def relatar_perfil_sqlite(engine):
+    """Imprime as configurações efetivas do SQLite na inicialização"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    valores = configuracao_efetiva(engine)
+    print('✓ SQLite: ' + ', '.join(f'{nome}={valor}' for nome, valor in valores.items()))
+    if str(valores.get('journal_mode', '')).lower() != 'wal':
+        print('⚠ SQLite fora do modo WAL: leituras longas podem bloquear gravações')
@@ -0,0 +1,369 @@
+"""Fila de tarefas para gerar relatórios e exportações fora da requisição
+
+A rota só registra a tarefa (tabela `tarefa`) e devolve o id; um pool de
+threads do próprio processo gera o arquivo, atualizando o progresso na tabela,
+e grava o artefato em disco. O cliente consulta o andamento e baixa o arquivo
+quando a tarefa termina.
+
+Cada tarefa tem uma chave formada pelo tipo, pela aba, pela versão dos dados e
+da configuração da aba (utils.analise.versao_analise) e pelos parâmetros. Um
+pedido igual a uma tarefa em andamento, ou concluída e ainda não expirada,
+reaproveita essa tarefa em vez de gerar o arquivo de novo. A mesma chave
+identifica o arquivo no armazenamento de artefatos (utils.artefatos): a tarefa
+só gera o arquivo se ele ainda não estiver lá, e as rotas de download direto
+(gerar_artefato) seguem o mesmo caminho.
+
+A tarefa é reservada com um UPDATE condicional (status 'pendente'), então
+vários processos podem compartilhar o banco sem executar a mesma tarefa duas
+vezes. Cada gravação de progresso atualiza `atualizado_em`; uma tarefa em
+execução sem atualização há TAREFAS_INTERRUPCAO_MINUTOS foi interrompida (ex.:
+reinício do servidor) e volta para a fila em retomar_tarefas(), chamada pelo
+processo que executa a fila ao iniciar o servidor.
+
+Configuração (app.config):
+    TAREFAS_WORKERS              threads que executam as tarefas (padrão 1)
+    TAREFAS_TTL_HORAS            por quanto tempo a tarefa concluída é mantida e reaproveitada (padrão 24)
+    TAREFAS_INTERRUPCAO_MINUTOS  tempo sem progresso para considerar a tarefa interrompida (padrão 30)
+"""
+
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date
+from flask import current_app, send_file
+from models import db
+from models.artefato import Artefato
+from models.tarefa import Tarefa
+from utils.analise import versao_analise
+from utils.artefatos import chave_artefato, caminho_temporario, obter, guardar
+from utils.graficos import backend_graficos
+from utils.relatorios import (relatorio_executivo_pdf, nome_relatorio_pdf, planilha_excel, nome_planilha_excel,
+                              relatorio_consolidado_pdf, nome_consolidado_pdf, consolidado_excel,
+                              nome_consolidado_excel, abas_ativas, MIMETYPE_PDF, MIMETYPE_EXCEL)
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+ERRO = 'erro'
+
+# aba_name das tarefas que cobrem todas as abas ativas
+TODAS_AS_ABAS = '*'
+
+# Intervalo mínimo (s) entre duas gravações de progresso da mesma tarefa
+INTERVALO_PROGRESSO = 0.5
+
+_executor = None
+_lock_executor = threading.Lock()
+
+
+def _gerar_pdf(aba_name, parametros, progresso, destino):
+    pdf = relatorio_executivo_pdf(aba_name, backend=parametros.get('graficos'), progresso=progresso)
+    if pdf is None:
+        return None
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(pdf)
+    return True
+
+
+def _gerar_excel(aba_name, parametros, progresso, destino):
+    planilha_excel(aba_name, destino, progresso=progresso)
+    return True
+
+
+def _gerar_consolidado_pdf(aba_name, parametros, progresso, destino):
+    pdf = relatorio_consolidado_pdf(backend=parametros.get('graficos'), progresso=progresso)
+    if pdf is None:
+        return None
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(pdf)
+    return True
+
+
+def _gerar_consolidado_excel(aba_name, parametros, progresso, destino):
+    consolidado_excel(destino, progresso=progresso)
+    return True
+
+
+def _versao_consolidada(aba_name):
+    return tuple((nome, versao_analise(nome)) for nome in abas_ativas())
+
+
+def _parametros_pdf(parametros):
+    return {'graficos': backend_graficos(parametros.get('graficos'))}
+
+
+def _parametros_excel(parametros):
+    return {}
+
+
+# tipo -> gerar(aba, parâmetros, progresso, destino) -> None se não há dados, normalização dos
+# parâmetros, nome do download, extensão, mimetype, se o conteúdo depende do dia (prazos vencidos)
+# e, nos consolidados (aba '*'), a versão do conjunto de abas
+TIPOS = {
+    'relatorio_pdf': {
+        'gerar': _gerar_pdf,
+        'parametros': _parametros_pdf,
+        'nome': nome_relatorio_pdf,
+        'extensao': 'pdf',
+        'mimetype': MIMETYPE_PDF,
+        'diario': True,
+    },
+    'planilha_excel': {
+        'gerar': _gerar_excel,
+        'parametros': _parametros_excel,
+        'nome': nome_planilha_excel,
+        'extensao': 'xlsx',
+        'mimetype': MIMETYPE_EXCEL,
+        'diario': False,
+    },
+    'consolidado_pdf': {
+        'gerar': _gerar_consolidado_pdf,
+        'parametros': _parametros_pdf,
+        'nome': lambda aba_name: nome_consolidado_pdf(),
+        'extensao': 'pdf',
+        'mimetype': MIMETYPE_PDF,
+        'diario': True,
+        'versao': _versao_consolidada,
+    },
+    'consolidado_excel': {
+        'gerar': _gerar_consolidado_excel,
+        'parametros': _parametros_excel,
+        'nome': lambda aba_name: nome_consolidado_excel(),
+        'extensao': 'xlsx',
+        'mimetype': MIMETYPE_EXCEL,
+        'diario': False,
+        'versao': _versao_consolidada,
+    },
+}
+
+
+def _ttl():
+    return timedelta(hours=current_app.config.get('TAREFAS_TTL_HORAS', 24))
+
+
+def _limite_interrupcao():
+    return timedelta(minutes=current_app.config.get('TAREFAS_INTERRUPCAO_MINUTOS', 30))
+
+
+def _pool_tarefas():
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('TAREFAS_WORKERS') or 1,
+                thread_name_prefix='tarefas'
+            )
+        return _executor
+
+
+def chave_tarefa(tipo, aba_name, parametros):
+    """Chave que identifica o conteúdo do arquivo gerado pela tarefa (e o artefato guardado)"""
+    versao = TIPOS[tipo].get('versao', versao_analise)(aba_name)
+    partes = [aba_name, versao, sorted(parametros.items())]
+    if TIPOS[tipo]['diario']:
+        partes.append(date.today().isoformat())
+    return chave_artefato(tipo, *partes)
+
+
+def artefato_disponivel(tarefa):
+    """True se a tarefa terminou e o arquivo ainda pode ser baixado"""
+    return (tarefa.status == CONCLUIDA and tarefa.arquivo is not None
+            and (tarefa.expira_em is None or tarefa.expira_em > datetime.utcnow())
+            and os.path.exists(tarefa.arquivo))
+
+
+def _equivalente(chave, status):
+    """Tarefa mais recente com a mesma chave e um dos status (concluídas só com o arquivo disponível)"""
+    existente = Tarefa.query.filter(
+        Tarefa.chave == chave,
+        Tarefa.status.in_(status)
+    ).order_by(Tarefa.id.desc()).first()
+    if existente and (existente.status != CONCLUIDA or artefato_disponivel(existente)):
+        return existente
+    return None
+
+
+def _sem_progresso(fracao, mensagem=None):
+    pass
+
+
+def _gerar_e_guardar(tipo, aba_name, parametros, chave, progresso=None):
+    """Gera o arquivo do tipo e o guarda sob a chave; None se não há dados"""
+    definicao = TIPOS[tipo]
+    temporario = caminho_temporario(definicao['extensao'])
+    try:
+        if definicao['gerar'](aba_name, parametros, progresso or _sem_progresso, temporario) is None:
+            return None
+        return guardar(chave, tipo, temporario, definicao['mimetype'])
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def gerar_artefato(tipo, aba_name, parametros=None):
+    """Artefato atual do tipo: o guardado (pré-gerado pelo agendador ou por outro pedido) ou gerado agora
+
+    Usada pelas rotas de download direto; None se não há dados.
+    """
+    parametros = TIPOS[tipo]['parametros'](parametros or {})
+    chave = chave_tarefa(tipo, aba_name, parametros)
+    return obter(chave) or _gerar_e_guardar(tipo, aba_name, parametros, chave)
+
+
+def enviar_tarefa(tarefa):
+    """Resposta de download do arquivo gerado pela tarefa"""
+    return send_file(
+        tarefa.arquivo,
+        mimetype=tarefa.mimetype,
+        as_attachment=True,
+        download_name=tarefa.nome_download
+    )
+
+
+def enfileirar(tipo, aba_name, parametros=None, usuario_id=None):
+    """Registra a tarefa e a coloca na fila, ou devolve uma equivalente já existente"""
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+
+    parametros = TIPOS[tipo]['parametros'](parametros or {})
+    chave = chave_tarefa(tipo, aba_name, parametros)
+
+    limpar_expiradas()
+
+    existente = _equivalente(chave, [PENDENTE, EXECUTANDO, CONCLUIDA])
+    if existente:
+        return existente
+
+    tarefa = Tarefa(tipo=tipo, aba_name=aba_name, chave=chave, status=PENDENTE,
+                    progresso=0, mensagem='Na fila', criado_por=usuario_id)
+    tarefa.set_parametros(parametros)
+    db.session.add(tarefa)
+    db.session.commit()
+
+    _submeter(tarefa.id)
+    return tarefa
+
+
+def _submeter(tarefa_id):
+    _pool_tarefas().submit(_executar, current_app._get_current_object(), tarefa_id)
+
+
+def _executar(app, tarefa_id):
+    with app.app_context():
+        try:
+            executar_tarefa(tarefa_id)
+        finally:
+            db.session.remove()
+
+
+def _reservar(tarefa_id):
+    """Passa a tarefa de 'pendente' para 'executando'; False se outro worker já a pegou"""
+    tabela = Tarefa.__table__
+    agora = datetime.utcnow()
+    resultado = db.session.execute(
+        tabela.update()
+        .where(tabela.c.id == tarefa_id, tabela.c.status == PENDENTE)
+        .values(status=EXECUTANDO, iniciado_em=agora, atualizado_em=agora, progresso=0, mensagem='Iniciando')
+    )
+    db.session.commit()
+    return resultado.rowcount == 1
+
+
+def executar_tarefa(tarefa_id):
+    """Gera o arquivo da tarefa (no contexto da aplicação) e registra o resultado"""
+    if not _reservar(tarefa_id):
+        return
+
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    definicao = TIPOS[tarefa.tipo]
+    ultima_gravacao = [0.0]
+
+    def progresso(fracao, mensagem=None):
+        agora = time.monotonic()
+        if agora - ultima_gravacao[0] < INTERVALO_PROGRESSO:
+            return
+        ultima_gravacao[0] = agora
+        valores = {'progresso': max(0, min(99, int(fracao * 100))), 'atualizado_em': datetime.utcnow()}
+        if mensagem:
+            valores['mensagem'] = mensagem
+        # Em transação própria: a sessão pode estar lendo os registros em lotes (exportação)
+        tabela = Tarefa.__table__
+        with db.engine.begin() as conexao:
+            conexao.execute(tabela.update().where(tabela.c.id == tarefa_id).values(**valores))
+
+    try:
+        artefato = obter(tarefa.chave) or _gerar_e_guardar(
+            tarefa.tipo, tarefa.aba_name, tarefa.get_parametros(), tarefa.chave, progresso
+        )
+        if artefato is None:
+            raise ValueError('Sem dados para gerar o arquivo')
+
+        agora = datetime.utcnow()
+        tarefa.status = CONCLUIDA
+        tarefa.progresso = 100
+        tarefa.mensagem = 'Concluída'
+        tarefa.arquivo = artefato.arquivo
+        tarefa.nome_download = definicao['nome'](tarefa.aba_name)
+        tarefa.mimetype = definicao['mimetype']
+        tarefa.concluido_em = agora
+        tarefa.expira_em = agora + _ttl()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠ Erro na tarefa {tarefa_id} ({tarefa.tipo} - {tarefa.aba_name}): {e}")
+        traceback.print_exc()
+        agora = datetime.utcnow()
+        tarefa.status = ERRO
+        tarefa.mensagem = str(e)[:300]
+        tarefa.concluido_em = agora
+        tarefa.expira_em = agora + _ttl()
+        db.session.commit()
+
+
+def limpar_expiradas():
+    """Remove as tarefas finalizadas cujo prazo expirou
+
+    Os arquivos do armazenamento de artefatos continuam lá (o descarte é pelo
+    LRU de utils.artefatos); só os de fora dele são apagados junto.
+    """
+    expiradas = Tarefa.query.filter(
+        Tarefa.status.in_([CONCLUIDA, ERRO]),
+        Tarefa.expira_em < datetime.utcnow()
+    ).all()
+
+    for tarefa in expiradas:
+        if tarefa.arquivo and not Artefato.query.filter_by(arquivo=tarefa.arquivo).first():
+            try:
+                os.remove(tarefa.arquivo)
+            except OSError:
+                pass
+        db.session.delete(tarefa)
+
+    if expiradas:
+        db.session.commit()
+    return len(expiradas)
+
+
+def retomar_tarefas():
+    """Na inicialização do servidor: devolve à fila as tarefas interrompidas e limpa as expiradas
+
+    Só as tarefas em execução sem progresso há TAREFAS_INTERRUPCAO_MINUTOS são
+    consideradas interrompidas: as que outro processo está executando continuam
+    com ele. As pendentes são submetidas ao pool deste processo; _reservar()
+    garante que cada uma é executada por um só.
+    """
+    limite = datetime.utcnow() - _limite_interrupcao()
+    Tarefa.query.filter(
+        Tarefa.status == EXECUTANDO,
+        db.func.coalesce(Tarefa.atualizado_em, Tarefa.iniciado_em, Tarefa.created_at) < limite
+    ).update({'status': PENDENTE, 'mensagem': 'Na fila'}, synchronize_session=False)
+    db.session.commit()
+    limpar_expiradas()
+
+    pendentes = [tarefa.id for tarefa in Tarefa.query.filter_by(status=PENDENTE).order_by(Tarefa.id)]
+    for tarefa_id in pendentes:
+        _submeter(tarefa_id)
+    if pendentes:
+        print(f"✓ {len(pendentes)} tarefa(s) de relatório retomada(s)")
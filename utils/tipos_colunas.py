@@ -0,0 +1,143 @@
+"""Inferência do tipo das colunas importadas do Excel e forma canônica dos valores
+
+O tipo de cada coluna é escolhido a partir das primeiras AMOSTRA_TIPOS linhas
+com dados da aba, olhando os valores das células como o openpyxl os lê
+(datetime, int, float ou texto):
+
+- 'date': pelo menos PROPORCAO_MINIMA dos valores são datas;
+- 'number': idem para números (inclusive textos como '1.234,56'; '1.234' é
+  lido como o decimal 1.234, a forma canônica gravada);
+- 'textarea': algum texto longo (TEXTO_LONGO caracteres) ou com quebra de linha;
+- 'select': poucos valores distintos (até MAXIMO_OPCOES e até a raiz quadrada
+  do número de valores preenchidos), que se repetem;
+- 'text': os demais.
+
+Os valores são gravados na forma canônica do tipo: datas em ISO (utils.datas)
+e números sem separador de milhar, com ponto decimal e sem '.0' nos inteiros.
+Valores que não se encaixam no tipo da coluna ficam como texto.
+
+Não acessa o banco, então pode rodar nos processos do pool de importação.
+"""
+
+import math
+import re
+from datetime import date, datetime
+from utils.datas import parse_data, para_iso
+
+AMOSTRA_TIPOS = 500
+PROPORCAO_MINIMA = 0.9
+TEXTO_LONGO = 150
+MAXIMO_OPCOES = 15
+# Valores preenchidos necessários para inferir 'select'
+MINIMO_AMOSTRA_SELECT = 10
+
+_NUMERO = re.compile(r'^-?\d+(\.\d+)?$')
+_NUMERO_BR = re.compile(r'^-?(\d{1,3}(\.\d{3})+(,\d+)?|\d+,\d+)$')
+
+
+def numero(valor):
+    """int/float do valor, ou None; textos com zero à esquerda ('007') são códigos, não números
+
+    A forma canônica ('2.125') é reconhecida antes da brasileira ('1.234,56',
+    '1.234.567'), então numero(numero_canonico(x)) == x.
+    """
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return valor if not (isinstance(valor, float) and (math.isnan(valor) or math.isinf(valor))) else None
+
+    texto = str(valor).strip()
+    if not _NUMERO.match(texto):
+        if not _NUMERO_BR.match(texto):
+            return None
+        texto = texto.replace('.', '').replace(',', '.')
+
+    inteiro = texto.lstrip('-').split('.')[0]
+    if len(inteiro) > 1 and inteiro.startswith('0'):
+        return None
+    return float(texto) if '.' in texto else int(texto)
+
+
+def numero_canonico(valor):
+    """'2024', '1234.56': inteiros sem '.0', ponto decimal, sem separador de milhar"""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def _data(valor):
+    if isinstance(valor, (datetime, date)):
+        return True
+    return isinstance(valor, str) and parse_data(valor) is not None
+
+
+def inferir_tipo(valores):
+    """(tipo, opções) de uma coluna a partir dos valores preenchidos da amostra"""
+    total = len(valores)
+    if not total:
+        return 'text', []
+
+    minimo = PROPORCAO_MINIMA * total
+    if sum(1 for valor in valores if _data(valor)) >= minimo:
+        return 'date', []
+    if sum(1 for valor in valores if numero(valor) is not None) >= minimo:
+        return 'number', []
+
+    textos = [str(valor).strip() for valor in valores]
+    if any(len(texto) >= TEXTO_LONGO or '\n' in texto for texto in textos):
+        return 'textarea', []
+
+    distintos = sorted(set(textos))
+    if total >= MINIMO_AMOSTRA_SELECT and len(distintos) <= min(MAXIMO_OPCOES, math.sqrt(total)):
+        return 'select', distintos
+    return 'text', []
+
+
+class TiposDaAba:
+    """Tipo de cada coluna (configurado ou inferido) e conversão dos valores para gravação"""
+
+    def __init__(self, tipos, opcoes=None):
+        self.tipos = tipos
+        # Opções observadas das colunas inferidas como 'select' (para as listas suspensas)
+        self.opcoes = opcoes or {}
+
+    def tipo(self, coluna):
+        return self.tipos.get(coluna, 'text')
+
+    def colunas(self, cabecalhos):
+        """Configuração de colunas da aba ([{'name', 'type'}])"""
+        return [{'name': coluna, 'type': self.tipo(coluna)} for coluna in cabecalhos]
+
+    def valor(self, coluna, valor):
+        """Valor da célula (já preenchida) na forma canônica do tipo da coluna"""
+        tipo = self.tipos.get(coluna)
+        if tipo == 'date':
+            data = parse_data(valor)
+            if data is not None:
+                return data.isoformat()
+        elif tipo == 'number':
+            convertido = numero(valor)
+            if convertido is not None:
+                return numero_canonico(convertido)
+        if isinstance(valor, (datetime, date)):
+            return para_iso(valor)
+        return str(valor)
+
+
+def inferir_tipos(cabecalhos, amostra, configurados=None, vazia=lambda valor: valor is None):
+    """TiposDaAba das colunas a partir das linhas (tuplas de células) da amostra
+
+    Os tipos em `configurados` ({coluna: tipo}, ex.: definidos na configuração
+    da aba) prevalecem sobre os inferidos.
+    """
+    configurados = configurados or {}
+    tipos, opcoes = {}, {}
+    for i, coluna in enumerate(cabecalhos):
+        if coluna in configurados:
+            tipos[coluna] = configurados[coluna]
+            continue
+        valores = [linha[i] for linha in amostra if i < len(linha) and not vazia(linha[i])]
+        tipos[coluna], opcoes_coluna = inferir_tipo(valores)
+        if opcoes_coluna:
+            opcoes[coluna] = opcoes_coluna
+    return TiposDaAba(tipos, opcoes)
@@ -0,0 +1,126 @@
+"""Versão dos dados de cada aba, ETags e cache LRU de respostas
+
+A tabela `aba_versao` tem um contador por aba incrementado por triggers em toda
+escrita de planilha_data (rotas, importações e scripts). As respostas de
+analytics, calendário e alertas usam esse contador como ETag e ficam em cache
+no processo, indexadas pela versão: uma versão nova simplesmente não encontra
+entrada, sem necessidade de invalidação explícita.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request, jsonify, make_response
+from models import db
+from sqlalchemy import text
+
+_DDL = [
+    """CREATE TABLE IF NOT EXISTS aba_versao (
+        aba_name TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS aba_versao_ai AFTER INSERT ON planilha_data BEGIN
+        INSERT INTO aba_versao(aba_name, versao) VALUES (new.aba_name, 1)
+        ON CONFLICT(aba_name) DO UPDATE SET versao = versao + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS aba_versao_au AFTER UPDATE ON planilha_data BEGIN
+        INSERT INTO aba_versao(aba_name, versao) VALUES (new.aba_name, 1)
+        ON CONFLICT(aba_name) DO UPDATE SET versao = versao + 1;
+        INSERT INTO aba_versao(aba_name, versao) SELECT old.aba_name, 1 WHERE old.aba_name <> new.aba_name
+        ON CONFLICT(aba_name) DO UPDATE SET versao = versao + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS aba_versao_ad AFTER DELETE ON planilha_data BEGIN
+        INSERT INTO aba_versao(aba_name, versao) VALUES (old.aba_name, 1)
+        ON CONFLICT(aba_name) DO UPDATE SET versao = versao + 1;
+    END""",
+]
+
+
+def garantir_versoes():
+    """Cria a tabela de versões e os triggers que a mantêm"""
+    for ddl in _DDL:
+        db.session.execute(text(ddl))
+    db.session.commit()
+
+
+def versao_da_aba(aba_name):
+    """Versão atual dos dados da aba (0 se nunca foi alterada)"""
+    versao = db.session.execute(
+        text('SELECT versao FROM aba_versao WHERE aba_name = :aba'), {'aba': aba_name}
+    ).scalar()
+    return versao or 0
+
+
+def versoes_ativas():
+    """((aba_name, versão), ...) das abas ativas, para respostas que cobrem todas elas"""
+    return tuple(tuple(linha) for linha in db.session.execute(text(
+        'SELECT aba_config.aba_name, COALESCE(aba_versao.versao, 0) FROM aba_config '
+        'LEFT JOIN aba_versao ON aba_versao.aba_name = aba_config.aba_name '
+        'WHERE aba_config.is_active = 1 ORDER BY aba_config.aba_name'
+    )))
+
+
+def gerar_etag(*partes):
+    """ETag curta a partir das partes que determinam o conteúdo da resposta"""
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:20]
+
+
+class CacheLRU:
+    """Cache em memória com descarte do item menos usado recentemente"""
+
+    def __init__(self, maximo=128):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._itens:
+                return padrao
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return valor
+
+    def obter_ou_calcular(self, chave, calcular):
+        valor = self.obter(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = self.guardar(chave, calcular())
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+_AUSENTE = object()
+
+# Payloads JSON de analytics, calendário e alertas, indexados por (rota, versão, ...)
+respostas = CacheLRU(maximo=256)
+
+
+def resposta_com_etag(chave, gerar):
+    """Responde 304 se o cliente já tem a versão; senão devolve o JSON (do cache)
+
+    `chave` identifica a versão do conteúdo (ex.: nome da rota, aba, versão e
+    parâmetros); `gerar` produz o payload quando ele não está em cache.
+    """
+    etag = gerar_etag(*chave)
+
+    if etag in request.if_none_match:
+        resposta = make_response('', 304)
+    else:
+        resposta = jsonify(respostas.obter_ou_calcular(chave, gerar))
+
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
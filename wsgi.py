@@ -0,0 +1,7 @@
+"""Ponto de entrada do servidor WSGI (ex.: waitress-serve wsgi:app, gunicorn wsgi:app)"""
+
+from app import app, iniciar_servicos
+
+__all__ = ['app']
+
+iniciar_servicos()